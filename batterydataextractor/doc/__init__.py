@@ -1,2 +1,2 @@
-from .document import Document
+from .document import Document, StreamDocument
 from .text import Text, Title, Heading1, Heading2, Heading3, Paragraph, Footnote, Citation, Caption, Sentence, Span, Token
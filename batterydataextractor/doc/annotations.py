@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+batterydataextractor.doc.annotations
+
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Compact binary storage of the elements of a Document together with their sentences, tokens and tags.
+The annotations only depend on the text, so they can be saved once and reused when extracting with other models.
+"""
+import json
+import logging
+
+import numpy as np
+
+from .text import Text, Title, Heading1, Heading2, Heading3, Paragraph, Footnote, Citation, Caption, Abstract, \
+    TokenTable
+from .meta import MetaData
+from .head import HeadData
+
+log = logging.getLogger(__name__)
+
+#: Version of the annotations format, increased whenever it changes
+ANNOTATIONS_VERSION = 1
+
+#: Element classes that can be saved, by name
+ELEMENT_TYPES = {cls.__name__: cls for cls in (Title, Heading1, Heading2, Heading3, Paragraph, Footnote, Citation,
+                                               Caption, Abstract, MetaData, HeadData)}
+
+
+def _offsets(lengths):
+    """Return cumulative offsets for a list of lengths, starting at zero."""
+    return np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(np.int64)
+
+
+def _spans(spans):
+    return np.array(spans, dtype=np.int64).reshape(-1, 2)
+
+
+def save_annotations(elements, f):
+    """Save document elements, and the sentences, tokens, part of speech tags and named entity tags of their text,
+    to a compressed NumPy ``.npz`` file.
+    Tagging is done for every sentence that has not been tagged yet.
+    :param list elements: The document elements.
+    :param f: A file-like object opened in binary mode, or path to a file.
+    :raises TypeError: If an element is not a text element, :class:`MetaData` or :class:`HeadData`.
+    """
+    infos, texts, element_sentences = [], [], []
+    sentence_spans, sentence_tokens, token_spans = [], [], []
+    pos_lengths, ner_lengths, pos_tags, ner_tags = [], [], [], []
+    tag_ids = {}
+    for element in elements:
+        cls = ELEMENT_TYPES.get(type(element).__name__)
+        if cls is not type(element):
+            raise TypeError('Cannot save annotations of %s elements' % type(element).__name__)
+        info = {'type': cls.__name__, 'id': element.id, 'references': element.references}
+        if isinstance(element, Text):
+            texts.append(element.text)
+            element_sentences.append(len(element.sentences))
+            for sentence in element.sentences:
+                sentence_spans.append((sentence.start, sentence.end))
+                table = sentence.token_table
+                sentence_tokens.append(len(table))
+                token_spans.extend((start + sentence.start, end + sentence.start)
+                                   for start, end in zip(table.starts, table.ends))
+                pos = [tag_ids.setdefault(tag, len(tag_ids)) for tag in sentence.pos_tags]
+                ner = [tag_ids.setdefault(tag, len(tag_ids)) for tag in sentence.unprocessed_ner_tags]
+                pos_lengths.append(len(pos))
+                ner_lengths.append(len(ner))
+                pos_tags.extend(pos)
+                ner_tags.extend(ner)
+        else:
+            info['data'] = element._data
+            texts.append('')
+            element_sentences.append(0)
+        infos.append(info)
+    tags = sorted(tag_ids, key=tag_ids.get)
+    np.savez_compressed(
+        f,
+        version=np.array([ANNOTATIONS_VERSION]),
+        elements=np.frombuffer(json.dumps(infos).encode('utf-8'), dtype=np.uint8),
+        text=np.frombuffer(''.join(texts).encode('utf-8'), dtype=np.uint8),
+        text_offsets=_offsets([len(text) for text in texts]),
+        sentence_offsets=_offsets(element_sentences),
+        sentence_spans=_spans(sentence_spans),
+        token_offsets=_offsets(sentence_tokens),
+        token_spans=_spans(token_spans),
+        tags=np.frombuffer(json.dumps(tags).encode('utf-8'), dtype=np.uint8),
+        pos_offsets=_offsets(pos_lengths),
+        pos_tags=np.array(pos_tags, dtype=np.int32),
+        ner_offsets=_offsets(ner_lengths),
+        ner_tags=np.array(ner_tags, dtype=np.int32),
+    )
+    log.debug('Saved annotations of %s elements and %s sentences' % (len(infos), len(sentence_spans)))
+
+
+def load_annotations(f):
+    """Load document elements saved by :func:`save_annotations`. The sentences of text elements are tokenized and
+    tagged already.
+    :param f: A file-like object opened in binary mode, or path to a file.
+    :returns: The document elements.
+    :rtype: list
+    :raises ValueError: If the file was saved in another version of the format.
+    """
+    with np.load(f, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    if int(arrays['version'][0]) != ANNOTATIONS_VERSION:
+        raise ValueError('Unsupported annotations version %s' % arrays['version'][0])
+    infos = json.loads(arrays['elements'].tobytes().decode('utf-8'))
+    text = arrays['text'].tobytes().decode('utf-8')
+    tags = json.loads(arrays['tags'].tobytes().decode('utf-8'))
+    text_offsets = arrays['text_offsets'].tolist()
+    sentence_offsets = arrays['sentence_offsets'].tolist()
+    sentence_spans = arrays['sentence_spans'].tolist()
+    token_offsets = arrays['token_offsets'].tolist()
+    token_spans = arrays['token_spans'].tolist()
+    pos_offsets = arrays['pos_offsets'].tolist()
+    pos_tags = [tags[i] for i in arrays['pos_tags'].tolist()]
+    ner_offsets = arrays['ner_offsets'].tolist()
+    ner_tags = [tags[i] for i in arrays['ner_tags'].tolist()]
+
+    elements = []
+    for i, info in enumerate(infos):
+        cls = ELEMENT_TYPES[info['type']]
+        if not issubclass(cls, Text):
+            element = cls(info['data'])
+            element.id = info['id']
+            element.references = info['references']
+            elements.append(element)
+            continue
+        element = cls(text[text_offsets[i]:text_offsets[i + 1]], id=info['id'], references=info['references'])
+        sentences = []
+        for s in range(sentence_offsets[i], sentence_offsets[i + 1]):
+            sentence = element._make_sentence(*sentence_spans[s])
+            table = sentence._token_table = TokenTable(sentence, [
+                (start - sentence.start, end - sentence.start)
+                for start, end in token_spans[token_offsets[s]:token_offsets[s + 1]]
+            ])
+            table.pos_tags = pos_tags[pos_offsets[s]:pos_offsets[s + 1]]
+            table.ner_tags = ner_tags[ner_offsets[s]:ner_offsets[s + 1]]
+            sentences.append(sentence)
+        element._sentences = sentences
+        elements.append(element)
+    return elements
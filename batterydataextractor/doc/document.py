@@ -7,26 +7,43 @@ Document model.
 """
 from abc import ABCMeta, abstractmethod
 import collections
+from concurrent.futures import ThreadPoolExecutor
 import io
 import json
 import csv
 import logging
+import mmap
+import os
+from operator import itemgetter
 
 import six
 
-from .text import Paragraph, Citation, Footnote, Heading1, Heading2, Heading3, Title, Caption
+from .text import BaseText, Text, Paragraph, Citation, Footnote, Heading1, Heading2, Heading3, Title, Caption
 from .element import CaptionedElement
 from .meta import MetaData
 from .head import HeadData
+from .annotations import save_annotations, load_annotations
 from ..errors import ReaderError
 from ..model.base import ModelList
 from ..model.model import PropertyData, Compound, GeneralInfo
+from ..parse.bert import BertParser, interpret_many
 from ..text import get_encoding
 from ..config import Config
 
 
 log = logging.getLogger(__name__)
 
+#: Files at least this large are memory mapped by :meth:`Document.from_file` instead of read into memory up front
+MMAP_SIZE = 1048576
+
+#: Keep all sentences, tokens and annotations of a Document after its records are found.
+RETAIN_ALL = 'all'
+#: Keep the sentences and tokens of a Document after its records are found, but drop their tags and other annotations.
+RETAIN_TOKENS = 'tokens'
+#: Keep only the records of a Document after they are found, dropping all sentences, tokens and annotations.
+RETAIN_RECORDS = 'records'
+RETENTION_POLICIES = (RETAIN_ALL, RETAIN_TOKENS, RETAIN_RECORDS)
+
 
 class BaseDocument(six.with_metaclass(ABCMeta, collections.Sequence)):
     """Abstract base class for a Document."""
@@ -56,6 +73,179 @@ class BaseDocument(six.with_metaclass(ABCMeta, collections.Sequence)):
         return []
 
 
+class _ElementIndex(object):
+    """Lookup of the elements of a Document by id and by type.
+
+    Captions nested inside :class:`~batterydataextractor.doc.element.CaptionedElement` elements are indexed too,
+    directly after the element that contains them.
+    """
+
+    def __init__(self, elements=()):
+        #: Number of top-level document elements in the index
+        self.size = 0
+        self._all = []
+        self._ids = {}
+        self._unhashable = False
+        self._types = {}
+        self._queries = {}
+        for element in elements:
+            self.add(element)
+
+    def add(self, element):
+        """Add a top-level document element, and any element nested inside it, to the index."""
+        self._add(element, False)
+        if isinstance(element, CaptionedElement) and element.caption is not None:
+            self._add(element.caption, True)
+        self.size += 1
+        self._queries.clear()
+
+    def _add(self, element, nested):
+        try:
+            self._ids.setdefault(element.id, element)
+        except TypeError:
+            self._unhashable = True
+        self._all.append(element)
+        self._types.setdefault(type(element), []).append((len(self._all), element, nested))
+
+    def get(self, id):
+        """Return the first indexed element with the given id, or None."""
+        if self._unhashable:
+            # Elements with unhashable ids can only be compared one by one
+            return next((el for el in self._all if el.id == id), None)
+        try:
+            return self._ids.get(id)
+        except TypeError:
+            return None
+
+    def of_type(self, cls, nested=False):
+        """Return the indexed elements that are instances of ``cls``, in document order."""
+        key = (cls, nested)
+        if key not in self._queries:
+            entries = [entry for el_type, type_entries in self._types.items() if issubclass(el_type, cls)
+                       for entry in type_entries if nested or not entry[2]]
+            entries.sort(key=itemgetter(0))
+            self._queries[key] = [entry[1] for entry in entries]
+        return list(self._queries[key])
+
+
+def _iter_records(elements, models=None):
+    """Yield the records found in a sequence of document elements, resolving the compounds that records refer to
+    across neighbouring elements.
+    Only the previous element is looked at, so the elements can be read one at a time.
+    :param elements: Iterable of document elements.
+    :param list models: (Optional) Only yield records of these models.
+    """
+    records = []  # All records found so far
+    cleaned_records = []  # Final list of records -- output
+    element_models = set()
+    try:
+        head_def_record = None  # Most recent record from a heading, title or short paragraph
+        head_def_record_i = None # Element index of head_def_record
+        last_product_record = None
+        title_record = None # Records found in the title
+
+        # Main loop, over all elements in the document
+        prev = None
+        for i, el in enumerate(elements):
+            log.debug("Element %d, type %s" %(i, str(type(el))))
+            last_id_record = None
+
+            # FORWARD INTERDEPENDENCY RESOLUTION -- Updated model parsers to reflect defined entities
+            # 1. Find any defined entities in the element e.g. "Curie Temperature, Tc"
+            # 2. Update the relevant models
+            # TODO: recover definition
+            # element_definitions = el.definitions
+            # for model in el.models:
+            #     model.update(element_definitions)
+
+            el_records = el.records
+            # Save the title compound
+            if isinstance(el, Title):
+                if len(el_records) == 1 and isinstance(el_records[0], Compound) and el_records[0].is_id_only:
+                    title_record = el_records[0]
+
+            # Reset head_def_record unless consecutive heading with no records
+            if isinstance(el, Heading1) and head_def_record is not None:
+                if not (i == head_def_record_i + 1 and len(el.records) == 0):
+                    head_def_record = None
+                    head_def_record_i = None
+
+            # Paragraph with single sentence with single ID record considered a head_def_record
+            if isinstance(el, Paragraph) and len(el.sentences) == 1:
+                if len(el_records) == 1 and isinstance(el_records[0], Compound) and el_records[0].is_id_only:
+                    head_def_record = el_records[0]
+                    head_def_record_i = i
+
+            # Paragraph with multiple sentences
+            # We assume that if the first sentence of a paragraph contains only 1 ID Record, we can treat it as a header definition record, unless directly proceeding a header def record
+            elif isinstance(el, Paragraph) and len(el.sentences) > 0:
+                if not (isinstance(prev, Heading1) and head_def_record_i == i - 1):
+                    first_sent_records = el.sentences[0].records
+                    if len(first_sent_records) == 1 and isinstance(first_sent_records[0], Compound) and first_sent_records[0].is_id_only:
+                        sent_record = first_sent_records[0]
+                        if sent_record.names:
+                            head_def_record = sent_record
+                            head_def_record_i = i
+
+            #: BACKWARD INTERDEPENDENCY RESOLUTION BEGINS HERE
+            for record in el_records:
+                if isinstance(record, Compound):
+                    # Keep track of the most recent compound record with labels
+                    # Heading records with compound ID's
+                    if isinstance(el, Heading1) and record.names:
+                        head_def_record = record
+                        head_def_record_i = i
+                        # If 2 consecutive headings with compound ID, merge in from previous
+                        if i > 0 and isinstance(prev, Heading1):
+                            if (len(el.records) == 1 and record.is_id_only and len(prev.records) == 1 and
+                                isinstance(prev.records[0], Compound) and prev.records[0].is_id_only and
+                                    not (record.names and prev.records[0].names)):
+                                record.names.extend(prev.records[0].names)
+
+                # Unidentified records -- those without compound names or labels
+                if record.is_unidentified:
+                    if hasattr(record, 'compound'):
+                        # We have property values but no names or labels... try merge those from previous records
+                        if isinstance(el, Paragraph) and (head_def_record or last_product_record or last_id_record or title_record):
+                            # head_def_record from heading takes priority if the heading directly precedes the paragraph ( NOPE: or the last_id_record has no name)
+                            if head_def_record_i and head_def_record_i + 1 == i: # or (last_id_record and not last_id_record.names)):
+                                if head_def_record:
+                                    record.compound = head_def_record
+                                elif last_id_record:
+                                    record.compound = last_id_record
+                                elif last_product_record:
+                                    record.compound = last_product_record
+                                elif title_record:
+                                    record.compound = title_record
+                            else:
+                                if last_id_record:
+                                    record.compound = last_id_record
+                                elif head_def_record:
+                                    record.compound = head_def_record
+                                elif last_product_record:
+                                    record.compound = last_product_record
+                                elif title_record:
+                                    record.compound = title_record
+                        else:
+                            pass
+
+                if record not in records:
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug(record.serialize())
+                    records.append(record)
+                    # clean up records
+                    if record.required_fulfilled and record not in cleaned_records:
+                        if (models and type(record) in models) or not models:
+                            cleaned_records.append(record)
+                            yield record
+            element_models.update(el.models)
+            prev = el
+    finally:
+        # Reset updatables
+        for model in element_models:
+            model.reset_updatables()
+
+
 class Document(BaseDocument):
     """A document to extract data from. Contains a list of document elements."""
     # TODO: Add a usage example here in the documentation.
@@ -66,17 +256,16 @@ class Document(BaseDocument):
         :param list[batterydataextractor.doc.element.BaseElement|string] elements: Elements in this Document.
         :keyword Config config: (Optional) Config file for the Document.
         :keyword list[BaseModel] models: (Optional) Models that the Document should extract data for.
+        :keyword str retention: (Optional) What the Document keeps once :attr:`records` are found, one of
+            :data:`RETAIN_ALL`, :data:`RETAIN_TOKENS` or :data:`RETAIN_RECORDS`. Default :data:`RETAIN_ALL`.
         """
         self._elements = []
+        self._index = None
+        self._records = None
+        self._abbreviation_map = None
+        self.retention = kwargs.get('retention', RETAIN_ALL)
         for element in elements:
-            # Convert raw text to Paragraph elements
-            if isinstance(element, six.text_type):
-                element = Paragraph(element)
-            elif isinstance(element, six.binary_type):
-                # Try guess encoding if byte string
-                encoding = get_encoding(element)
-                log.warning('Guessed bytestring encoding as %s. Use unicode strings to avoid this warning.', encoding)
-                element = Paragraph(element.decode(encoding))
+            element = self._make_element(element)
             element.document = self
             self._elements.append(element)
         if 'config' in kwargs.keys():
@@ -97,8 +286,84 @@ class Document(BaseDocument):
         for element in elements:
             if callable(getattr(element, 'set_config', None)):
                 element.set_config()
+        self._share_text_buffer()
         log.debug('%s: Initializing with %s elements' % (self.__class__.__name__, len(self.elements)))
 
+    def _share_text_buffer(self):
+        """Join the text of all text elements, including captions, into shared buffers, and make the text of each
+        element a view of one of them. Sentences and tokens are views of the same buffers, so no further copies of the
+        text are kept. Elements are grouped by the widest character in their text, so a single wide character does not
+        make Python store all of the text with more bytes per character."""
+        groups = {}
+        for el in self._elements:
+            if isinstance(el, CaptionedElement):
+                el = el.caption
+            if isinstance(el, BaseText):
+                widest = ord(max(el.text)) if el.text else 0
+                groups.setdefault(0 if widest < 0x100 else 1 if widest < 0x10000 else 2, []).append(el)
+        for texts in groups.values():
+            buffer = ''.join([el.text for el in texts])
+            offset = 0
+            for el in texts:
+                el._share_buffer(buffer, offset)
+                offset += el._length
+
+    @staticmethod
+    def _make_element(element):
+        """Convert raw text to a Paragraph element."""
+        if isinstance(element, six.text_type):
+            element = Paragraph(element)
+        elif isinstance(element, six.binary_type):
+            # Try guess encoding if byte string
+            encoding = get_encoding(element)
+            log.warning('Guessed bytestring encoding as %s. Use unicode strings to avoid this warning.', encoding)
+            element = Paragraph(element.decode(encoding))
+        return element
+
+    def add_element(self, element):
+        """
+        Add an element to the end of this Document, keeping the element index up to date.
+        Usage::
+            d = Document.from_file(f)
+            d.add_element(Paragraph('A new paragraph.'))
+        :param batterydataextractor.doc.element.BaseElement|string element: The element to add.
+            Strings are wrapped into Paragraph elements.
+        :returns: The added element.
+        :rtype: BaseElement
+        """
+        element = self._make_element(element)
+        element.document = self
+        if callable(getattr(element, 'set_config', None)):
+            element.set_config()
+        if self._models and callable(getattr(element, 'add_models', None)):
+            element.add_models(self._models)
+        if self._device != -1:
+            element.device = self._device
+        index = self._index if self._index is not None and self._index.size == len(self._elements) else None
+        self._abbreviation_map = None
+        self._elements.append(element)
+        if index is not None:
+            index.add(element)
+        return element
+
+    @property
+    def element_index(self):
+        """
+        Index of the elements of this Document by id and by type, including captions of captioned elements.
+        The index is built on first use and rebuilt if elements are added to or removed from :attr:`elements`
+        directly. Use :meth:`add_element` to update it without a rebuild.
+        .. note::
+            Changing the id of an element, or replacing an element in :attr:`elements`, is not detected.
+            Call :meth:`reset_element_index` afterwards.
+        """
+        if self._index is None or self._index.size != len(self._elements):
+            self._index = _ElementIndex(self._elements)
+        return self._index
+
+    def reset_element_index(self):
+        """Discard the element index, so it is rebuilt on next use."""
+        self._index = None
+
     def add_models(self, models):
         """
         Add models to all elements.
@@ -126,11 +391,8 @@ class Document(BaseDocument):
         """
         log.debug("Setting models by names")
 
-        model = PropertyData
-        model.defined_names = names
-        model.confidence_threshold = confidence_threshold
-        model.original_text = original_text
-        model.device = self.device
+        model = PropertyData.configure(defined_names=names, confidence_threshold=confidence_threshold,
+                                       original_text=original_text, device=self.device)
         self._models.extend([model])
         for element in self.elements:
             if callable(getattr(element, 'add_models', None)):
@@ -148,12 +410,8 @@ class Document(BaseDocument):
         """
         log.debug("Setting models by names")
 
-        model = GeneralInfo
-        model.defined_names = names
-        model.confidence_threshold = confidence_threshold
-        model.original_text = original_text
-        model.self_defined = self_defined
-        model.device = self.device
+        model = GeneralInfo.configure(defined_names=names, confidence_threshold=confidence_threshold,
+                                      original_text=original_text, self_defined=self_defined, device=self.device)
         self._models.extend([model])
         for element in self.elements:
             if callable(getattr(element, 'add_models', None)):
@@ -170,6 +428,21 @@ class Document(BaseDocument):
         for element in self.elements:
             element.models = value
 
+    @property
+    def retention(self):
+        """
+        What this Document keeps once its :attr:`records` are found. With :data:`RETAIN_ALL` everything is kept, with
+        :data:`RETAIN_TOKENS` the sentences and tokens are kept but their annotations are dropped, and with
+        :data:`RETAIN_RECORDS` only the records are kept.
+        """
+        return self._retention
+
+    @retention.setter
+    def retention(self, value):
+        if value not in RETENTION_POLICIES:
+            raise ValueError('Unknown retention policy %r, expected one of %s' % (value, ', '.join(RETENTION_POLICIES)))
+        self._retention = value
+
     @property
     def device(self):
         return self._device
@@ -199,10 +472,39 @@ class Document(BaseDocument):
             :class:`~batterydataextractor.reader.pdf.PdfReader`, and :class:`~batterydataextractor.reader.plaintext.PlainTextReader`.
         """
         if isinstance(f, six.string_types):
-            f = io.open(f, 'rb')
+            fname = fname or f
+            with io.open(f, 'rb') as fh:
+                if os.fstat(fh.fileno()).st_size < MMAP_SIZE:
+                    return cls._read(fh.read(), fname=fname, readers=readers, prepare=True)
+                fstring = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return cls._read(fstring, fname=fname, readers=readers, prepare=True)
+            finally:
+                fstring.close()
         if not fname and hasattr(f, 'name'):
             fname = f.name
-        return cls.from_string(f.read().replace(b"<head>", b"<ce:head>").replace(b"</head>", b"</ce:head>"), fname=fname, readers=readers)
+        return cls._read(f.read(), fname=fname, readers=readers, prepare=True)
+
+    @classmethod
+    def from_files(cls, paths, workers=None, readers=None):
+        """Create Documents from several files, reading them in parallel threads.
+        Usage::
+            docs = Document.from_files(['paper1.xml', 'paper2.html'], workers=4)
+        .. note::
+            Parsing with lxml runs without the global interpreter lock, so threads speed up reading many files.
+        :param list paths: Files to read, as file-like objects or paths.
+        :param int workers: (Optional) Number of threads. If not set, the default of
+            :class:`concurrent.futures.ThreadPoolExecutor` is used.
+        :param list[batterydataextractor.reader.base.BaseReader] readers: (Optional) List of readers to use,
+            see :meth:`from_file`.
+        :returns: The Documents, in the same order as the paths.
+        :rtype: list[Document]
+        """
+        paths = list(paths)
+        if workers == 1 or len(paths) <= 1:
+            return [cls.from_file(path, readers=readers) for path in paths]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda path: cls.from_file(path, readers=readers), paths))
 
     @classmethod
     def from_string(cls, fstring, fname=None, readers=None):
@@ -221,25 +523,64 @@ class Document(BaseDocument):
             :class:`~batterydataextractor.reader.markup.XmlReader`, :class:`~batterydataextractor.reader.markup.HtmlReader`,
             :class:`~batterydataextractor.reader.pdf.PdfReader`, and :class:`~batterydataextractor.reader.plaintext.PlainTextReader`.
         """
+        if isinstance(fstring, six.text_type):
+            raise ReaderError('from_string expects a byte string, not a unicode string')
+        return cls._read(fstring, fname=fname, readers=readers)
+
+    @classmethod
+    def _read(cls, fstring, fname=None, readers=None, prepare=False):
+        """Detect the format from the start of the file once, then parse it with the first reader that detects it.
+        The other readers that detect the format are only tried if parsing fails.
+        :param bytes|mmap.mmap fstring: The contents of the file.
+        :param str fname: (Optional) The filename. Used to help determine file format.
+        :param list[batterydataextractor.reader.base.BaseReader] readers: (Optional) List of readers to use.
+        :param bool prepare: (Optional) Let the reader fix up its format before parsing, see
+            :meth:`~batterydataextractor.reader.base.BaseReader.prepare`.
+        """
+        from ..reader.base import sniff
         if readers is None:
             from ..reader import DEFAULT_READERS
             readers = DEFAULT_READERS
 
-        if isinstance(fstring, six.text_type):
-            raise ReaderError('from_string expects a byte string, not a unicode string')
-
-        for reader in readers:
-            # Skip reader if we don't think it can read file
-            if not reader.detect(fstring, fname=fname):
-                continue
+        prefix = sniff(fstring)
+        # Skip readers that we don't think can read the file
+        candidates = [reader for reader in readers if reader.detect(prefix, fname=fname)]
+        for reader in candidates:
             try:
-                d = reader.readstring(fstring)
+                d = reader.readstring(reader.prepare(fstring) if prepare else fstring)
                 log.debug('Parsed document with %s' % reader.__class__.__name__)
                 return d
             except ReaderError:
                 pass
         raise ReaderError('Unable to read document')
 
+    def save_annotations(self, f):
+        """Save the elements of this Document, with the sentences, tokens, part of speech tags and named entity tags
+        of their text, to a compressed NumPy ``.npz`` file.
+        The annotations do not depend on the models, so a Document loaded with :meth:`load_annotations` skips straight
+        to the parsers when extracting records with other models.
+        Usage::
+            d = Document.from_file('paper.xml')
+            d.save_annotations('paper.npz')
+            d = Document.load_annotations('paper.npz')
+            d.add_models_by_names(['capacity'])
+        :param f: A file-like object opened in binary mode, or path to a file.
+        """
+        save_annotations(self.elements, f)
+
+    @classmethod
+    def load_annotations(cls, f, **kwargs):
+        """Create a Document from a file saved by :meth:`save_annotations`.
+        :param f: A file-like object opened in binary mode, or path to a file.
+        :keyword Config config: (Optional) Config file for the Document.
+        :keyword list[BaseModel] models: (Optional) Models that the Document should extract data for.
+        """
+        d = cls(*load_annotations(f), **kwargs)
+        for element in d.elements:
+            for sentence in getattr(element, '_sentences', []):
+                sentence.document = d
+        return d
+
     @property
     def elements(self):
         """
@@ -256,114 +597,161 @@ class Document(BaseDocument):
         All records found in this Document, as a list of :class:`~batterydataextractor.model.base.BaseModel`.
         """
         log.debug("Getting chemical records")
-        records = ModelList()  # Final list of records -- output
-        head_def_record = None  # Most recent record from a heading, title or short paragraph
-        head_def_record_i = None # Element index of head_def_record
-        last_product_record = None
-        title_record = None # Records found in the title
-
-        # Main loop, over all elements in the document
-        for i, el in enumerate(self.elements):
-            log.debug("Element %d, type %s" %(i, str(type(el))))
-            last_id_record = None
-
-            # FORWARD INTERDEPENDENCY RESOLUTION -- Updated model parsers to reflect defined entities
-            # 1. Find any defined entities in the element e.g. "Curie Temperature, Tc"
-            # 2. Update the relevant models
-            # TODO: recover definition
-            # element_definitions = el.definitions
-            # for model in el.models:
-            #     model.update(element_definitions)
-
-            el_records = el.records
-            # Save the title compound
-            if isinstance(el, Title):
-                if len(el_records) == 1 and isinstance(el_records[0], Compound) and el_records[0].is_id_only:
-                    title_record = el_records[0]
-
-            # Reset head_def_record unless consecutive heading with no records
-            if isinstance(el, Heading1) and head_def_record is not None:
-                if not (i == head_def_record_i + 1 and len(el.records) == 0):
-                    head_def_record = None
-                    head_def_record_i = None
-
-            # Paragraph with single sentence with single ID record considered a head_def_record
-            if isinstance(el, Paragraph) and len(el.sentences) == 1:
-                if len(el_records) == 1 and isinstance(el_records[0], Compound) and el_records[0].is_id_only:
-                    head_def_record = el_records[0]
-                    head_def_record_i = i
+        # Records kept by RETAIN_RECORDS are only used while the models and elements are the same
+        key = (tuple(self._models), len(self._elements))
+        if self._records is not None and self._records[0] == key:
+            return self._records[1]
+        records = ModelList(*self.iter_records())
+        if self.retention != RETAIN_ALL:
+            self.release()
+            if self.retention == RETAIN_RECORDS:
+                self._records = (key, records)
+        return records
+
+    def release(self, keep_tokens=None):
+        """
+        Drop the sentences, tokens and annotations cached by the elements of this Document, to free memory once its
+        records have been found. Anything dropped is computed again if it is used later. Records kept by the
+        :data:`RETAIN_RECORDS` policy and the :attr:`abbreviation_map` are not dropped.
+        Usage::
+            with Document.from_file(f) as d:
+                d.add_models_by_names(['capacity'])
+                records = d.records
+        :param bool keep_tokens: (Optional) Whether to keep the sentences and tokens, and only drop their annotations.
+            Default True if the :attr:`retention` policy is :data:`RETAIN_TOKENS`, otherwise False.
+        """
+        if keep_tokens is None:
+            keep_tokens = self.retention == RETAIN_TOKENS
+        for element in self.elements:
+            if callable(getattr(element, 'release', None)):
+                element.release(keep_tokens=keep_tokens)
 
-            # Paragraph with multiple sentences
-            # We assume that if the first sentence of a paragraph contains only 1 ID Record, we can treat it as a header definition record, unless directly proceeding a header def record
-            elif isinstance(el, Paragraph) and len(el.sentences) > 0:
-                if not (isinstance(self.elements[i - 1], Heading1) and head_def_record_i == i - 1):
-                    first_sent_records = el.sentences[0].records
-                    if len(first_sent_records) == 1 and isinstance(first_sent_records[0], Compound) and first_sent_records[0].is_id_only:
-                        sent_record = first_sent_records[0]
-                        if sent_record.names:
-                            head_def_record = sent_record
-                            head_def_record_i = i
+    def __enter__(self):
+        return self
 
-            #: BACKWARD INTERDEPENDENCY RESOLUTION BEGINS HERE
-            for record in el_records:
-                if isinstance(record, Compound):
-                    # Keep track of the most recent compound record with labels
-                    # Heading records with compound ID's
-                    if isinstance(el, Heading1) and record.names:
-                        head_def_record = record
-                        head_def_record_i = i
-                        # If 2 consecutive headings with compound ID, merge in from previous
-                        if i > 0 and isinstance(self.elements[i - 1], Heading1):
-                            prev = self.elements[i - 1]
-                            if (len(el.records) == 1 and record.is_id_only and len(prev.records) == 1 and
-                                isinstance(prev.records[0], Compound) and prev.records[0].is_id_only and
-                                    not (record.names and prev.records[0].names)):
-                                record.names.extend(prev.records[0].names)
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
 
-                # Unidentified records -- those without compound names or labels
-                if record.is_unidentified:
-                    if hasattr(record, 'compound'):
-                        # We have property values but no names or labels... try merge those from previous records
-                        if isinstance(el, Paragraph) and (head_def_record or last_product_record or last_id_record or title_record):
-                            # head_def_record from heading takes priority if the heading directly precedes the paragraph ( NOPE: or the last_id_record has no name)
-                            if head_def_record_i and head_def_record_i + 1 == i: # or (last_id_record and not last_id_record.names)):
-                                if head_def_record:
-                                    record.compound = head_def_record
-                                elif last_id_record:
-                                    record.compound = last_id_record
-                                elif last_product_record:
-                                    record.compound = last_product_record
-                                elif title_record:
-                                    record.compound = title_record
-                            else:
-                                if last_id_record:
-                                    record.compound = last_id_record
-                                elif head_def_record:
-                                    record.compound = head_def_record
-                                elif last_product_record:
-                                    record.compound = last_product_record
-                                elif title_record:
-                                    record.compound = title_record
-                        else:
-                            pass
+    def iter_records(self):
+        """
+        Iterate over the records found in this Document, yielding each record as soon as the element it is found in
+        has been processed. The records are the same, and in the same order, as :attr:`records`.
+        """
+        return _iter_records(self.elements, self.models)
 
-                if record not in records:
-                    log.debug(record.serialize())
-                    records.append(record)
+    def segment_sentences(self, batch_size=None, n_process=1):
+        """
+        Split all text elements of this Document into sentences at once, rather than one element at a time when their
+        sentences are first used. Elements that share a sentence tokenizer are passed to it together, so a spaCy
+        tokenizer processes them in batches with ``nlp.pipe``. Separate tokenizers that give the same sentences, such as
+        those each element gets from a config file, count as shared. Elements that have been split already are
+        skipped.
+        :param int batch_size: (Optional) Number of texts the sentence tokenizer processes at once.
+        :param int n_process: (Optional) Number of processes the sentence tokenizer uses. Default 1.
+        """
+        groups = collections.OrderedDict()
+        for el in self.elements:
+            if isinstance(el, CaptionedElement):
+                el = el.caption
+            if isinstance(el, Text) and not hasattr(el, '_sentences'):
+                groups.setdefault(el.sentence_tokenizer._batch_key, []).append(el)
+        for els in groups.values():
+            spans = els[0].sentence_tokenizer.span_tokenize_batch([el.text for el in els], batch_size=batch_size,
+                                                                  n_process=n_process)
+            for el, el_spans in zip(els, spans):
+                el._sentences = [el._make_sentence(start, end) for start, end in el_spans]
+
+    def detect_abbreviations(self, batch_size=None):
+        """
+        Detect the abbreviations in all sentences of this Document at once, rather than one sentence at a time when
+        their definitions are first used. Sentences that share an abbreviation detector are passed to it together in
+        batches of sentences of similar length. Sentences that have been processed already are skipped.
+        :param int batch_size: (Optional) Number of sentences the abbreviation detector processes at once.
+        """
+        groups = collections.OrderedDict()
+        for el in self.elements:
+            if isinstance(el, CaptionedElement):
+                el = el.caption
+            if isinstance(el, Text):
+                for sent in el.sentences:
+                    if sent.abbreviation_detector and not hasattr(sent, '_abbreviation_spans'):
+                        groups.setdefault(sent.abbreviation_detector, []).append(sent)
+        for detector, sents in groups.items():
+            spans = detector.detect_spans_many([sent.raw_tokens for sent in sents], batch_size=batch_size)
+            for sent, sent_spans in zip(sents, spans):
+                sent._abbreviation_spans = sent_spans
 
-        # clean up records
-        cleaned_records = ModelList()
-        for record in records:
-            if record.required_fulfilled and record not in cleaned_records:
-                if (self.models and type(record) in self.models) or not self.models:
-                    cleaned_records.append(record)
+    def extract(self, configurations, batch_size=32):
+        """
+        Extract records for several model configurations in a single pass over this Document.
 
-        # Reset updatables
-        for el in self.elements:
-            for model in el.models:
-                model.reset_updatables()
+        The document is only split into sentences, tokenized and tagged once, and the question-answering calls of all
+        configurations are merged into shared batches. The models of the Document are left unchanged.
 
-        return cleaned_records
+        Usage::
+            d = Document.from_file(f)
+            results = d.extract({
+                'properties': [PropertyData.configure(defined_names=['capacity', 'voltage'])],
+                'devices': [GeneralInfo.configure(defined_names=['anode', 'cathode'])],
+            })
+            properties = results['properties']
+
+        :param dict configurations: Mapping of configuration name to a list of model classes.
+        :param int batch_size: (Optional) Batch size for the question-answering models. Default 32.
+        :returns: The records found for each configuration, in the order of the configurations.
+        :rtype: collections.OrderedDict[str, ModelList]
+        """
+        configurations = collections.OrderedDict(configurations)
+        saved_models = self._models
+        saved_element_models = [el.models for el in self.elements]
+        # Models the elements parse by themselves, e.g. Compound for paragraphs
+        base_models = [[model for model in el.models if model not in self._models] for el in self.elements]
+        self.segment_sentences()
+        sentences = [sent for el in self.elements for sent in self._element_sentences(el)]
+        try:
+            jobs, job_sentences = [], []
+            for models in configurations.values():
+                self._set_extract_models(models, base_models)
+                for sent in sentences:
+                    tagged_tokens = None
+                    for model in sent._streamlined_models:
+                        for parser in model.parsers:
+                            if isinstance(parser, BertParser):
+                                if tagged_tokens is None:
+                                    tagged_tokens = sent.parser_tokens
+                                jobs.append((parser, tagged_tokens))
+                                job_sentences.append(sent)
+            log.debug('Running %s parser jobs for %s configurations' % (len(jobs), len(configurations)))
+            for (parser, _), sent, records in zip(jobs, job_sentences, interpret_many(jobs, batch_size=batch_size)):
+                sent._parsed_records[parser] = records
+            results = collections.OrderedDict()
+            for name, models in configurations.items():
+                self._set_extract_models(models, base_models)
+                results[name] = ModelList(*self.iter_records())
+        finally:
+            for sent in sentences:
+                sent._parsed_records.clear()
+            self._models = saved_models
+            for el, models in zip(self.elements, saved_element_models):
+                el.models = models
+        if self.retention != RETAIN_ALL:
+            self.release()
+        return results
+
+    def _set_extract_models(self, models, base_models):
+        """Use the models of one extract configuration on this Document and all its elements."""
+        self._models = list(models)
+        for el, el_models in zip(self.elements, base_models):
+            el.models = el_models + list(models)
+
+    @staticmethod
+    def _element_sentences(el):
+        """Return the sentences of a document element, including those of the caption of a captioned element."""
+        if isinstance(el, CaptionedElement):
+            el = el.caption
+        if isinstance(el, Text):
+            return el.sentences
+        return []
 
     def get_element_with_id(self, id):
         """
@@ -372,17 +760,25 @@ class Document(BaseDocument):
         :returns: Element with specified ID
         :rtype: BaseElement or None
         """
-        """Return the element with the specified ID."""
-        # Should we maintain a hashmap of ids to make this more efficient? Probably overkill.
-        # TODO: Elements can contain nested elements (captions, footnotes, table cells, etc.)
-        return next((el for el in self.elements if el.id == id), None)
+        # TODO: Elements can contain other nested elements (footnotes, table cells, etc.)
+        return self.element_index.get(id)
+
+    def elements_of_type(self, cls, nested=False):
+        """
+        Get all elements that are instances of a type, in document order.
+        :param type cls: Element class (or tuple of classes) to search for.
+        :param bool nested: (Optional) Also include captions nested inside captioned elements.
+        :returns: Elements of the specified type.
+        :rtype: list[BaseElement]
+        """
+        return self.element_index.of_type(cls, nested=nested)
 
     @property
     def citations(self):
         """
         A list of all :class:`~batterydataextractor.doc.text.Citation` elements in this Document.
         """
-        return [el for el in self.elements if isinstance(el, Citation)]
+        return self.elements_of_type(Citation)
 
     @property
     def footnotes(self):
@@ -392,68 +788,68 @@ class Document(BaseDocument):
             Elements (e.g. Tables) can contain nested Footnotes which are not taken into account.
         """
         # TODO: Elements (e.g. Tables) can contain nested Footnotes
-        return [el for el in self.elements if isinstance(el, Footnote)]
+        return self.elements_of_type(Footnote)
 
     @property
     def titles(self):
         """
         A list of all :class:`~batterydataextractor.doc.text.Title` elements in this Document.
         """
-        return [el for el in self.elements if isinstance(el, Title)]
+        return self.elements_of_type(Title)
 
     @property
     def headings1(self):
         """
         A list of all :class:`~batterydataextractor.doc.text.Heading1` elements in this Document.
         """
-        return [el for el in self.elements if isinstance(el, Heading1)]
+        return self.elements_of_type(Heading1)
 
     @property
     def headings2(self):
         """
         A list of all :class:`~batterydataextractor.doc.text.Heading2` elements in this Document.
         """
-        return [el for el in self.elements if isinstance(el, Heading2)]
+        return self.elements_of_type(Heading2)
 
     @property
     def headings3(self):
         """
         A list of all :class:`~batterydataextractor.doc.text.Heading3` elements in this Document.
         """
-        return [el for el in self.elements if isinstance(el, Heading3)]
+        return self.elements_of_type(Heading3)
 
     @property
     def paragraphs(self):
         """
         A list of all :class:`~batterydataextractor.doc.text.Paragraph` elements in this Document.
         """
-        return [el for el in self.elements if isinstance(el, Paragraph)]
+        return self.elements_of_type(Paragraph)
 
     @property
     def captions(self):
         """
         A list of all :class:`~batterydataextractor.doc.text.Caption` elements in this Document.
         """
-        return [el for el in self.elements if isinstance(el, Caption)]
+        return self.elements_of_type(Caption)
 
     @property
     def captioned_elements(self):
         """
         A list of all :class:`~batterydataextractor.doc.element.CaptionedElement` elements in this Document.
         """
-        return [el for el in self.elements if isinstance(el, CaptionedElement)]
+        return self.elements_of_type(CaptionedElement)
 
     @property
     def metadata(self):
         """Return metadata information
         """
-        return [el for el in self.elements if isinstance(el, MetaData)]
+        return self.elements_of_type(MetaData)
 
     @property
     def headdata(self):
         """Return header information
         """
-        return [el for el in self.elements if isinstance(el, HeadData)]
+        return self.elements_of_type(HeadData)
 
     @property
     def abbreviation_definitions(self):
@@ -461,8 +857,29 @@ class Document(BaseDocument):
         A list of all abbreviation definitions in this Document. Each abbreviation is in the form
         (:class:`str` abbreviation, :class:`str` long form of abbreviation, :class:`str` ner_tag)
         """
+        self.detect_abbreviations()
         return [ab for el in self.elements for ab in el.abbreviation_definitions]
 
+    @property
+    def abbreviation_map(self):
+        """
+        A dictionary mapping each abbreviation defined in this Document to its long form, so definitions can be looked
+        up rather than detected again. The first definition of an abbreviation is used. The map is built once, and is
+        kept by :meth:`release` so the abbreviations are not detected again. It is built again when an element is
+        added with :meth:`add_element`.
+        """
+        if self._abbreviation_map is None:
+            self.detect_abbreviations()
+            definitions = {}
+            for el in self.elements:
+                if isinstance(el, CaptionedElement):
+                    el = el.caption
+                if isinstance(el, Text):
+                    for abbr, long in el.abbreviation_map.items():
+                        definitions.setdefault(abbr, long)
+            self._abbreviation_map = definitions
+        return self._abbreviation_map
+
     @property
     def ner_tags(self):
         """
@@ -534,3 +951,62 @@ class Document(BaseDocument):
                 writer.writerow(dic)
         else:
             raise ValueError('Unknown file type. Please use json, txt, or csv.')
+
+
+class StreamDocument(object):
+    """A document whose elements are read one at a time, for files that are too large to parse all at once.
+    The elements are only kept for as long as the consumer holds on to them, so they can only be iterated once.
+    Usage::
+        with open('large.xml', 'rb') as f:
+            doc = ElsevierXmlReader().readstream(f)
+            doc.add_models([PropertyData.configure(defined_names=['capacity'])])
+            for record in doc.iter_records():
+                print(record.serialize())
+    """
+
+    def __init__(self, elements, **kwargs):
+        """
+        :param elements: Iterable of document elements, usually a generator that reads them from a file.
+        :keyword Config config: (Optional) Config file for the Document.
+        :keyword list[BaseModel] models: (Optional) Models that the Document should extract data for.
+        """
+        self._elements = iter(elements)
+        self.config = kwargs.get('config', Config())
+        self._models = kwargs.get('models', [])
+        self._device = kwargs.get('device', -1)
+
+    def __iter__(self):
+        for element in self._elements:
+            element = Document._make_element(element)
+            element.document = self
+            if callable(getattr(element, 'set_config', None)):
+                element.set_config()
+            if self._models and callable(getattr(element, 'add_models', None)):
+                element.add_models(self._models)
+            if self._device != -1:
+                element.device = self._device
+            yield element
+
+    @property
+    def models(self):
+        return self._models
+
+    def add_models(self, models):
+        """Add models to all elements that are read after this call.
+        :param list models: List of model classes.
+        """
+        self._models.extend(models)
+
+    @property
+    def device(self):
+        return self._device
+
+    def iter_records(self):
+        """Read the remaining elements and iterate over the records found in them, in the same order as
+        :attr:`Document.records`."""
+        return _iter_records(self, self.models)
+
+    def iter_serialized(self):
+        """Read the remaining elements and iterate over their serialized form, see :meth:`Document.serialize`."""
+        for element in self:
+            yield element.serialize()
@@ -79,6 +79,13 @@ class BaseElement(six.with_metaclass(ABCMeta)):
         """All records found in this Document, as a list of :class:`batterydataextractor.model.base.BaseModel`."""
         return []
 
+    def release(self, keep_tokens=False):
+        """Drop any annotations this element has cached, such as sentences, tokens and tags, to free memory. They are
+        computed again if they are used later. Elements that cache nothing do nothing.
+        :param bool keep_tokens: (Optional) Whether to keep the sentences and tokens, and only drop their annotations.
+        """
+        pass
+
     # @abstractmethod  # TODO: Put this back?
     # def serialize(self):
     #     """Convert Element to python dictionary."""
@@ -94,21 +101,14 @@ class BaseElement(six.with_metaclass(ABCMeta)):
 
     def add_models_by_names(self, names, confidence_threshold=0, original_text=False):
         """"""
-        model = PropertyData
-        model.defined_names = names
-        model.confidence_threshold = confidence_threshold
-        model.original_text = original_text
-        model.device = self.device
+        model = PropertyData.configure(defined_names=names, confidence_threshold=confidence_threshold,
+                                       original_text=original_text, device=self.device)
         self.models.extend([model])
 
     def add_general_models(self, names, confidence_threshold=0, original_text=False, self_defined=False):
         """"""
-        model = GeneralInfo
-        model.defined_names = names
-        model.confidence_threshold = confidence_threshold
-        model.original_text = original_text
-        model.self_defined = self_defined
-        model.device = self.device
+        model = GeneralInfo.configure(defined_names=names, confidence_threshold=confidence_threshold,
+                                      original_text=original_text, self_defined=self_defined, device=self.device)
         self.models.extend([model])
 
     @property
@@ -234,6 +234,9 @@ class CaptionedElement(BaseElement):
         # This just passes the caption records. Subclasses may wish to extend this.
         return self.caption.records
 
+    def release(self, keep_tokens=False):
+        self.caption.release(keep_tokens=keep_tokens)
+
     @property
     def abbreviation_definitions(self):
         """
@@ -6,9 +6,10 @@ batterydataextractor.doc.text
 Text-based document elements.
 """
 from abc import abstractmethod, ABC
+from array import array
 import collections
 import logging
-import re
+import threading
 import unicodedata
 import six
 
@@ -18,7 +19,8 @@ from ..nlp.lexicon import ChemLexicon, Lexicon
 from ..nlp.cem import CemTagger
 from ..nlp.abbrev import AbbreviationDetector
 from ..nlp.tag import NoneTagger, BaseTagger, BertTagger
-from ..nlp.tokenize import ChemSentenceTokenizer, ChemWordTokenizer, SentenceTokenizer, WordTokenizer
+from ..nlp.tokenize import ChemSentenceTokenizer, ChemWordTokenizer, SentenceTokenizer, WordTokenizer, \
+    RegexSentenceTokenizer, ChemRegexSentenceTokenizer
 from ..utils import memoized_property
 from .element import BaseElement
 from ..text import CONTROL_RE
@@ -57,7 +59,10 @@ class BaseText(BaseElement):
         if not isinstance(text, six.text_type):
             raise TypeError('Text must be a unicode string')
         super(BaseText, self).__init__(**kwargs)
-        self._text = unicodedata.normalize("NFKD", text)
+        # The text is a view of a buffer, which can be shared with the other elements of a document
+        self._buffer = unicodedata.normalize("NFKD", text)
+        self._offset = 0
+        self._length = len(self._buffer)
         self.word_tokenizer = word_tokenizer if word_tokenizer is not None else self.word_tokenizer
         self.lexicon = lexicon if lexicon is not None else self.lexicon
         self.abbreviation_detector = abbreviation_detector if abbreviation_detector is not None else self.abbreviation_detector
@@ -65,15 +70,28 @@ class BaseText(BaseElement):
         self.ner_tagger = ner_tagger if ner_tagger is not None else self.ner_tagger
 
     def __repr__(self):
-        return '%s(id=%r, references=%r, text=%r)' % (self.__class__.__name__, self.id, self.references, self._text)
+        return '%s(id=%r, references=%r, text=%r)' % (self.__class__.__name__, self.id, self.references, self.text)
 
     def __str__(self):
-        return self._text
+        return self.text
 
     @property
     def text(self):
         """The raw text :class:`str` for this passage of text."""
-        return self._text
+        if self._length == len(self._buffer):
+            return self._buffer
+        return self._buffer[self._offset:self._offset + self._length]
+
+    def _share_buffer(self, buffer, offset, length=None):
+        """Use the text in ``buffer`` from ``offset`` onwards as the text of this element, instead of its own string.
+        :param str buffer: The text buffer, e.g. the text of all elements of a document.
+        :param int offset: The start of the text of this element in the buffer.
+        :param int length: (Optional) The length of the text of this element. Default the current length.
+        """
+        self._buffer = buffer
+        self._offset = offset
+        if length is not None:
+            self._length = length
 
     @property
     @abstractmethod
@@ -198,6 +216,18 @@ class Text(collections.Sequence, BaseText):
     def __len__(self):
         return len(self.sentences)
 
+    @property
+    def models(self):
+        return self._models
+
+    @models.setter
+    def models(self, value):
+        self._models = value
+        self._streamlined_models_list = None
+        # Keep any sentences that have already been created in sync
+        for sentence in getattr(self, '_sentences', []):
+            sentence.models = value
+
     def set_config(self):
         """ Load settings from configuration file
         .. note:: Called when Document instance is created
@@ -224,24 +254,46 @@ class Text(collections.Sequence, BaseText):
     @memoized_property
     def sentences(self):
         """A list of :class:`Sentence` s that make up this text passage."""
-        sents = []
         spans = self.sentence_tokenizer.span_tokenize(self.text)
-        for span in spans:
-            sent = Sentence(
-                text=self.text[span[0]:span[1]],
-                start=span[0],
-                end=span[1],
-                word_tokenizer=self.word_tokenizer,
-                lexicon=self.lexicon,
-                abbreviation_detector=self.abbreviation_detector,
-                pos_tagger=self.pos_tagger,
-                ner_tagger=self.ner_tagger,
-                document=self.document,
-                models=self.models,
-                device=self.device
-            )
-            sents.append(sent)
-        return sents
+        return [self._make_sentence(span[0], span[1]) for span in spans]
+
+    def release(self, keep_tokens=False):
+        """Drop the sentences of this text passage and their annotations, to free memory. They are created again if
+        they are used later.
+        :param bool keep_tokens: (Optional) Whether to keep the sentences and their tokens, and only drop their tags,
+            abbreviations and chemical entity mentions.
+        """
+        for attr in ('_unprocessed_ner_tagged_tokens', '_unprocessed_ner_tags', '_abbreviation_map'):
+            self.__dict__.pop(attr, None)
+        for sentence in getattr(self, '_sentences', []):
+            sentence.release(keep_tokens=keep_tokens)
+        if not keep_tokens:
+            self.__dict__.pop('_sentences', None)
+
+    def _share_buffer(self, buffer, offset, length=None):
+        super(Text, self)._share_buffer(buffer, offset, length)
+        # Keep any sentences that have already been created in the same buffer
+        for sentence in getattr(self, '_sentences', []):
+            sentence._share_buffer(buffer, offset + sentence.start)
+
+    def _make_sentence(self, start, end):
+        """Create the :class:`Sentence` between two offsets in this text passage. Its text is a view of the text of
+        this passage."""
+        sentence = Sentence(
+            text='',
+            start=start,
+            end=end,
+            word_tokenizer=self.word_tokenizer,
+            lexicon=self.lexicon,
+            abbreviation_detector=self.abbreviation_detector,
+            pos_tagger=self.pos_tagger,
+            ner_tagger=self.ner_tagger,
+            document=self.document,
+            models=self.models,
+            device=self.device
+        )
+        sentence._share_buffer(self._buffer, self._offset + start, end - start)
+        return sentence
 
     @property
     def raw_sentences(self):
@@ -328,6 +380,18 @@ class Text(collections.Sequence, BaseText):
         """
         return [ab for sent in self.sentences for ab in sent.abbreviation_definitions if ab != []]
 
+    @memoized_property
+    def abbreviation_map(self):
+        """
+        A dictionary mapping each abbreviation defined in this text to its long form. The first definition of an
+        abbreviation is used.
+        """
+        definitions = {}
+        for sent in self.sentences:
+            for abbr, long in sent.abbreviation_map.items():
+                definitions.setdefault(abbr, long)
+        return definitions
+
     @property
     def records(self):
         """All records found in the object, as a list of :class:`~batterydataextractor.model.base.BaseModel`."""
@@ -484,53 +548,87 @@ class Sentence(BaseText, ABC):
         self.start = start
         #: The end index of this sentence within the text passage.
         self.end = end if end is not None else len(text)
+        # Records already found by each parser, e.g. in a batch by Document.extract
+        self._parsed_records = {}
 
     def __repr__(self):
-        return '%s(%r, %r, %r)' % (self.__class__.__name__, self._text, self.start, self.end)
+        return '%s(%r, %r, %r)' % (self.__class__.__name__, self.text, self.start, self.end)
+
+    def release(self, keep_tokens=False):
+        """Drop the tokens of this sentence and their annotations, to free memory. They are computed again if they are
+        used later.
+        :param bool keep_tokens: (Optional) Whether to keep the tokens, and only drop their tags, abbreviations and
+            chemical entity mentions.
+        """
+        for attr in ('_abbreviation_spans', '_abbreviation_definitions', '_abbreviation_map', '_cems'):
+            self.__dict__.pop(attr, None)
+        self._parsed_records.clear()
+        if keep_tokens:
+            table = self.__dict__.get('_token_table')
+            if table is not None:
+                table._pos = table._ner = None
+        else:
+            self.__dict__.pop('_token_table', None)
 
     @memoized_property
+    def token_table(self):
+        """The :class:`TokenTable` that stores the offsets and tags of the tokens in this sentence."""
+        return TokenTable(self, self.word_tokenizer.span_tokenize(self.text))
+
+    @property
     def tokens(self):
-        spans = self.word_tokenizer.span_tokenize(self.text)
-        toks = [Token(
-            text=self.text[span[0]:span[1]],
-            start=span[0] + self.start,
-            end=span[1] + self.start,
-            lexicon=self.lexicon
-        ) for span in spans]
-        return toks
+        """A sequence of the :class:`Token` s in this sentence, created when they are accessed."""
+        return self.token_table
 
     @property
     def raw_tokens(self):
         """A list of :class:`str` representations for the tokens in the object."""
-        return [token.text for token in self.tokens]
+        return self.token_table.texts()
 
-    @memoized_property
+    @property
     def pos_tagged_tokens(self):
         """A list of (:class:`Token` token, :class:`str` tag) tuples for each sentence in this sentence."""
-        # log.debug('Getting pos tags')
-        return self.pos_tagger.tag(self.raw_tokens)
+        return list(zip(self.raw_tokens, self.pos_tags))
 
     @property
     def pos_tags(self):
         """A list of :class:`str` part of speech tags for each sentence in this sentence."""
-        return [tag for token, tag in self.pos_tagged_tokens]
+        table = self.token_table
+        if table.pos_tags is None:
+            # log.debug('Getting pos tags')
+            table.pos_tags = [tag for token, tag in self.pos_tagger.tag(self.raw_tokens)]
+        return table.pos_tags
 
-    @memoized_property
+    @property
     def unprocessed_ner_tagged_tokens(self):
         """
         A list of (:class:`Token` token, :class:`str` named entity recognition tag)
         from the text.
         No corrections from abbreviation detection are performed.
         """
-        return self.ner_tagger.tag(self.pos_tagged_tokens)
+        return list(zip(self.raw_tokens, self.unprocessed_ner_tags))
 
-    @memoized_property
+    @property
     def unprocessed_ner_tags(self):
         """
         A list of :class:`str` unprocessed named entity tags for the tokens in this sentence.
         No corrections from abbreviation detection are performed.
         """
-        return [tag for token, tag in self.unprocessed_ner_tagged_tokens]
+        table = self.token_table
+        if table.ner_tags is None:
+            table.ner_tags = [tag for token, tag in self.ner_tagger.tag(self.pos_tagged_tokens)]
+        return table.ner_tags
+
+    @memoized_property
+    def abbreviation_spans(self):
+        """
+        The (abbreviation spans, long form spans) found by the :attr:`abbreviation_detector` in the tokens of this
+        sentence joined by spaces.
+        """
+        if not self.abbreviation_detector:
+            return [], []
+        log.debug('Detecting abbreviations')
+        return self.abbreviation_detector.detect_spans(self.raw_tokens)
 
     @memoized_property
     def abbreviation_definitions(self):
@@ -538,23 +636,27 @@ class Sentence(BaseText, ABC):
         A list of all abbreviation definitions in this Document. Each abbreviation is in the form
         (:class:`str` abbreviation, :class:`str` long form of abbreviation, :class:`str` ner_tag)
         """
-        abbreviations, long_words = [], []
-        if self.abbreviation_detector:
-            log.debug('Detecting abbreviations')
-            abbr_spans, long_spans = self.abbreviation_detector.detect_spans(self.raw_tokens)
-            if abbr_spans:
-                for abbr_span in abbr_spans:
-                    abb = " ".join(self.raw_tokens)[abbr_span[0]:abbr_span[1]]
-                    abbr = ("Abbr: ", abb)
-                    abbreviations.append(abbr)
-            if long_spans:
-                for long_span in long_spans:
-                    lon = " ".join(self.raw_tokens)[long_span[0]:long_span[1]]
-                    long = ("LF: ", lon)
-                    long_words.append(long)
-        return abbreviations, long_words
+        abbr_spans, long_spans = self.abbreviation_spans
+        doc = " ".join(self.raw_tokens)
+        return [("Abbr: ", doc[start:end]) for start, end in abbr_spans], \
+            [("LF: ", doc[start:end]) for start, end in long_spans]
 
     @memoized_property
+    def abbreviation_map(self):
+        """
+        A dictionary of the abbreviations defined in this sentence, mapping each abbreviation to the nearest long form
+        found in the sentence.
+        """
+        abbr_spans, long_spans = self.abbreviation_spans
+        doc = " ".join(self.raw_tokens)
+        definitions = {}
+        for start, end in abbr_spans:
+            if long_spans:
+                long_start, long_end = min(long_spans, key=lambda span: max(span[0] - end, start - span[1]))
+                definitions.setdefault(doc[start:end], doc[long_start:long_end])
+        return definitions
+
+    @property
     def ner_tagged_tokens(self):
         """
         A list of (:class:`Token` token, :class:`str` named entity recognition tag)
@@ -562,7 +664,7 @@ class Sentence(BaseText, ABC):
         """
         return list(zip(self.raw_tokens, self.ner_tags))
 
-    @memoized_property
+    @property
     def ner_tags(self):
         """
         A list of named entity tags corresponding to each of the tokens in the object.
@@ -576,20 +678,31 @@ class Sentence(BaseText, ABC):
     @memoized_property
     def cems(self):
         """
-        A list of all Chemical Entity Mentions in this text as :class:`~batterydataextractor.doc.text.Span`
+        A list of all Chemical Entity Mentions in this text as :class:`~batterydataextractor.doc.text.Span`.
+        Consecutive tokens tagged as materials are merged into a single span.
         """
         log.debug('Getting cems')
         spans = []
-        raw_tokens = self.raw_tokens
-        for index, result in enumerate(self.ner_tags):
-            if result == 'MAT':
-                ner_word = raw_tokens[index].replace("(", "\\(").replace(")", "\\)")
-                span = Span(text=raw_tokens[index], start=re.search(ner_word, self.text).start() + self.start,
-                            end=re.search(ner_word, self.text).end() + self.start)
-                spans.append(span)
+        start = end = None
+        table = self.token_table
+        for token_start, token_end, tag in zip(table.starts, table.ends, self.ner_tags):
+            if tag == 'MAT':
+                if start is None:
+                    start = token_start
+                end = token_end
+            elif start is not None:
+                spans.append(self._make_span(start, end))
+                start = None
+        if start is not None:
+            spans.append(self._make_span(start, end))
         return spans
 
-    @memoized_property
+    def _make_span(self, start, end):
+        """Return the :class:`Span` between offsets within this sentence, with offsets in the containing text."""
+        return Span(text=self._buffer[self._offset + start:self._offset + end], start=start + self.start,
+                    end=end + self.start)
+
+    @property
     def tags(self):
         tags = self.pos_tags
         for i, tag in enumerate(self.ner_tags):
@@ -605,18 +718,25 @@ class Sentence(BaseText, ABC):
         """
         return list(zip(self.raw_tokens, self.tags))
 
+    @property
+    def parser_tokens(self):
+        """The tagged tokens passed to the parsers, with any control characters removed."""
+        # Ensure no control characters are sent to a parser (need to be XML compatible)
+        return [(CONTROL_RE.sub('', token), tag) for token, tag in self.tagged_tokens]
+
     @property
     def records(self):
         """All records found in the object, as a list of :class:`~batterydataextractor.model.base.BaseModel`."""
         records = ModelList()
-        # Ensure no control characters are sent to a parser (need to be XML compatible)
-        tagged_tokens = [(CONTROL_RE.sub('', token), tag) for token, tag in self.tagged_tokens]
+        tagged_tokens = self.parser_tokens
         for model in self._streamlined_models:
             for parser in model.parsers:
                 if hasattr(parser, 'parse_sentence'):
-                    for record in parser.parse_sentence(tagged_tokens):
-                        p = record.serialize()
-                        if not p:  # TODO: Potential performance issues?
+                    parsed = self._parsed_records.get(parser)
+                    if parsed is None:
+                        parsed = parser.parse_sentence(tagged_tokens)
+                    for record in parsed:
+                        if record.is_empty:
                             continue
                         # Skip duplicate records
                         if record in records:
@@ -702,11 +822,116 @@ class Token(Span):
         :param Lexicon lexicon: The lexicon which contains this token.
         """
         super(Token, self).__init__(text, start, end)
-        #: The lexicon for this token.
+        #: The lexicon for this token. Its features are only added to the lexicon when :attr:`lex` is first used.
         self.lexicon = lexicon
-        self.lexicon.add(text)
 
     @property
     def lex(self):
         """The corresponding :class:`batterydataextractor.nlp.lexicon.Lexeme` entry in the Lexicon for this token."""
         return self.lexicon[self.text]
+
+
+class TokenTable(collections.Sequence):
+    """Compact storage of the tokens of a sentence.
+    The token offsets and the ids of their part of speech and named entity tags are kept in arrays, and each
+    :class:`Token` is only created when it is accessed. Tag ids are shared by all tables. Once :attr:`max_tags` tags
+    have ids, e.g. for a tagger whose tags are not a fixed set, tables with other tags keep a plain list of them.
+    """
+
+    __slots__ = ('sentence', 'starts', 'ends', '_pos', '_ner')
+
+    #: The maximum number of distinct tags given ids, at most 65536 as ids are stored as unsigned shorts.
+    max_tags = 4096
+    #: All tags given ids so far, indexed by their id.
+    _tags = [None]
+    _tag_ids = {None: 0}
+    _lock = threading.Lock()
+
+    def __init__(self, sentence, spans):
+        """
+        :param Sentence sentence: The sentence containing the tokens.
+        :param list(tuple(int, int)) spans: The start and end offsets of the tokens within the sentence.
+        """
+        self.sentence = sentence
+        #: The start offsets of the tokens within the sentence.
+        self.starts = array('i', [span[0] for span in spans])
+        #: The end offsets of the tokens within the sentence.
+        self.ends = array('i', [span[1] for span in spans])
+        self._pos = None
+        self._ner = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        sentence = self.sentence
+        start, end = self.starts[index], self.ends[index]
+        text = sentence._buffer[sentence._offset + start:sentence._offset + end]
+        return Token(text=text, start=start + sentence.start, end=end + sentence.start, lexicon=sentence.lexicon)
+
+    def __eq__(self, other):
+        if isinstance(other, (TokenTable, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def texts(self):
+        """Return a list of the text of each token."""
+        buffer, offset = self.sentence._buffer, self.sentence._offset
+        return [buffer[offset + start:offset + end] for start, end in zip(self.starts, self.ends)]
+
+    @classmethod
+    def _encode(cls, tags):
+        """Return an array of the ids of a list of tags, giving new tags the next free id. If there are no free ids
+        left, return a copy of the list of tags instead."""
+        ids = array('H')
+        for tag in tags:
+            tag_id = cls._tag_ids.get(tag)
+            if tag_id is None:
+                with cls._lock:
+                    tag_id = cls._tag_ids.get(tag)
+                    if tag_id is None:
+                        if len(cls._tags) >= min(cls.max_tags, 65536):
+                            return list(tags)
+                        tag_id = cls._tag_ids[tag] = len(cls._tags)
+                        cls._tags.append(tag)
+            ids.append(tag_id)
+        return ids
+
+    @classmethod
+    def _decode(cls, ids):
+        """Return the list of tags for an array of tag ids, or a copy of a list of tags stored as they are."""
+        if ids is None:
+            return None
+        if isinstance(ids, list):
+            return list(ids)
+        tags = cls._tags
+        return [tags[i] for i in ids]
+
+    @property
+    def pos_tags(self):
+        """A list of the part of speech tag of each token, or None if the tokens have not been tagged yet."""
+        return self._decode(self._pos)
+
+    @pos_tags.setter
+    def pos_tags(self, tags):
+        self._pos = self._encode(tags)
+
+    @property
+    def ner_tags(self):
+        """A list of the named entity tag of each token, or None if the tokens have not been tagged yet."""
+        return self._decode(self._ner)
+
+    @ner_tags.setter
+    def ner_tags(self, tags):
+        self._ner = self._encode(tags)
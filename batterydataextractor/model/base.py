@@ -7,20 +7,33 @@ Data model for extracted information.
 """
 import copy
 from abc import ABCMeta
-from collections import MutableSequence
+from collections import MutableSequence, OrderedDict, Sequence
 import json
 import csv
 import logging
 
 import six
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 log = logging.getLogger(__name__)
 
 
+def json_bytes(data):
+    """Encode data as compact UTF-8 JSON, with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
 class BaseType(six.with_metaclass(ABCMeta)):
 
-    # This is assigned by ModelMeta to match the attribute on the Model
+    # These are assigned by ModelMeta to match the attribute on the Model and its position in the field order
     name = None
+    index = None
 
     def __init__(
             self,
@@ -67,15 +80,15 @@ class BaseType(six.with_metaclass(ABCMeta)):
         if instance is None:
             return self
         # Get value from Model instance if available
-        value = instance._values.get(self.name)
-        # If value is None or empty string then return the default value, if set
-        # if value in [None, ''] and self.default is not None:
-        #     return self.default
-        return value
+        try:
+            return instance._values[self.index]
+        except IndexError:
+            # Field was added to the Model after this instance was created
+            return None
 
     def __set__(self, instance, value):
         """Descriptor for assigning a value to a field in a Model."""
-        instance._values[self.name] = self.process(value)
+        _set_value(instance, self.index, self.process(value))
 
     def process(self, value):
         """Convert an assigned value into the desired data format for this field."""
@@ -133,22 +146,98 @@ class ListType(BaseType):
         """Descriptor for assigning a value to a ListField in a Model."""
         # Run process for the nested field type for each value in list
         if value is None:
-            instance._values[self.name] = None
+            _set_value(instance, self.index, None)
         else:
             processed = [self.field.process(v) for v in value]
             if self.sorted:
                 processed = sorted(processed)
-            instance._values[self.name] = [
-                self.field.process(v) for v in value]
+            _set_value(instance, self.index, processed)
 
     def serialize(self, value, primitive=False):
         """Serialize this field."""
         return [self.field.serialize(v, primitive=primitive) for v in value]
 
 
+def _set_value(instance, index, value):
+    """Store the value of the field at index on a Model instance."""
+    try:
+        instance._values[index] = value
+    except IndexError:
+        # Field was added to the Model after this instance was created
+        instance._values.extend([None] * (index + 1 - len(instance._values)))
+        instance._values[index] = value
+
+
+#: Types of default values that are safe to share between Model instances without copying
+IMMUTABLE_TYPES = (six.text_type, six.binary_type, bool, int, float, tuple, frozenset)
+
+
+#: Serialized values that are left out of the output unless the field is null
+EMPTY_VALUES = [None, '', []]
+
+
+def _compile_serializers(cls):
+    """
+    Generate the serialize and is_empty functions for a Model class.
+    String and float fields, and lists of them, are inlined, other fields go through their serialize method.
+    """
+    fields = list(six.itervalues(cls.fields))
+    header = [
+        '    values = self._values',
+        '    if len(values) < %d:' % len(fields),
+        '        values = values + [None] * (%d - len(values))' % len(fields),
+    ]
+    serialize_lines = ['def serialize(self, primitive=False):'] + header + ['    data = {}']
+    empty_lines = ['def is_empty(self):'] + header
+    for index, field in enumerate(fields):
+        name = repr(field.name)
+        simple = type(field) in (StringType, FloatType)
+        simple_list = type(field) is ListType and type(field.field) in (StringType, FloatType)
+        serialize_lines.append('    v = values[%d]' % index)
+        if field.null and simple:
+            serialize_lines.append('    data[%s] = v' % name)
+        elif field.null:
+            serialize_lines.append('    data[%s] = fields[%d].serialize(v, primitive) if v is not None else v'
+                                   % (name, index))
+        elif simple:
+            serialize_lines.append("    if v is not None and v != '':")
+            serialize_lines.append('        data[%s] = v' % name)
+        elif simple_list:
+            serialize_lines.append('    if v:')
+            serialize_lines.append('        data[%s] = list(v)' % name)
+        else:
+            serialize_lines.append('    if v is not None:')
+            serialize_lines.append('        v = fields[%d].serialize(v, primitive)' % index)
+            serialize_lines.append('    if v not in EMPTY_VALUES:')
+            serialize_lines.append('        data[%s] = v' % name)
+    serialize_lines.append('    return {%r: data}' % cls.__name__)
+    # A record is empty if none of its fields would appear in the serialized output
+    for index, field in enumerate(fields):
+        simple = type(field) in (StringType, FloatType)
+        simple_list = type(field) is ListType and type(field.field) in (StringType, FloatType)
+        if field.null:
+            empty_lines.append('    return False')
+            break
+        elif simple:
+            empty_lines.append("    if values[%d] is not None and values[%d] != '':" % (index, index))
+        elif simple_list:
+            empty_lines.append('    if values[%d]:' % index)
+        else:
+            empty_lines.append('    if values[%d] is not None and fields[%d].serialize(values[%d]) not in EMPTY_VALUES:'
+                               % (index, index, index))
+        empty_lines.append('        return False')
+    else:
+        empty_lines.append('    return True')
+    namespace = {'fields': fields, 'EMPTY_VALUES': EMPTY_VALUES}
+    six.exec_('\n'.join(serialize_lines) + '\n\n\n' + '\n'.join(empty_lines) + '\n', namespace)
+    return namespace['serialize'], namespace['is_empty']
+
+
 class ModelMeta(ABCMeta):
     """"""
     def __new__(mcs, name, bases, attrs):
+        # Model instances only store their values list, so they don't need a __dict__
+        attrs.setdefault('__slots__', ())
         cls = super(ModelMeta, mcs).__new__(mcs, name, bases, attrs)
         fields = {}
         for field_name, field in six.iteritems(cls.fields):
@@ -168,12 +257,45 @@ class ModelMeta(ABCMeta):
         cls.parsers = parsers
         return cls
 
+    def __init__(cls, name, bases, attrs):
+        super(ModelMeta, cls).__init__(name, bases, attrs)
+        cls._index_fields()
+
     def __setattr__(cls, key, value):
         if isinstance(value, BaseType):
             value.name = six.text_type(key)
             cls.fields[key] = value
+            super(ModelMeta, cls).__setattr__(key, value)
+            cls._index_fields()
+            return
         return super(ModelMeta, cls).__setattr__(key, value)
 
+    def _index_fields(cls):
+        """
+        Precompute the field order and the initial values list for new instances.
+        Immutable defaults are processed once here and shared, all other defaults are copied for each instance.
+        """
+        defaults = []
+        copied_defaults = []
+        for index, (field_name, field) in enumerate(six.iteritems(cls.fields)):
+            field.index = index
+            # Inherited fields are copied, so also index the descriptor that is actually on the class
+            descriptor = getattr(cls, field_name, None)
+            if isinstance(descriptor, BaseType):
+                descriptor.index = index
+            if (field.default is None or isinstance(field.default, IMMUTABLE_TYPES)) \
+                    and type(field).__set__ is BaseType.__set__:
+                defaults.append(field.process(field.default))
+            else:
+                defaults.append(None)
+                copied_defaults.append((field_name, field.default))
+        type.__setattr__(cls, '_field_names', tuple(cls.fields))
+        type.__setattr__(cls, '_defaults', tuple(defaults))
+        type.__setattr__(cls, '_copied_defaults', tuple(copied_defaults))
+        serialize, is_empty = _compile_serializers(cls)
+        type.__setattr__(cls, '_serialize_fields', serialize)
+        type.__setattr__(cls, '_is_empty', is_empty)
+
     @property
     def required_fields(cls):
         output = []
@@ -191,20 +313,23 @@ class ModelMeta(ABCMeta):
 class BaseModel(six.with_metaclass(ModelMeta)):
     """"""
 
+    __slots__ = ('_values',)
     fields = {}
     parsers = []
-    defined_names = ['']
     specifier = None
+    #: Extraction options read by the parsers of this model, e.g. the property names to look for.
+    options = {}
 
     def __init__(self, **raw_data):
         """"""
-        self._values = {}
+        # Values are stored in a list in the order of _field_names, starting from the shared immutable defaults
+        self._values = list(self._defaults)
         for key, value in six.iteritems(raw_data):
             setattr(self, key, value)
-        # Set defaults
-        for key, field in six.iteritems(self.fields):
+        # Set mutable defaults
+        for key, default in self._copied_defaults:
             if key not in raw_data:
-                setattr(self, key, copy.copy(field.default))
+                setattr(self, key, copy.copy(default))
 
     @property
     def is_unidentified(self):
@@ -229,7 +354,6 @@ class BaseModel(six.with_metaclass(ModelMeta)):
         # TODO: Check this actually works as expected (what about default
         # values?)
         if isinstance(other, self.__class__):
-            log.debug(self._values, other._values)
             return self._values == other._values
         return False
 
@@ -269,6 +393,25 @@ class BaseModel(six.with_metaclass(ModelMeta)):
     def __hash__(self):
         return str(self.serialize()).__hash__()
 
+    @classmethod
+    def configure(cls, **options):
+        """
+        Create a configured version of this model, leaving the model class itself untouched.
+
+        The returned class is a subclass with the same name and its own copies of the parsers, so that documents
+        with different extraction settings can be processed side by side.
+
+        Usage::
+            capacity = PropertyData.configure(defined_names=['capacity'], confidence_threshold=0.1)
+            doc.add_models([capacity])
+
+        :param options: Extraction options that override those in :attr:`options`.
+        :returns: A subclass of this model with the updated options.
+        :rtype: type
+        """
+        attrs = {'__module__': cls.__module__, 'options': dict(cls.options, **options)}
+        return type(cls)(cls.__name__, (cls,), attrs)
+
     @classmethod
     def reset_updatables(cls):
         """
@@ -351,27 +494,27 @@ class BaseModel(six.with_metaclass(ModelMeta)):
                 return False
         return True
 
+    @property
+    def is_empty(self):
+        """
+        Whether no fields of this model have been set, i.e. the serialized model contains no data.
+        This is much cheaper than checking the output of :meth:`serialize`.
+        """
+        return self._is_empty()
+
     def serialize(self, primitive=False):
         """Convert Model to python dictionary."""
-        # Serialize fields to a dict
-        data = {}
-        for field_name in self:
-            value = getattr(self, field_name)
-            field = self.fields.get(field_name)
-            if value is not None:
-                value = field.serialize(value, primitive=primitive)
-            # Skip empty fields unless field.null
-            if not field.null and value in [None, '', []]:
-                continue
-            data[field.name] = value
-        record = {self.__class__.__name__: data}
-        # print(record)
-        return record
+        # Empty fields are skipped unless field.null, see _compile_serializers for the generated code
+        return self._serialize_fields(primitive)
 
     def to_json(self, *args, **kwargs):
         """Convert Model to JSON."""
         return json.dumps(self.serialize(primitive=True), *args, **kwargs)
 
+    def to_json_bytes(self):
+        """Convert Model to compact UTF-8 encoded JSON. Uses orjson if it is installed."""
+        return json_bytes(self.serialize(primitive=True))
+
     def to_database(self, file_name, file_type='json'):
         """
         Save the document to a file in the database.
@@ -414,8 +557,9 @@ class BaseModel(six.with_metaclass(ModelMeta)):
         :rtype: BaseModel
         """
 
-        log.debug(self.serialize())
-        log.debug(other.serialize())
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(self.serialize())
+            log.debug(other.serialize())
         if self.contextual_fulfilled:
             return self
         if isinstance(other, type(self)):
@@ -461,8 +605,9 @@ class BaseModel(six.with_metaclass(ModelMeta)):
         :rtype: BaseModel
         """
 
-        log.debug(self.serialize())
-        log.debug(other.serialize())
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(self.serialize())
+            log.debug(other.serialize())
         if isinstance(other, type(self)):
             # Check if the other seems to be describing the same thing as self.
             match = True
@@ -519,9 +664,6 @@ class ModelList(MutableSequence):
         return self.models.__str__()
 
     def __contains__(self, element):
-        log.debug(element.serialize())
-        log.debug(self.serialize())
-        log.debug(self.models.__contains__(element))
         return self.models.__contains__(element)
 
     def insert(self, index, value):
@@ -534,3 +676,147 @@ class ModelList(MutableSequence):
     def to_json(self, *args, **kwargs):
         """Convert ModelList to JSON."""
         return json.dumps(self.serialize(), *args, **kwargs)
+
+    def to_json_bytes(self):
+        """Convert ModelList to compact UTF-8 encoded JSON. Uses orjson if it is installed."""
+        return json_bytes([e.serialize(primitive=True) for e in self.models])
+
+    def to_columnar(self):
+        """
+        Group the models by class into :class:`ColumnarModelList` s.
+
+        :returns: Columnar lists keyed by model class, in order of first appearance.
+        :rtype: OrderedDict[type, ColumnarModelList]
+        """
+        columnar = OrderedDict()
+        for model in self.models:
+            model_class = type(model)
+            if model_class not in columnar:
+                columnar[model_class] = ColumnarModelList(model_class)
+            columnar[model_class].append(model)
+        return columnar
+
+
+class ColumnarModelList(Sequence):
+    """
+    Compact store for many records of a single model class. Each field is kept as one list of values,
+    and records are accessed through lightweight :class:`ModelRow` views instead of Model instances.
+    """
+
+    def __init__(self, model, *models):
+        """
+        :param type model: The model class of the records.
+        :param models: (Optional) Records to add.
+        """
+        self.model = model
+        #: One list of values per field, in the field order of the model.
+        self.columns = OrderedDict((field_name, []) for field_name in model._field_names)
+        self._length = 0
+        for m in models:
+            self.append(m)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ColumnarModelList(self.model, *[self.to_model(i) for i in range(*index.indices(self._length))])
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('ColumnarModelList index out of range')
+        return ModelRow(self, index)
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return '<%s: %s %s records>' % (self.__class__.__name__, self._length, self.model.__name__)
+
+    def append(self, model):
+        """Add a record to the end of the columns."""
+        if not isinstance(model, self.model):
+            raise TypeError('Expected a %s, got a %s' % (self.model.__name__, type(model).__name__))
+        values = model._values
+        for index, column in enumerate(six.itervalues(self.columns)):
+            column.append(values[index] if index < len(values) else None)
+        self._length += 1
+
+    def extend(self, models):
+        """Add several records to the end of the columns."""
+        for model in models:
+            self.append(model)
+
+    def column(self, field_name):
+        """The list of values of a field for all records."""
+        return self.columns[field_name]
+
+    def to_model(self, index):
+        """Create a Model instance for the record at index."""
+        model = self.model.__new__(self.model)
+        model._values = [column[index] for column in six.itervalues(self.columns)]
+        return model
+
+    def to_models(self):
+        """Convert to a :class:`ModelList` of Model instances."""
+        return ModelList(*[self.to_model(i) for i in range(self._length)])
+
+    def serialize(self):
+        """Serialize to a list of python dictionaries."""
+        return [self.to_model(i).serialize() for i in range(self._length)]
+
+    def to_json(self, *args, **kwargs):
+        """Convert ColumnarModelList to JSON."""
+        return json.dumps(self.serialize(), *args, **kwargs)
+
+
+class ModelRow(object):
+    """A read-only view of a single record in a :class:`ColumnarModelList`."""
+
+    __slots__ = ('_columnar', '_index')
+
+    def __init__(self, columnar, index):
+        self._columnar = columnar
+        self._index = index
+
+    def __repr__(self):
+        return '<%s row %s>' % (self._columnar.model.__name__, self._index)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._columnar.columns[name][self._index]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, key):
+        return self._columnar.columns[key][self._index]
+
+    def __iter__(self):
+        return iter(self._columnar.columns)
+
+    def __eq__(self, other):
+        if isinstance(other, ModelRow):
+            return self.to_model() == other.to_model()
+        if isinstance(other, BaseModel):
+            return self.to_model() == other
+        return False
+
+    def keys(self):
+        return list(self._columnar.columns)
+
+    def items(self):
+        return [(k, column[self._index]) for k, column in six.iteritems(self._columnar.columns)]
+
+    def values(self):
+        return [column[self._index] for column in six.itervalues(self._columnar.columns)]
+
+    def get(self, key, default=None):
+        column = self._columnar.columns.get(key)
+        return column[self._index] if column is not None else default
+
+    def to_model(self):
+        """Create a Model instance for this record."""
+        return self._columnar.to_model(self._index)
+
+    def serialize(self, primitive=False):
+        """Convert the record to a python dictionary."""
+        return self.to_model().serialize(primitive=primitive)
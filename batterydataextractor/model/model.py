@@ -21,12 +21,14 @@ class Compound(BaseModel):
 
     def merge(self, other):
         """Merge data from another Compound into this Compound."""
-        log.debug('Merging: %s and %s' % (self.serialize(), other.serialize()))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('Merging: %s and %s' % (self.serialize(), other.serialize()))
         for k in self.keys():
             for new_item in other[k]:
                 if new_item not in self[k]:
                     self[k].append(new_item)
-        log.debug('Result: %s' % self.serialize())
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('Result: %s' % self.serialize())
         return self
 
     @property
@@ -56,6 +58,7 @@ class PropertyData(BaseModel):
     original_text = StringType(contextual=False)
     device = FloatType(contextual=False)
     parsers = [BertMaterialParser()]
+    options = {'defined_names': [''], 'confidence_threshold': 0, 'original_text': False, 'device': -1}
 
 
 class GeneralInfo(BaseModel):
@@ -65,3 +68,5 @@ class GeneralInfo(BaseModel):
     original_text = StringType(contextual=False)
     device = FloatType(contextual=False)
     parsers = [BertGeneralParser()]
+    options = {'defined_names': [''], 'confidence_threshold': 0, 'original_text': False, 'self_defined': False,
+               'device': -1}
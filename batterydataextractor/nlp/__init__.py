@@ -2,4 +2,5 @@ from .tag import BertTagger, BaseTagger
 from .cem import BertCemTagger, CemTagger
 from .abbrev import AbbreviationDetector
 from .lexicon import ChemLexicon
-from .tokenize import SentenceTokenizer, ChemSentenceTokenizer, ChemWordTokenizer, FineWordTokenizer, WordTokenizer
+from .tokenize import SentenceTokenizer, ChemSentenceTokenizer, RegexSentenceTokenizer, ChemRegexSentenceTokenizer, \
+    ChemWordTokenizer, FineWordTokenizer, WordTokenizer, TokenizationCache
@@ -13,20 +13,18 @@ import six
 class AbbreviationDetector(six.with_metaclass(ABCMeta)):
     """"""
 
+    #: Number of sentences passed to the model at once by :meth:`detect_spans_many`
+    batch_size = 32
+
     def __init__(self, model_name="batterydata/bde-abbrev-batteryonlybert-cased-base", device=None):
         self.tokenizer = AutoTokenizer.from_pretrained(model_name, model_max_length=512)
         self.device = device if device else -1
         self.model = pipeline('token-classification', model_name, tokenizer=self.tokenizer,
                               aggregation_strategy='simple', device=self.device)
 
-    def detect_spans(self, tokens):
-        """
-        Detects abbreviations in a list of tokens.
-
-        :param tokens: a list of tokens
-        :return:
-        """
-        results = self.model(" ".join(tokens))
+    @staticmethod
+    def _entity_spans(results):
+        """Return the spans of the abbreviations and long forms in the entities found by the model."""
         long, short = [], []
         for entity in results:
             if entity['entity_group'] == 'long':
@@ -35,6 +33,35 @@ class AbbreviationDetector(six.with_metaclass(ABCMeta)):
                 short.append((entity['start'], entity['end']))
         return short, long
 
+    def detect_spans(self, tokens):
+        """
+        Detects abbreviations in a list of tokens.
+
+        :param tokens: a list of tokens
+        :return:
+        """
+        return self._entity_spans(self.model(" ".join(tokens)))
+
+    def detect_spans_many(self, token_lists, batch_size=None):
+        """
+        Detects abbreviations in several lists of tokens, passing them to the model in batches of sentences of similar
+        length so little padding is needed.
+
+        :param list(list(str)) token_lists: a list of tokens for each sentence
+        :param int batch_size: (Optional) Number of sentences passed to the model at once. Default :attr:`batch_size`.
+        :return: the (abbreviation spans, long form spans) of each sentence, as returned by :meth:`detect_spans`
+        """
+        batch_size = batch_size or self.batch_size
+        texts = [" ".join(tokens) for tokens in token_lists]
+        spans = [([], []) for _ in texts]
+        order = sorted((i for i, text in enumerate(texts) if text.strip()), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            results = self.model([texts[i] for i in batch], batch_size=len(batch))
+            for i, result in zip(batch, results):
+                spans[i] = self._entity_spans(result)
+        return spans
+
     def detect(self, tokens):
         short_words = []
         long_words = []
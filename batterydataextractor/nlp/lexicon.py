@@ -4,10 +4,12 @@ batterydataextractor.nlp.lexicon
 
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 Cache features of previously seen words. (No Brown word clusters)
-When processing documents, BDE adds each unique word that it encounters to the Lexicon as a Lexeme.
+When the features of a token are first used, BDE adds its word to the Lexicon as a Lexeme.
 Each Lexeme stores various word features, so they don’t have to be re-calculated for every occurrence of that word.
 """
+from collections import OrderedDict
 import logging
+import threading
 
 import six
 
@@ -75,53 +77,79 @@ class Lexicon(six.with_metaclass(Singleton)):
 
     #: The Normalizer for this Lexicon.
     normalizer = Normalizer()
+    #: The maximum number of lexemes stored, or None for no limit. The least recently used lexemes are removed first.
+    #: There is only one instance of each Lexicon class, which is created when :mod:`batterydataextractor.doc.text`
+    #: is imported, so set this on a subclass or on the instance, e.g. ``ChemLexicon().max_size = 100000``.
+    max_size = None
 
     def __init__(self):
         """"""
-        self.lexemes = {}
+        self.lexemes = OrderedDict()
+        self._lock = threading.RLock()
 
     def __len__(self):
         """The current number of lexemes stored."""
         return len(self.lexemes)
 
+    def __contains__(self, text):
+        return text in self.lexemes
+
     def add(self, text):
         """Add text to the lexicon.
         :param string text: The text to add.
         """
-        # logging.debug('Adding to lexicon: %s' % text)
-        if text not in self.lexemes:
-            normalized = self.normalized(text)
-            self.lexemes[text] = Lexeme(
-                text=text,
-                normalized=normalized,
-                lower=self.lower(normalized),
-                first=self.first(normalized),
-                suffix=self.suffix(normalized),
-                shape=self.shape(normalized),
-                length=self.length(normalized),
-                upper_count=self.upper_count(normalized),
-                lower_count=self.lower_count(normalized),
-                digit_count=self.digit_count(normalized),
-                is_alpha=self.is_alpha(normalized),
-                is_ascii=self.is_ascii(normalized),
-                is_digit=self.is_digit(normalized),
-                is_lower=self.is_lower(normalized),
-                is_upper=self.is_upper(normalized),
-                is_title=self.is_title(normalized),
-                is_punct=self.is_punct(normalized),
-                is_hyphenated=self.is_hyphenated(normalized),
-                like_url=self.like_url(normalized),
-                like_number=self.like_number(normalized),
-            )
+        self[text]
 
     def __getitem__(self, text):
-        """Return the requested lexeme from the Lexicon.
+        """Return the requested lexeme from the Lexicon, adding it if it is not stored yet.
         :param string text: Text of the lexeme to retrieve.
         :rtype: Lexeme
         :returns: The requested Lexeme.
         """
-        self.add(text)
-        return self.lexemes[text]
+        with self._lock:
+            lexeme = self.lexemes.get(text)
+            if lexeme is not None:
+                if self.max_size is not None:
+                    self.lexemes.move_to_end(text)
+                return lexeme
+        lexeme = self._make_lexeme(text)
+        with self._lock:
+            lexeme = self.lexemes.setdefault(text, lexeme)
+            if self.max_size is not None:
+                while len(self.lexemes) > self.max_size:
+                    self.lexemes.popitem(last=False)
+        return lexeme
+
+    def clear(self):
+        """Remove all lexemes, e.g. once a batch of documents has been processed."""
+        with self._lock:
+            self.lexemes.clear()
+
+    def _make_lexeme(self, text):
+        """Compute the features of text."""
+        normalized = self.normalized(text)
+        return Lexeme(
+            text=text,
+            normalized=normalized,
+            lower=self.lower(normalized),
+            first=self.first(normalized),
+            suffix=self.suffix(normalized),
+            shape=self.shape(normalized),
+            length=self.length(normalized),
+            upper_count=self.upper_count(normalized),
+            lower_count=self.lower_count(normalized),
+            digit_count=self.digit_count(normalized),
+            is_alpha=self.is_alpha(normalized),
+            is_ascii=self.is_ascii(normalized),
+            is_digit=self.is_digit(normalized),
+            is_lower=self.is_lower(normalized),
+            is_upper=self.is_upper(normalized),
+            is_title=self.is_title(normalized),
+            is_punct=self.is_punct(normalized),
+            is_hyphenated=self.is_hyphenated(normalized),
+            like_url=self.like_url(normalized),
+            like_number=self.like_number(normalized),
+        )
 
     def normalized(self, text):
         """"""
@@ -6,13 +6,131 @@ batterydataextractor.nlp.tokenize
 Word and sentence tokenizers.
 """
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+import hashlib
 import logging
+import operator
 import re
+import sys
+import threading
+
 import six
 import spacy
 
+from ..utils import locked_memoize
+
 log = logging.getLogger(__name__)
 
+#: spaCy pipeline components that are not needed to find sentence boundaries
+SENTENCE_EXCLUDE = ('tagger', 'attribute_ruler', 'lemmatizer', 'ner')
+
+
+@locked_memoize
+def load_spacy(model, exclude=()):
+    """Load a spaCy pipeline without the excluded components. Each pipeline is only loaded once per process, even if
+    several threads first use it at the same time, and shared by all the tokenizers that use it.
+    :param string model: Name of or path to the spaCy pipeline.
+    :param tuple(str) exclude: (Optional) Names of components not to load.
+    """
+    log.debug('Loading spaCy pipeline %s without %s' % (model, ', '.join(exclude)))
+    return spacy.load(model, exclude=list(exclude))
+
+
+class TokenizationCache(object):
+    """Bounded least recently used cache of the spans found by tokenizers, keyed by a hash of the text.
+    Text that repeats verbatim across documents, such as copyright lines and reference strings, is then only
+    tokenized once. One cache can be shared by several tokenizers and threads.
+    Usage::
+        cache = TokenizationCache(max_size=100000, max_bytes=64 * 1024 * 1024)
+        Text.word_tokenizer = ChemWordTokenizer(cache=cache)
+        ...
+        print(cache.stats)
+    """
+
+    def __init__(self, max_size=100000, max_bytes=None):
+        """
+        :param int max_size: (Optional) Maximum number of texts kept. Default 100000.
+        :param int max_bytes: (Optional) Maximum estimated memory used by the cached spans, in bytes.
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        #: Estimated memory used by the cached spans, in bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(namespace, text):
+        """Return the cache key of a text for tokenizers that give the same spans, identified by ``namespace``."""
+        return namespace, hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    @staticmethod
+    def _entry_bytes(spans):
+        """Estimate the memory used by a cache entry."""
+        return 100 + sys.getsizeof(spans) + 64 * len(spans)
+
+    def get(self, key):
+        """Return a copy of the cached spans for a key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return list(entry[0])
+
+    def put(self, key, spans):
+        """Cache the spans for a key, evicting the least recently used entries if the cache is full."""
+        spans = tuple(spans)
+        nbytes = self._entry_bytes(spans)
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old[1]
+            self._entries[key] = (spans, nbytes)
+            self.size_bytes += nbytes
+            while len(self._entries) > self.max_size or (self.max_bytes is not None and
+                                                         self.size_bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted
+                self.evictions += 1
+
+    def span_tokenize(self, tokenizer, text, namespace):
+        """Return the spans of a text from the cache, or tokenize it with ``tokenizer`` and cache the spans."""
+        key = self.key(namespace, text)
+        spans = self.get(key)
+        if spans is None:
+            spans = list(tokenizer(text))
+            self.put(key, spans)
+        return spans
+
+    def clear(self):
+        """Remove all cached spans and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that were found in the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
+
+    @property
+    def stats(self):
+        """Number of entries, estimated memory, hits, misses, evictions and hit rate of the cache."""
+        return {'entries': len(self), 'bytes': self.size_bytes, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': self.hit_rate}
+
 
 class BaseTokenizer(six.with_metaclass(ABCMeta)):
     """Abstract base class from which all Tokenizer classes inherit.
@@ -50,6 +168,25 @@ class BaseTokenizer(six.with_metaclass(ABCMeta)):
         for s in strings:
             yield list(self.span_tokenize(s))
 
+    def span_tokenize_batch(self, strings, batch_size=None, n_process=1):
+        """Return the spans of the tokens in each string of ``strings``. Tokenizers that can process several strings
+        at once use the batch options, others apply ``span_tokenize`` to each string.
+        :param list(str) strings: A list of strings to tokenize.
+        :param int batch_size: (Optional) Number of strings processed at once.
+        :param int n_process: (Optional) Number of processes to use.
+        :rtype: iter(list(tuple(int, int)))
+        """
+        return self.span_tokenize_sents(strings)
+
+    @property
+    def _batch_key(self):
+        """Tokenizers with equal keys give the same spans, so their texts can be passed to one of them in a batch."""
+        return self
+
+
+#: Runs of characters between whitespace
+NON_WHITESPACE_RE = re.compile(r'\S+', re.U)
+
 
 def regex_span_tokenize(s, regex):
     """Return spans that identify tokens in s split using regex."""
@@ -66,22 +203,66 @@ class SentenceTokenizer(BaseTokenizer):
     """Sentence tokenizer from Spacy."""
 
     model = 'en_core_sci_sm'  # This is available from Spacy
+    #: Components of the spaCy pipeline that are not loaded, as only the sentence boundaries are used
+    exclude = SENTENCE_EXCLUDE
+    #: Default number of texts passed through the pipeline at once by :meth:`span_tokenize_batch`
+    batch_size = 64
 
-    def __init__(self, model=None):
+    def __init__(self, model=None, cache=None):
+        """
+        :param string model: (Optional) Name of or path to the spaCy pipeline.
+        :param TokenizationCache cache: (Optional) Cache of the sentence spans of texts that have been split already.
+        """
         self.model = model if model is not None else self.model
-        self._tokenizer = None
+        self.cache = cache
         log.debug('%s: Initializing with %s' % (self.__class__.__name__, self.model))
 
+    @property
+    def nlp(self):
+        """The spaCy pipeline, loaded on first use and shared by all tokenizers with the same model."""
+        return load_spacy(self.model, tuple(self.exclude))
+
     def span_tokenize(self, s):
         """Return a list of integer offsets that identify sentences in the given text.
         :param string s: The text to tokenize into sentences.
         :rtype: iter(tuple(int, int))
         """
-        if self._tokenizer is None:
-            self._tokenizer = spacy.load(self.model)
-        sents = list(self._tokenizer(s).sents)
-        spans = [(i.start_char, i.end_char) for i in sents]
-        return spans
+        if self.cache is not None:
+            return self.cache.span_tokenize(self._span_tokenize, s, self._cache_namespace)
+        return self._span_tokenize(s)
+
+    def _span_tokenize(self, s):
+        return [(sent.start_char, sent.end_char) for sent in self.nlp(s).sents]
+
+    @property
+    def _cache_namespace(self):
+        return type(self), self.model
+
+    @property
+    def _batch_key(self):
+        return type(self), self.model, tuple(self.exclude), self.cache
+
+    def span_tokenize_batch(self, strings, batch_size=None, n_process=1):
+        """Return the sentence spans of each text in ``strings``, passing the texts through the spaCy pipeline in
+        batches with ``nlp.pipe``. Texts found in the :attr:`cache` are not passed through the pipeline.
+        :param list(str) strings: The texts to tokenize into sentences.
+        :param int batch_size: (Optional) Number of texts processed at once. Default :attr:`batch_size`.
+        :param int n_process: (Optional) Number of processes to use. Default 1.
+        :rtype: iter(list(tuple(int, int)))
+        """
+        strings = list(strings)
+        results = [None] * len(strings)
+        if self.cache is not None:
+            keys = [self.cache.key(self._cache_namespace, s) for s in strings]
+            results = [self.cache.get(key) for key in keys]
+        missing = [i for i, spans in enumerate(results) if spans is None]
+        docs = self.nlp.pipe((strings[i] for i in missing), batch_size=batch_size or self.batch_size,
+                             n_process=n_process)
+        for i, doc in zip(missing, docs):
+            results[i] = [(sent.start_char, sent.end_char) for sent in doc.sents]
+            if self.cache is not None:
+                self.cache.put(keys[i], results[i])
+        return results
 
 
 class ChemSentenceTokenizer(SentenceTokenizer):
@@ -89,6 +270,114 @@ class ChemSentenceTokenizer(SentenceTokenizer):
     model = 'en_core_sci_sm'  # This is available from Spacy
 
 
+class RegexSentenceTokenizer(BaseTokenizer):
+    """Rule-based sentence tokenizer that needs no spaCy model.
+    A sentence ends at a full stop, question mark, exclamation mark or ellipsis, with any closing quotes and brackets
+    after it, that is followed by whitespace. It does not end after one of the :attr:`ABBREVIATIONS` or a single
+    capital initial, or inside brackets that are still open. A bracket that is not closed within
+    :attr:`MAX_BRACKET_LENGTH` characters of a sentence end is taken to be a stray, e.g. in a truncated caption, so it
+    does not stop the rest of the text being split. Decimal numbers and formulas such as ``Li0.5CoO2`` are never split
+    as the full stop in them is not followed by whitespace.
+    Much faster than :class:`SentenceTokenizer`, for a small loss in accuracy.
+    """
+
+    #: Words that are followed by a full stop without ending a sentence, in lowercase without the final full stop
+    ABBREVIATIONS = {
+        'al', 'e.g', 'i.e', 'cf', 'vs', 'viz', 'ca', 'approx', 'resp', 'dr', 'prof', 'mr', 'mrs', 'ms',
+        'st', 'jr', 'inc', 'ltd', 'no', 'nos', 'vol', 'vols', 'pp', 'p', 'ed', 'eds', 'jan', 'feb', 'mar', 'apr',
+        'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+    }
+
+    #: Sentence end candidates: terminal punctuation and any closing quotes or brackets, followed by whitespace
+    END_RE = re.compile(r'([.!?]+|…)[\'"’”)\]}]*(?=\s)')
+
+    #: Several initials of a name without the final full stop, e.g. J.R or M.-D
+    INITIALS_RE = re.compile(r'(?:[A-Z]\.-?)+[A-Z]$')
+
+    #: The start of the next sentence
+    START_RE = re.compile(r'\S')
+
+    #: Number of characters after a sentence end within which an open bracket must be closed to keep it in the sentence
+    MAX_BRACKET_LENGTH = 200
+
+    def _is_end(self, text, start, punctuation):
+        """Return whether the terminal punctuation at ``start`` ends the sentence."""
+        if punctuation != '.':
+            return True
+        word_start = self._word_start(text, start)
+        word = text[word_start:start].lstrip('([{"\'“‘')
+        if len(word) == 1 and word.isupper():
+            # Initial of a name, e.g. J. Smith, unless it is a unit after a number, e.g. 0.1 C
+            previous = text[self._word_start(text, word_start - 1):word_start - 1]
+            return previous[-1:].isdigit()
+        if self.INITIALS_RE.match(word):
+            return False
+        return word.lower() not in self.ABBREVIATIONS
+
+    @staticmethod
+    def _word_start(text, end):
+        """Return the start of the word that ends at ``end``."""
+        return max(text.rfind(' ', 0, end), text.rfind('\n', 0, end), text.rfind('\t', 0, end)) + 1
+
+    @staticmethod
+    def _bracket_level(text, start, end):
+        """Return the number of brackets opened minus the number closed between ``start`` and ``end``."""
+        segment = text[start:end]
+        return (segment.count('(') + segment.count('[') + segment.count('{') -
+                segment.count(')') - segment.count(']') - segment.count('}'))
+
+    def _is_closed(self, text, start, level):
+        """Return whether ``level`` open brackets are closed within :attr:`MAX_BRACKET_LENGTH` characters of ``start``."""
+        for char in text[start:start + self.MAX_BRACKET_LENGTH]:
+            if level <= 0:
+                break
+            if char in '([{':
+                level += 1
+            elif char in ')]}':
+                level -= 1
+        return level <= 0
+
+    def span_tokenize(self, s):
+        """Return a list of integer offsets that identify sentences in the given text.
+        :param string s: The text to tokenize into sentences.
+        :rtype: iter(tuple(int, int))
+        """
+        spans = []
+        start = len(s) - len(s.lstrip())
+        level = 0
+        counted = start
+        for m in self.END_RE.finditer(s, start):
+            # Brackets that are still open where the sentence would end, other than one that the sentence starts with
+            inside = self._bracket_level(s, counted, m.start()) + level > (s[start] in '([{')
+            level += self._bracket_level(s, counted, m.end())
+            counted = m.end()
+            if inside or level > 0:
+                if self._is_closed(s, m.end(), level):
+                    continue
+                # Stray brackets that are never closed
+                level = 0
+            if not self._is_end(s, m.start(), m.group(1)):
+                continue
+            spans.append((start, m.end()))
+            next_start = self.START_RE.search(s, m.end())
+            start = counted = next_start.start() if next_start else len(s)
+            level = 0
+        end = len(s.rstrip())
+        if start < end:
+            spans.append((start, end))
+        return spans
+
+
+class ChemRegexSentenceTokenizer(RegexSentenceTokenizer):
+    """Rule-based sentence tokenizer for chemistry text, which also knows abbreviations used in scientific papers."""
+
+    ABBREVIATIONS = RegexSentenceTokenizer.ABBREVIATIONS | {
+        'fig', 'figs', 'eq', 'eqs', 'eqn', 'eqns', 'ref', 'refs', 'tab', 'sect', 'ch', 'suppl', 'calcd',
+        'wt', 'at', 'conc', 'temp', 'exp', 'expt', 'theor', 'av', 'avg', 'cryst', 'soln', 'sat', 'anhyd', 'sp',
+        'spp', 'ibid',
+    }
+
+
 def bracket_level(text, open={'(', '[', '{'}, close={')', ']', '}'}):
     """Return 0 if string contains balanced brackets or no brackets."""
     level = 0
@@ -152,6 +441,58 @@ GREEK = {
 }
 
 
+#: Position between a Greek and a non-Greek character
+GREEK_BOUNDARY_RE = re.compile('(?<=[{0}])(?=[^{0}])|(?<=[^{0}])(?=[{0}])'.format(''.join(sorted(GREEK))))
+
+
+def _index_by_char(sequences, index):
+    """Group sequences by their first (index 0) or last (index -1) character, keeping their order in each group."""
+    groups = {}
+    for sequence in sequences:
+        groups.setdefault(sequence[index], []).append(sequence)
+    return groups
+
+
+#: Sequence lists of a word tokenizer that its lookup tables are built from, in the order of _WordTokenizerRules
+RULE_LISTS = ('SPLIT', 'SPLIT_END_WORD', 'SPLIT_START_WORD', 'NO_SPLIT', 'NO_SPLIT_STOP', 'SPLIT_END',
+              'SPLIT_END_NO_DIGIT', 'CONTRACTIONS')
+_rule_lists = operator.attrgetter(*RULE_LISTS)
+
+
+class _WordTokenizerRules(object):
+    """Lookup tables for the sequence lists of a word tokenizer, shared by all instances that use the same lists.
+    The rules still try the sequences in the order of the lists, the tables only skip those that can't match.
+    """
+
+    def __init__(self, lists):
+        """
+        :param tuple lists: The sequence lists named in :data:`RULE_LISTS`, in that order.
+        """
+        split, end_word, start_word, no_split, no_split_stop, end, end_no_digit, contractions = lists
+        #: The lists the tables were built from, and their lengths, to notice when they are replaced or extended
+        self.lists = lists
+        self.sizes = tuple(map(len, lists))
+        #: Tokens that are never split
+        self.whole = frozenset(split) | frozenset(end_word) | frozenset(start_word)
+        self.no_split = frozenset(no_split)
+        self.no_split_stop = frozenset(no_split_stop)
+        #: SPLIT sequences with their position in the list, by first character
+        self.split = {}
+        for i, spl in enumerate(split):
+            self.split.setdefault(spl[0], []).append((i, spl))
+        self.end_word = _index_by_char(end_word, -1)
+        self.start_word = _index_by_char(start_word, 0)
+        self.end = _index_by_char(end, -1)
+        self.end_no_digit = _index_by_char(end_no_digit, -1)
+        self.contractions = {}
+        for word, index in contractions:
+            self.contractions.setdefault(word, index)
+
+    def matches(self, lists):
+        """Return whether the tables were built from ``lists``, with the same number of sequences in each."""
+        return all(map(operator.is_, self.lists, lists)) and self.sizes == tuple(map(len, lists))
+
+
 class WordTokenizer(BaseTokenizer):
     """Standard word tokenizer for generic English text."""
     #: Split before and after these sequences, wherever they occur, unless entire token is one of these sequences
@@ -263,6 +604,10 @@ class WordTokenizer(BaseTokenizer):
     SPLIT_START_WORD = ["''", "``", "'"]
     #: Split before these sequences if they end a word
     SPLIT_END_WORD = ["'s", "'m", "'d", "'ll", "'re", "'ve", "n't", "''", "'", "’s", "’m", "’d", "’ll", "’re", "’ve", "n’t", "’", "’’"]
+    #: Split before these sequences if they end a token (used by subclasses)
+    SPLIT_END = []
+    #: Split before these sequences if they end a token, unless preceded by a digit (used by subclasses)
+    SPLIT_END_NO_DIGIT = []
     #: Don't split full stop off last token if it is one of these sequences
     NO_SPLIT_STOP = ['...', 'al.', 'Co.', 'Ltd.', 'Pvt.', 'A.D.', 'B.C.', 'B.V.', 'S.D.', 'U.K.', 'U.S.', 'r.t.']
     #: Split these contractions at the specified index
@@ -286,9 +631,11 @@ class WordTokenizer(BaseTokenizer):
     #: Don't split around hyphens if only these characters before or after.
     NO_SPLIT_CHARS = '0123456789,\'"“”„‟‘’‚‛`´′″‴‵‶‷⁗'
 
-    def __init__(self, split_last_stop=True):
+    def __init__(self, split_last_stop=True, cache=None):
         #: Whether to split off the final full stop (unless preceded by NO_SPLIT_STOP). Default True.
         self.split_last_stop = split_last_stop
+        #: (Optional) :class:`TokenizationCache` of the spans of sentences that have been tokenized already.
+        self.cache = cache
 
     def _split_span(self, span, index, length=0):
         """Split a span into two or three separate spans at certain indices."""
@@ -296,13 +643,40 @@ class WordTokenizer(BaseTokenizer):
         # log.debug([(span[0], offset), (offset, offset + length), (offset + length, span[1])])
         return [(span[0], offset), (offset, offset + length), (offset + length, span[1])]
 
+    def _get_rules(self):
+        """Return the lookup tables for the sequence lists of this tokenizer. They are built again when a list is
+        replaced, on the class or on this instance, or when sequences are added to or removed from it. Lists changed
+        in place without changing their length, e.g. ``t.SPLIT[0] = '~'``, must be replaced instead.
+        """
+        lists = _rule_lists(self)
+        rules = self.__dict__.get('_rules') or type(self).__dict__.get('_rules')
+        if rules is None or not rules.matches(lists):
+            rules = _WordTokenizerRules(lists)
+            if all(map(operator.is_, _rule_lists(type(self)), lists)):
+                type(self)._rules = rules
+            else:
+                self._rules = rules
+        return rules
+
+    def _split_sequences(self, text, rules):
+        """Return the index and length of the first SPLIT sequence found in the text, or None."""
+        # Only sequences that start with a character in the text can be found, tried in the order of the list
+        candidates = [item for char in set(text) for item in rules.split.get(char, ())]
+        candidates.sort()
+        for _, spl in candidates:
+            ind = text.find(spl)
+            if ind > -1:
+                return ind, len(spl)
+        return None
+
     def _subspan(self, s, span, nextspan):
         """Recursively subdivide spans based on a series of rules."""
+        rules = self._get_rules()
         text = s[span[0]:span[1]]
         lowertext = text.lower()
 
         # Skip if only a single character or a split sequence
-        if span[1] - span[0] < 2 or text in self.SPLIT or text in self.SPLIT_END_WORD or text in self.SPLIT_START_WORD or lowertext in self.NO_SPLIT:
+        if span[1] - span[0] < 2 or text in rules.whole or lowertext in rules.no_split:
             return [span]
 
         # Skip if it looks like URL
@@ -310,7 +684,7 @@ class WordTokenizer(BaseTokenizer):
             return [span]
 
         # Split full stop at end of final token (allow certain characters to follow) unless ellipsis
-        if self.split_last_stop and nextspan is None and text not in self.NO_SPLIT_STOP and not text[-3:] == '...':
+        if self.split_last_stop and nextspan is None and text not in rules.no_split_stop and not text[-3:] == '...':
             if text[-1] == '.':
                 return self._split_span(span, -1)
             ind = text.rfind('.')
@@ -318,20 +692,19 @@ class WordTokenizer(BaseTokenizer):
                 return self._split_span(span, ind, 1)
 
         # Split off certain sequences at the end of a word
-        for spl in self.SPLIT_END_WORD:
+        for spl in rules.end_word.get(text[-1], ()):
             if text.endswith(spl) and len(text) > len(spl) and text[-len(spl) - 1].isalpha():
                 return self._split_span(span, -len(spl), 0)
 
         # Split off certain sequences at the start of a word
-        for spl in self.SPLIT_START_WORD:
+        for spl in rules.start_word.get(text[0], ()):
             if text.startswith(spl) and len(text) > len(spl) and text[-len(spl) - 1].isalpha():
                 return self._split_span(span, len(spl), 0)
 
         # Split around certain sequences
-        for spl in self.SPLIT:
-            ind = text.find(spl)
-            if ind > -1:
-                return self._split_span(span, ind, len(spl))
+        found = self._split_sequences(text, rules)
+        if found is not None:
+            return self._split_span(span, *found)
 
         # Split around certain sequences unless followed by a digit
         for spl in self.SPLIT_NO_DIGIT:
@@ -340,37 +713,51 @@ class WordTokenizer(BaseTokenizer):
                 return self._split_span(span, ind, len(spl))
 
         # Characters to split around, but with exceptions
-        for i, char in enumerate(text):
-            if char == '-':
-                before = lowertext[:i]
-                after = lowertext[i+1:]
-                # By default we split on hyphens
-                split = True
-                if before in self.NO_SPLIT_PREFIX or after in self.NO_SPLIT_SUFFIX:
-                    split = False  # Don't split if prefix or suffix in list
-                elif not before.strip(self.NO_SPLIT_CHARS) or not after.strip(self.NO_SPLIT_CHARS):
-                    split = False  # Don't split if prefix or suffix entirely consist of certain characters
-                if split:
-                    return self._split_span(span, i, 1)
+        i = text.find('-')
+        while i > -1:
+            before = lowertext[:i]
+            after = lowertext[i+1:]
+            # By default we split on hyphens
+            split = True
+            if before in self.NO_SPLIT_PREFIX or after in self.NO_SPLIT_SUFFIX:
+                split = False  # Don't split if prefix or suffix in list
+            elif not before.strip(self.NO_SPLIT_CHARS) or not after.strip(self.NO_SPLIT_CHARS):
+                split = False  # Don't split if prefix or suffix entirely consist of certain characters
+            if split:
+                return self._split_span(span, i, 1)
+            i = text.find('-', i + 1)
 
         # Split contraction words
-        for contraction in self.CONTRACTIONS:
-            if lowertext == contraction[0]:
-                return self._split_span(span, contraction[1])
+        if lowertext in rules.contractions:
+            return self._split_span(span, rules.contractions[lowertext])
         return [span]
 
     def span_tokenize(self, s):
         """"""
+        if self.cache is not None:
+            return self.cache.span_tokenize(self._span_tokenize, s, self._cache_namespace)
+        return self._span_tokenize(s)
+
+    @property
+    def _cache_namespace(self):
+        return type(self), self.split_last_stop
+
+    def _span_tokenize(self, s):
         # First get spans by splitting on all whitespace
         # Includes: \u0020 \u00A0 \u1680 \u180E \u2000 \u2001 \u2002 \u2003 \u2004 \u2005 \u2006 \u2007 \u2008 \u2009 \u200A \u202F \u205F \u3000
-        spans = [(left, right) for left, right in regex_span_tokenize(s, '\s+') if not left == right]
-        i = 0
+        # Spans still to be split are kept on a stack in reverse order, so the next span is always at the top
+        pending = [m.span() for m in NON_WHITESPACE_RE.finditer(s)]
+        pending.reverse()
+        spans = []
         # Recursively split spans according to rules
-        while i < len(spans):
-            subspans = self._subspan(s, spans[i], spans[i + 1] if i + 1 < len(spans) else None)
-            spans[i:i+1] = [subspan for subspan in subspans if subspan[1] - subspan[0] > 0]
+        while pending:
+            span = pending.pop()
+            subspans = self._subspan(s, span, pending[-1] if pending else None)
             if len(subspans) == 1:
-                i += 1
+                if subspans[0][1] - subspans[0][0] > 0:
+                    spans.append(subspans[0])
+            else:
+                pending.extend(subspan for subspan in reversed(subspans) if subspan[1] - subspan[0] > 0)
         return spans
 
 
@@ -577,6 +964,12 @@ class ChemWordTokenizer(WordTokenizer):
         'turn', 'type', 'unesterified', 'untreated', 'vacancies', 'vacancy', 'variable', 'water', 'yeast', 'yield',
         'zwitterion'
     }
+    #: Split a bracketed strength or shape off a number, e.g. UV-vis/IR peaks
+    PEAK_RE = re.compile(r'^(\d+\.\d+|\d{1,})(\([a-z]+\)|c)$', re.I)
+    #: Characters that are split around, but with exceptions
+    SPECIAL_CHAR_RE = re.compile('[:;x+−±/>→(-]')
+    #: Isotopes that are split off a preceding full stop when the next token is NMR
+    NMR_ISOTOPES = {'1H', '13C', '15N', '31P', '19F', '11B', '29Si', '170', '73Ge', '195Pt', '33S', '13C{1H}'}
 
     def _closing_bracket_index(self, text, bpair=('(', ')')):
         """Return the index of the closing bracket that matches the opening bracket at the start of the text."""
@@ -618,11 +1011,12 @@ class ChemWordTokenizer(WordTokenizer):
 
     def _subspan(self, s, span, nextspan):
         """Recursively subdivide spans based on a series of rules."""
+        rules = self._get_rules()
         text = s[span[0]:span[1]]
         lowertext = text.lower()
 
         # Skip if only a single character or a split sequence
-        if span[1] - span[0] < 2 or text in self.SPLIT or text in self.SPLIT_END_WORD or text in self.SPLIT_START_WORD or lowertext in self.NO_SPLIT:
+        if span[1] - span[0] < 2 or text in rules.whole or lowertext in rules.no_split:
             return [span]
 
         # Skip if it looks like URL
@@ -630,7 +1024,7 @@ class ChemWordTokenizer(WordTokenizer):
             return [span]
 
         # Split full stop at end of final token (allow certain characters to follow) unless ellipsis
-        if self.split_last_stop and nextspan is None and text not in self.NO_SPLIT_STOP and not text[-3:] == '...':
+        if self.split_last_stop and nextspan is None and text not in rules.no_split_stop and not text[-3:] == '...':
             if text[-1] == '.':
                 return self._split_span(span, -1)
             ind = text.rfind('.')
@@ -638,25 +1032,24 @@ class ChemWordTokenizer(WordTokenizer):
                 return self._split_span(span, ind, 1)
 
         # Split off certain sequences at the end of a token
-        for spl in self.SPLIT_END:
+        for spl in rules.end.get(text[-1], ()):
             if text.endswith(spl) and len(text) > len(spl):
                 return self._split_span(span, -len(spl), 0)
 
         # Split off certain sequences at the end of a word
-        for spl in self.SPLIT_END_WORD:
+        for spl in rules.end_word.get(text[-1], ()):
             if text.endswith(spl) and len(text) > len(spl) and text[-len(spl) - 1].isalpha():
                 return self._split_span(span, -len(spl), 0)
 
         # Split off certain sequences at the end of a word
-        for spl in self.SPLIT_START_WORD:
+        for spl in rules.start_word.get(text[0], ()):
             if text.startswith(spl) and len(text) > len(spl) and text[-len(spl) - 1].isalpha():
                 return self._split_span(span, len(spl), 0)
 
         # Split around certain sequences
-        for spl in self.SPLIT:
-            ind = text.find(spl)
-            if ind > -1:
-                return self._split_span(span, ind, len(spl))
+        found = self._split_sequences(text, rules)
+        if found is not None:
+            return self._split_span(span, *found)
 
         # Split around certain sequences unless followed by a digit
         # - We skip this because of difficulty with chemical names.
@@ -666,7 +1059,7 @@ class ChemWordTokenizer(WordTokenizer):
         #         return self._split_span(span, ind, len(spl))
 
         # Split off certain sequences at the end of a token unless preceded by a digit
-        for spl in self.SPLIT_END_NO_DIGIT:
+        for spl in rules.end_no_digit.get(text[-1], ()):
             if text.endswith(spl) and len(text) > len(spl) and not text[-len(spl) - 1].isdigit():
                 return self._split_span(span, -len(spl), 0)
 
@@ -679,7 +1072,7 @@ class ChemWordTokenizer(WordTokenizer):
             return self._split_span(span, 2, 1)
 
         # Split things like \d+\.\d+([a-z]+) e.g. UV-vis/IR peaks with bracketed strength/shape
-        m = re.match('^(\d+\.\d+|\d{1,})(\([a-z]+\)|c)$', text, re.I)
+        m = self.PEAK_RE.match(text)
         if m:
             return self._split_span(span, m.start(2), 1)
 
@@ -694,7 +1087,9 @@ class ChemWordTokenizer(WordTokenizer):
                 return self._split_span(span, -1, 0)
 
         # Characters to split around, but with exceptions
-        for i, char in enumerate(text):
+        for special in self.SPECIAL_CHAR_RE.finditer(text):
+            i = special.start()
+            char = special.group()
             before = text[:i]
             after = text[i+1:]
             if char in {':', ';'}:
@@ -774,16 +1169,15 @@ class ChemWordTokenizer(WordTokenizer):
             return self._split_span(span, 2, 0)
 
         # Split contraction words
-        for contraction in self.CONTRACTIONS:
-            if lowertext == contraction[0]:
-                return self._split_span(span, contraction[1])
+        if lowertext in rules.contractions:
+            return self._split_span(span, rules.contractions[lowertext])
 
         if nextspan:
             nexttext = s[nextspan[0]:nextspan[1]]
             # Split NMR isotope whitespace errors (joined with previous sentence full stop)
             if nexttext == 'NMR':
                 ind = text.rfind('.')
-                if ind > -1 and text[ind + 1:] in {'1H', '13C', '15N', '31P', '19F', '11B', '29Si', '170', '73Ge', '195Pt', '33S', '13C{1H}'}:
+                if ind > -1 and text[ind + 1:] in self.NMR_ISOTOPES:
                     return self._split_span(span, ind, 1)
 
 
@@ -907,12 +1301,9 @@ class FineWordTokenizer(WordTokenizer):
         """Recursively subdivide spans based on a series of rules."""
 
         # Split on boundaries between greek and non-greek
-        text = s[span[0]:span[1]]
-        for i, char in enumerate(text):
-            if i < len(text) - 1:
-                nextchar = text[i + 1]
-                if (char in GREEK and nextchar not in GREEK) or (char not in GREEK and nextchar in GREEK):
-                    return [(span[0], span[0] + i + 1), (span[0] + i + 1, span[1])]
+        boundary = GREEK_BOUNDARY_RE.search(s, span[0] + 1, span[1])
+        if boundary:
+            return [(span[0], boundary.start()), (boundary.start(), span[1])]
 
         # Perform all normal WordTokenizer splits
         return super(FineWordTokenizer, self)._subspan(s,span, nextspan)
@@ -5,70 +5,168 @@ batterydataextractor.parse.bert
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 Bert parsers.
 """
+import collections
 import logging
 import re
-from abc import ABC
+from abc import ABC, abstractmethod
 
 from .base import BaseSentenceParser
+from ..utils import locked_memoize
 from transformers import AutoTokenizer
 from transformers.pipelines import pipeline
 
 log = logging.getLogger(__name__)
 
 
+@locked_memoize
+def load_qa_model(model_name, device):
+    """
+    Load a question-answering pipeline. Pipelines are cached per model name and device, so every model configuration
+    in the process shares the same weights, even if several threads first ask for a model at the same time.
+
+    :param str model_name: Name or path of the question-answering model.
+    :param int device: Device to run the model on, -1 for CPU.
+    :returns: The question-answering pipeline.
+    """
+    log.debug('Loading question-answering model %s on device %s' % (model_name, device))
+    return pipeline('question-answering', model=model_name, device=device,
+                    tokenizer=AutoTokenizer.from_pretrained(model_name, model_max_length=512))
+
+
+def interpret_many(jobs, batch_size=32):
+    """
+    Interpret several sentences with several BERT parsers at once. The parsers advance in lockstep, and at every step
+    the questions of all parsers that use the same question-answering model are answered in a single batched call.
+    Identical questions about the same context are only asked once.
+
+    :param list[(BertParser, list[(str, str)])] jobs: Pairs of parser and tagged tokens to interpret.
+    :param int batch_size: (Optional) Batch size for the question-answering models. Default 32.
+    :returns: The records found for each job, in the order of the jobs.
+    :rtype: list[list[BaseModel]]
+    """
+    results = [[] for _ in jobs]
+    running = []
+    for i, (parser, tokens) in enumerate(jobs):
+        steps = parser.interpret_qa(tokens)
+        running.append((i, parser.qa_model(), steps, None))
+    while running:
+        pending = []
+        for i, bert_model, steps, answers in running:
+            try:
+                qa_inputs = steps.send(answers)
+            except StopIteration as e:
+                results[i] = e.value or []
+                continue
+            pending.append((i, bert_model, steps, qa_inputs))
+        # Collect the distinct questions for each model and answer them in one call per model
+        questions = collections.OrderedDict()
+        for i, bert_model, steps, qa_inputs in pending:
+            model_questions = questions.setdefault(id(bert_model), (bert_model, collections.OrderedDict()))[1]
+            for qa_input in qa_inputs:
+                model_questions.setdefault((qa_input['question'], qa_input['context']), qa_input)
+        answered = {}
+        for key, (bert_model, model_questions) in questions.items():
+            if not model_questions:
+                continue
+            log.debug('Answering %s questions in one batch' % len(model_questions))
+            res = bert_model(list(model_questions.values()), top_k=1, batch_size=batch_size)
+            if isinstance(res, dict):
+                res = [res]
+            for question, answer in zip(model_questions, res):
+                answered[(key, question)] = answer
+        running = [(i, bert_model, steps, [answered[(id(bert_model), (q['question'], q['context']))] for q in qa_inputs])
+                   for i, bert_model, steps, qa_inputs in pending]
+    return results
+
+
 class BertParser(BaseSentenceParser, ABC):
     """Bert Parser"""
 
     def qa_model(self, model_name="batterydata/batterybert-cased-squad-v1") -> pipeline:
-        return pipeline('question-answering', model=model_name, device=self.model.device,
-                        tokenizer=AutoTokenizer.from_pretrained(model_name, model_max_length=512))
+        return load_qa_model(model_name, self.model.options['device'])
 
+    @abstractmethod
+    def interpret_qa(self, tokens):
+        """
+        Interpret tokens as a series of question-answering steps. This is a generator that yields a list of
+        question-answering inputs for each step and is sent back the list of answers, so that the questions of many
+        parsers can be batched together by :func:`interpret_many`.
 
-class BertMaterialParser(BertParser):
-    """Bert Material Parser."""
+        :param list[(str, str)] tokens: The tagged tokens of the sentence.
+        :returns: The records found in the sentence, as the return value of the generator.
+        """
 
     def interpret(self, tokens):
         bert_model = self.qa_model()
+        steps = self.interpret_qa(tokens)
+        answers = None
+        while True:
+            try:
+                qa_inputs = steps.send(answers)
+            except StopIteration as e:
+                records = e.value or []
+                break
+            answers = [bert_model(qa_input, top_k=1) for qa_input in qa_inputs]
+        for record in records:
+            yield record
+
+
+class BertMaterialParser(BertParser):
+    """Bert Material Parser."""
+
+    def interpret_qa(self, tokens):
+        options = self.model.options
         context_list = [token[0] for token in tokens]
         context = " ".join(context_list)
-        for specifier in self.model.defined_names:
+        specifiers = []
+        for specifier in options['defined_names']:
             length = len(specifier.split(" "))
             if (specifier in context_list and length == 1) or (specifier in context and length > 1):
-                question = "What is the value of {}?".format(specifier)
-                qa_input = {'question': question, 'context': context}
-                res = bert_model(qa_input, top_k=1)
-                cs1 = res['score']
-                if cs1 > self.model.confidence_threshold:
-                    question2 = "What material has a {} of {}?".format(specifier, res['answer'])
-                    qa_input2 = {'question': question2, 'context': context}
-                    res2 = bert_model(qa_input2, top_k=1)
-                    cs2 = res2['score']
-                    value = re.findall(r'(?:\d*\.\d+|\d+)', res['answer'])
-                    c = self.model(value=[float(v) for v in value],
-                                   units=res['answer'].split(value[-1])[-1].strip(),
-                                   raw_value=res['answer'],
-                                   specifier=specifier,
-                                   material=res2['answer'],
-                                   confidence_score="%.4f" % (cs1 * cs2),
-                                   original_text=context if self.model.original_text else None,
-                                   )
-                    yield c
+                specifiers.append(specifier)
+        if not specifiers:
+            return []
+        # First turn asks for the value of each property, the second for the material with that value
+        values = yield [{'question': "What is the value of {}?".format(specifier), 'context': context}
+                        for specifier in specifiers]
+        found = [(specifier, res) for specifier, res in zip(specifiers, values)
+                 if res['score'] > options['confidence_threshold']]
+        if not found:
+            return []
+        materials = yield [{'question': "What material has a {} of {}?".format(specifier, res['answer']),
+                            'context': context} for specifier, res in found]
+        records = []
+        for (specifier, res), res2 in zip(found, materials):
+            cs1 = res['score']
+            cs2 = res2['score']
+            value = re.findall(r'(?:\d*\.\d+|\d+)', res['answer'])
+            c = self.model(value=[float(v) for v in value],
+                           units=res['answer'].split(value[-1])[-1].strip(),
+                           raw_value=res['answer'],
+                           specifier=specifier,
+                           material=res2['answer'],
+                           confidence_score="%.4f" % (cs1 * cs2),
+                           original_text=context if options['original_text'] else None,
+                           )
+            records.append(c)
+        return records
 
 
 class BertGeneralParser(BertParser):
     """Bert General Parser."""
 
-    def interpret(self, tokens):
-        bert_model = self.qa_model()
+    def interpret_qa(self, tokens):
+        options = self.model.options
         context = " ".join([token[0] for token in tokens])
-        for specifier in self.model.defined_names:
-            question = specifier if self.model.self_defined else "What is the {}?".format(specifier)
-            qa_input = {'question': question, 'context': context}
-            res = bert_model(qa_input, top_k=1)
-            if res['score'] > self.model.confidence_threshold:
+        specifiers = options['defined_names']
+        answers = yield [{'question': specifier if options['self_defined'] else "What is the {}?".format(specifier),
+                          'context': context} for specifier in specifiers]
+        records = []
+        for specifier, res in zip(specifiers, answers):
+            if res['score'] > options['confidence_threshold']:
                 c = self.model(answer=res['answer'],
                                specifier=specifier,
                                confidence_score="%.4f" % res['score'],
-                               original_text=context if self.model.original_text else None,
+                               original_text=context if options['original_text'] else None,
                                )
-                yield c
+                records.append(c)
+        return records
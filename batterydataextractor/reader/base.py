@@ -8,12 +8,31 @@ Base reader
 from abc import ABCMeta, abstractmethod
 import six
 
+#: Number of bytes at the start of a file that readers use to detect its format
+SNIFF_SIZE = 8192
+
+#: Maximum number of bytes searched for the end of the HTML head when detecting the format
+MAX_SNIFF_SIZE = 1048576
 
-class BaseReader(six.with_metaclass(ABCMeta)):
-    """All Document Readers should implement a parse method."""
 
-    def __init__(self):
-        self.root = None
+def sniff(fstring):
+    """Return the start of the contents of a file, which is passed to :meth:`BaseReader.detect`.
+    This is usually the first :data:`SNIFF_SIZE` bytes. For HTML it extends to the end of the head element, as the
+    metadata that identifies a publisher is often preceded by large inline scripts.
+    :param bytes|mmap.mmap fstring: The contents of the file.
+    :rtype: bytes
+    """
+    prefix = fstring[:SNIFF_SIZE]
+    if len(prefix) == SNIFF_SIZE and b'<head' in prefix.lower() and b'</head>' not in prefix:
+        end = fstring.find(b'</head>', 0, MAX_SNIFF_SIZE)
+        prefix = fstring[:end if end != -1 else MAX_SNIFF_SIZE]
+    return prefix
+
+
+class BaseReader(six.with_metaclass(ABCMeta)):
+    """All Document Readers should implement a parse method.
+    Readers keep no state between calls, so a reader instance can parse several documents in different threads.
+    """
 
     def detect(self, fstring, fname=None):
         """Quickly check if this reader can parse the input. Reader subclasses should override this.
@@ -22,6 +41,16 @@ class BaseReader(six.with_metaclass(ABCMeta)):
         """
         return True
 
+    def prepare(self, fstring):
+        """Return the contents of a file read through :meth:`Document.from_file` as a byte string to parse.
+        Reader subclasses may override this to fix up their format before parsing.
+        :param bytes|mmap.mmap fstring: The contents of the file.
+        :rtype: bytes
+        """
+        if isinstance(fstring, six.binary_type):
+            return fstring
+        return fstring[:]
+
     @abstractmethod
     def parse(self, fstring):
         """Parse the input and return a Document. Raises ReaderError if the parse fails."""
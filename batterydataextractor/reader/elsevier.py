@@ -5,6 +5,8 @@ batterydataextractor.reader.elsevier
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 Elsevier XML reader
 """
+import re
+
 from ..scrape.clean import clean, Cleaner
 from ..scrape.elsevier import fix_elsevier_xml_whitespace, els_xml_whitespace, els_clean_abstract
 from ..doc.meta import MetaData
@@ -18,27 +20,40 @@ strip_els_xml = Cleaner(strip_xpath='.//ce:inf | .//ce:italic | .//ce:bold | .//
                         kill_xpath='.//ce:cross-ref//ce:sup | .//ce:table//ce:sup | .//ce:float-anchor| .//ce:hsp'
                                    '| .//ja:math ')
 
+#: The article head, which is renamed so it can be selected in the common namespace
+HEAD_RE = re.compile(br'<(/?)head>')
+
 
 class ElsevierXmlReader(XmlReader):
     """Reader for Elsevier XML documents."""
 
     cleaners = [clean, fix_elsevier_xml_whitespace, els_xml_whitespace, els_clean_abstract, strip_els_xml]
 
-    etree.FunctionNamespace("http://www.elsevier.com/xml/svapi/article/dtd").prefix = 'default'
-    etree.FunctionNamespace("http://www.elsevier.com/xml/bk/dtd").prefix = 'bk'
-    etree.FunctionNamespace("http://www.elsevier.com/xml/common/cals/dtd").prefix = 'cals'
-    etree.FunctionNamespace("http://www.elsevier.com/xml/common/dtd").prefix = 'ce'
-    etree.FunctionNamespace("http://www.elsevier.com/xml/ja/dtd").prefix = 'ja'
-    etree.FunctionNamespace("http://www.w3.org/1998/Math/MathML").prefix = 'mml'
-    etree.FunctionNamespace("http://www.elsevier.com/xml/common/struct-aff/dtd").prefix = 'sa'
-    etree.FunctionNamespace("http://www.elsevier.com/xml/common/struct-bib/dtd").prefix = 'sb'
-    etree.FunctionNamespace("http://www.elsevier.com/xml/common/table/dtd").prefix = 'tb'
-    etree.FunctionNamespace("http://www.w3.org/1999/xlink").prefix = 'xlink'
-    etree.FunctionNamespace("http://www.elsevier.com/xml/xocs/dtd").prefix = 'xocs'
-    etree.FunctionNamespace("http://purl.org/dc/elements/1.1/").prefix = 'dc'
-    etree.FunctionNamespace("http://purl.org/dc/terms/").prefix = 'dcterms'
-    etree.FunctionNamespace("http://prismstandard.org/namespaces/basic/2.0/").prefix = 'prism'
-    etree.FunctionNamespace("http://www.w3.org/2001/XMLSchema-instance").prefix = 'xsi'
+    namespaces = {
+        'default': 'http://www.elsevier.com/xml/svapi/article/dtd',
+        'bk': 'http://www.elsevier.com/xml/bk/dtd',
+        'cals': 'http://www.elsevier.com/xml/common/cals/dtd',
+        'ce': 'http://www.elsevier.com/xml/common/dtd',
+        'ja': 'http://www.elsevier.com/xml/ja/dtd',
+        'mml': 'http://www.w3.org/1998/Math/MathML',
+        'sa': 'http://www.elsevier.com/xml/common/struct-aff/dtd',
+        'sb': 'http://www.elsevier.com/xml/common/struct-bib/dtd',
+        'tb': 'http://www.elsevier.com/xml/common/table/dtd',
+        'xlink': 'http://www.w3.org/1999/xlink',
+        'xocs': 'http://www.elsevier.com/xml/xocs/dtd',
+        'dc': 'http://purl.org/dc/elements/1.1/',
+        'dcterms': 'http://purl.org/dc/terms/',
+        'prism': 'http://prismstandard.org/namespaces/basic/2.0/',
+        'xsi': 'http://www.w3.org/2001/XMLSchema-instance',
+    }
+
+    stream_tags = (
+        '{http://www.elsevier.com/xml/xocs/dtd}meta',
+        '{http://www.elsevier.com/xml/ja/dtd}head',
+        '{http://www.elsevier.com/xml/common/dtd}floats',
+        '{http://www.elsevier.com/xml/common/dtd}section',
+        '{http://www.elsevier.com/xml/common/dtd}bibliography',
+    )
 
     root_css = 'default|full-text-retrieval-response'
     title_css = 'dc|title, ce|title'
@@ -93,6 +108,16 @@ class ElsevierXmlReader(XmlReader):
             return True
         return False
 
+    def prepare(self, fstring):
+        """Rename the article head to ``ce:head`` in a single pass, so it is parsed as :class:`HeadData`."""
+        return HEAD_RE.sub(br'<\1ce:head>', fstring)
+
+    def _prepare_section(self, el):
+        """Rename the article head to ``ce:head``, as :meth:`prepare` does for a whole file."""
+        for head in el.iter('{*}head'):
+            if head.prefix is None:
+                head.tag = '{%s}head' % self.namespaces['ce']
+
     def _parse_metadata(self, el, refs, specials):
         title = self._css(self.metadata_title_css, el)
         authors = self._css(self.metadata_author_css, el)
@@ -151,3 +176,8 @@ class ElsevierXmlReader(XmlReader):
                 }
         head = HeadData(headdata)
         return [head]
+
+
+# Register the prefixes globally, as the cleaners use them in their XPaths
+for prefix, uri in ElsevierXmlReader.namespaces.items():
+    etree.FunctionNamespace(uri).prefix = prefix
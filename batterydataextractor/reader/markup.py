@@ -6,6 +6,7 @@ batterydataextractor.reader.markup
 XML and HTML readers based on lxml.
 """
 import logging
+import re
 import six
 from abc import abstractmethod, ABCMeta
 from collections import defaultdict
@@ -15,14 +16,15 @@ from lxml.etree import XMLParser
 from lxml.html import HTMLParser
 
 from ..errors import ReaderError
-from ..doc.document import Document
+from ..doc.document import Document, StreamDocument
 from ..doc.text import Title, Heading1, Heading2, Heading3, Paragraph, Citation, Text, Sentence, Abstract
 from ..doc.meta import MetaData
 from ..doc.head import HeadData
-from ..scrape.clean import clean
+from ..scrape.clean import clean, compile_cleaners
 from ..scrape.csstranslator import CssHTMLTranslator
 from .base import BaseReader
 from ..text import get_encoding
+from ..utils import thread_cache
 
 
 log = logging.getLogger(__name__)
@@ -34,6 +36,63 @@ INLINE_ELEMENTS = {
     'select', 'textarea', 'blink', 'font', 'marquee', 'nobr', 's', 'strike', 'u', 'wbr',
 }
 
+#: Start of an HTML document
+HTML_RE = re.compile(br'<!doctype\s+html|<html[\s>]', re.I)
+
+_css_translator = CssHTMLTranslator()
+
+
+class _TextBuilder(object):
+    """Fragments of text and references that are joined into a single Text element once it is complete.
+    Each element is built, and its text normalized, only once however many inline fragments it is made of.
+    """
+
+    __slots__ = ('element_cls', 'fragments', 'id', 'references')
+
+    def __init__(self, element_cls, text, id=None, references=None):
+        self.element_cls = element_cls
+        self.fragments = [text]
+        self.id = id
+        self.references = references if references is not None else []
+
+    def append(self, text, id=None, references=None):
+        """Append a fragment of text, in the same way as adding an element with that text."""
+        self.fragments.append(text)
+        self.id = self.id or id
+        if references:
+            self.references = self.references + references
+
+    def extend(self, other):
+        """Append the text and references of another builder or element."""
+        if isinstance(other, _TextBuilder):
+            self.fragments.extend(other.fragments)
+            self.id = self.id or other.id
+            if other.references:
+                self.references = self.references + other.references
+        else:
+            self.append(other.text, id=other.id, references=other.references)
+
+    def build(self):
+        """Return the element."""
+        return self.element_cls(''.join(self.fragments), id=self.id, references=self.references)
+
+
+def _kind(element):
+    """Return the class of an element, or of the element a builder will build."""
+    return element.element_cls if isinstance(element, _TextBuilder) else type(element)
+
+
+def _builder(element):
+    """Return a builder to append to an element."""
+    if isinstance(element, _TextBuilder):
+        return element
+    return _TextBuilder(type(element), element.text, id=element.id, references=element.references)
+
+
+def _build(element):
+    """Return the element of a builder, or the element itself."""
+    return element.build() if isinstance(element, _TextBuilder) else element
+
 
 class LxmlReader(six.with_metaclass(ABCMeta, BaseReader)):
     """Abstract base class for lxml-based readers."""
@@ -41,6 +100,9 @@ class LxmlReader(six.with_metaclass(ABCMeta, BaseReader)):
     #: A ``Cleaner`` instance to
     cleaners = [clean]
 
+    #: Namespace prefixes used in the CSS selectors
+    namespaces = {}
+
     root_css = 'html'
     title_css = 'h1'
     heading1_css = 'h2'
@@ -79,6 +141,11 @@ class LxmlReader(six.with_metaclass(ABCMeta, BaseReader)):
 
     def _parse_element_r(self, el, specials, refs, id=None, element_cls=Paragraph):
         """Recursively parse HTML/XML element and its children into a list of Document elements."""
+        return [_build(item) for item in self._parse_fragments_r(el, specials, refs, id=id, element_cls=element_cls)]
+
+    def _parse_fragments_r(self, el, specials, refs, id=None, element_cls=Paragraph):
+        """Like _parse_element_r, but text is returned as unfinished :class:`_TextBuilder` fragments, so inline
+        children can be merged into them without building a new element for every merge."""
         elements = []
         if el.tag in {etree.Comment, etree.ProcessingInstruction}:
             return []
@@ -89,34 +156,38 @@ class LxmlReader(six.with_metaclass(ABCMeta, BaseReader)):
         id = el.get('id', id)
         references = refs.get(el, [])
         if el.text is not None:
-            elements.append(element_cls(six.text_type(el.text), id=id, references=references))
+            elements.append(_TextBuilder(element_cls, six.text_type(el.text), id=id, references=references))
         elif references:
-            elements.append(element_cls('', id=id, references=references))
+            elements.append(_TextBuilder(element_cls, '', id=id, references=references))
         for child in el:
             # br is a special case - technically inline, but we want to split
             if child.tag not in {etree.Comment, etree.ProcessingInstruction} and child.tag.lower() == 'br':
-                elements.append(element_cls(''))
+                elements.append(_TextBuilder(element_cls, ''))
 
-            child_elements = self._parse_element_r(child, specials=specials, refs=refs, id=id, element_cls=element_cls)
+            child_elements = self._parse_fragments_r(child, specials=specials, refs=refs, id=id,
+                                                     element_cls=element_cls)
             if (self._is_inline(child) and len(elements) > 0 and len(child_elements) > 0 and
-                    isinstance(elements[-1], (Text, Sentence)) and isinstance(child_elements[0], (Text, Sentence)) and
-                    type(elements[-1]) == type(child_elements[0])):
-                elements[-1] += child_elements.pop(0)
+                    issubclass(_kind(elements[-1]), (Text, Sentence)) and
+                    issubclass(_kind(child_elements[0]), (Text, Sentence)) and
+                    _kind(elements[-1]) == _kind(child_elements[0])):
+                elements[-1] = _builder(elements[-1])
+                elements[-1].extend(child_elements.pop(0))
             elements.extend(child_elements)
             if child.tail is not None:
-                if self._is_inline(child) and len(elements) > 0 and isinstance(elements[-1], element_cls):
-                    elements[-1] += element_cls(six.text_type(child.tail), id=id)
+                if self._is_inline(child) and len(elements) > 0 and _kind(elements[-1]) == element_cls:
+                    elements[-1] = _builder(elements[-1])
+                    elements[-1].append(six.text_type(child.tail), id=id)
                 else:
-                    elements.append(element_cls(six.text_type(child.tail), id=id))
+                    elements.append(_TextBuilder(element_cls, six.text_type(child.tail), id=id))
         return elements
 
-    def _parse_element(self, el, specials=None, refs=None, element_cls=Paragraph):
+    def _parse_element(self, el, specials=None, refs=None, element_cls=Paragraph, id=None):
         """"""
         if specials is None:
             specials = {}
         if refs is None:
             refs = {}
-        elements = self._parse_element_r(el, specials=specials, refs=refs, element_cls=element_cls)
+        elements = self._parse_element_r(el, specials=specials, refs=refs, id=id, element_cls=element_cls)
         final_elements = []
         for element in elements:
             # Filter empty text elements
@@ -133,18 +204,19 @@ class LxmlReader(six.with_metaclass(ABCMeta, BaseReader)):
             specials = {}
         if refs is None:
             refs = {}
-        elements = self._parse_element_r(el, specials=specials, refs=refs, element_cls=element_cls)
+        elements = self._parse_fragments_r(el, specials=specials, refs=refs, element_cls=element_cls)
         # This occurs if the input element is self-closing... (some table td in NLM XML)
         if not elements:
             return [element_cls('')]
         element = elements[0]
-        for next_element in elements[1:]:
-            try:
-                element += element_cls(' ') + next_element
-            except TypeError as e:
-                continue
-                log.warning('Adding of two objects was skipped. {} and {} cannot be added.'.format(str(type(element)), str(type(next_element))))
-        return [element]
+        if _kind(element) == element_cls:
+            # Join the following elements of the same type with a space, skipping other elements
+            for next_element in elements[1:]:
+                if _kind(next_element) == element_cls:
+                    element = _builder(element)
+                    element.append(' ')
+                    element.extend(next_element)
+        return [_build(element)]
 
     @staticmethod
     def _parse_reference(el):
@@ -210,14 +282,53 @@ class LxmlReader(six.with_metaclass(ABCMeta, BaseReader)):
 
     @staticmethod
     def _xpath(query, root):
-        result = root.xpath(query, smart_strings=False)
+        if isinstance(query, etree.XPath):
+            result = query(root)
+        else:
+            result = root.xpath(query, smart_strings=False)
         if type(result) is not list:
             result = [result]
-        log.debug('Selecting XPath: {}: {}'.format(query, result))
+        log.debug('Selecting XPath: %s: %s', query, result)
         return result
 
+    @classmethod
+    def _compile_css(cls, query):
+        """Translate a CSS selector into a compiled XPath. Compiled selectors are cached for each reader class and
+        reused for every document the reader parses. Each thread has its own, as an XPath can only be evaluated by
+        one thread at a time."""
+        cache = thread_cache(cls, '_compiled_css')
+        xpath = cache.get(query)
+        if xpath is None:
+            xpath = etree.XPath(_css_translator.css_to_xpath(query), namespaces=cls.namespaces, smart_strings=False)
+            cache[query] = xpath
+        return xpath
+
+    @classmethod
+    def _compile_cleaners(cls, cleaners):
+        """Compile a list of cleaners into a single cleaner. Compiled cleaners are cached for each reader class."""
+        cache = cls.__dict__.get('_compiled_cleaners')
+        if cache is None:
+            cache = {}
+            setattr(cls, '_compiled_cleaners', cache)
+        key = tuple(cleaners)
+        compiled = cache.get(key)
+        if compiled is None:
+            compiled = compile_cleaners(cleaners)
+            cache[key] = compiled
+        return compiled
+
+    @staticmethod
+    def _parser(parser_cls, **options):
+        """Return a parser for the current thread, created once for each set of options."""
+        cache = thread_cache(LxmlReader, '_parsers')
+        key = (parser_cls,) + tuple(sorted(options.items()))
+        parser = cache.get(key)
+        if parser is None:
+            parser = cache[key] = parser_cls(**options)
+        return parser
+
     def _css(self, query, root):
-        return self._xpath(CssHTMLTranslator().css_to_xpath(query), root)
+        return self._xpath(self._compile_css(query), root)
 
     def _is_inline(self, element):
         """Return True if an element is inline."""
@@ -232,13 +343,18 @@ class LxmlReader(six.with_metaclass(ABCMeta, BaseReader)):
 
     def parse(self, fstring):
         root = self._make_tree(fstring)
-        self.root = root
-
         if root is None:
             raise ReaderError
         root = self._css(self.root_css, root)[0]
-        for cleaner in self.cleaners:
-            cleaner(root)
+        self._compile_cleaners(self.cleaners)(root)
+        elements = self._parse_root(root)
+        return Document(*elements)
+
+    def _parse_root(self, root, id=None):
+        """Parse a cleaned element and everything inside it into a list of Document elements.
+        :param root: The element to parse.
+        :param str id: (Optional) Id inherited from the ancestors of the element.
+        """
         specials = {}
         refs = defaultdict(list)
         titles = self._css(self.title_css, root)
@@ -271,23 +387,90 @@ class LxmlReader(six.with_metaclass(ABCMeta, BaseReader)):
             specials[abstract] = self._parse_text(abstract, element_cls=Abstract, refs=refs, specials=specials)
         for ignore in ignores:
             specials[ignore] = []
-        elements = self._parse_element(root, specials=specials, refs=refs)
-        return Document(*elements)
+        return self._parse_element(root, specials=specials, refs=refs, id=id)
 
 
 class XmlReader(LxmlReader):
     """Reader for generic XML documents."""
 
+    #: Tags of the sections that :meth:`iterparse` parses one at a time, in ``{namespace}name`` notation
+    stream_tags = ()
+
     def detect(self, fstring, fname=None):
         """"""
         if fname and not fname.endswith('.xml'):
             return False
+        if not fname and HTML_RE.search(fstring, 0, 1024):
+            # Leave HTML to the HTML readers
+            return False
         return True
 
     def _make_tree(self, fstring):
-        root = etree.fromstring(fstring, parser=XMLParser(recover=True, encoding=get_encoding(fstring)))
+        root = etree.fromstring(fstring, parser=self._parser(XMLParser, recover=True, encoding=get_encoding(fstring)))
         return root
 
+    def _prepare_section(self, el):
+        """Fix up a section read by :meth:`iterparse` before it is cleaned, in the same way as :meth:`prepare` fixes
+        up a whole file. Reader subclasses may override this."""
+        pass
+
+    @staticmethod
+    def _detach(el):
+        """Remove an element from the tree, leaving its tail text in place."""
+        parent = el.getparent()
+        if parent is None:
+            return
+        if el.tail:
+            previous = el.getprevious()
+            if previous is not None:
+                previous.tail = (previous.tail or '') + el.tail
+            else:
+                parent.text = (parent.text or '') + el.tail
+        el.tail = None
+        parent.remove(el)
+
+    def iterparse(self, f):
+        """Parse an XML file incrementally, yielding its Document elements one section at a time.
+        Each outermost element with one of the :attr:`stream_tags` is removed from the tree as soon as it has been
+        read, then cleaned and parsed on its own, so the memory used is bounded by the largest section rather than
+        the whole file. Whatever is left of the tree once the file has been read is parsed last.
+        :param f: A file-like object opened in binary mode, or path to a file.
+        :raises ReaderError: If the file could not be parsed.
+        """
+        clean = self._compile_cleaners(self.cleaners)
+        context = etree.iterparse(f, events=('end',), tag=self.stream_tags or None, recover=True)
+        try:
+            for event, el in context:
+                if not self.stream_tags or next(el.iterancestors(*self.stream_tags), None) is not None:
+                    # Nested sections are parsed with the section that contains them
+                    continue
+                id = next((a.get('id') for a in el.iterancestors() if a.get('id') is not None), None)
+                self._prepare_section(el)
+                self._detach(el)
+                clean(el)
+                for element in self._parse_root(el, id=id):
+                    yield element
+        except etree.XMLSyntaxError as e:
+            raise ReaderError(e)
+        if context.root is None:
+            raise ReaderError('Unable to read document')
+        for root in self._css(self.root_css, context.root)[:1]:
+            self._prepare_section(root)
+            clean(root)
+            for element in self._parse_root(root):
+                yield element
+
+    def readstream(self, f):
+        """Read a large XML file incrementally, see :meth:`iterparse`.
+        Usage::
+            with open('large.xml', 'rb') as f:
+                for record in ElsevierXmlReader().readstream(f).iter_records():
+                    print(record.serialize())
+        :param f: A file-like object opened in binary mode, or path to a file.
+        :rtype: batterydataextractor.doc.document.StreamDocument
+        """
+        return StreamDocument(self.iterparse(f))
+
 
 class HtmlReader(LxmlReader):
     """Reader for generic HTML documents."""
@@ -299,5 +482,5 @@ class HtmlReader(LxmlReader):
         return True
 
     def _make_tree(self, fstring):
-        root = etree.fromstring(fstring, parser=HTMLParser(encoding=get_encoding(fstring)))
+        root = etree.fromstring(fstring, parser=self._parser(HTMLParser, encoding=get_encoding(fstring)))
         return root
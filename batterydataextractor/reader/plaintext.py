@@ -5,13 +5,25 @@ batterydataextractor.reader.plaintext
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 Plain text document reader.
 """
+import codecs
+import io
 import re
 import six
 
-from ..doc.document import Document
+from ..doc.document import Document, StreamDocument
+from ..doc.text import Paragraph
 from .base import BaseReader
 from ..text import get_encoding
 
+#: Blank lines that separate paragraphs
+PARAGRAPH_SPLIT_RE = re.compile(r'\r\n[ \t]*\r\n|\r[ \t]*\r|\n[ \t]*\n')
+
+#: Characters that a paragraph separator is made of
+SEPARATOR_CHARS = ' \t\r\n'
+
+#: Number of bytes or characters read from a file at a time by :meth:`PlainTextReader.iterparse`
+CHUNK_SIZE = 1048576
+
 
 class PlainTextReader(BaseReader):
     """Read plain text and split into Paragraphs based on newline patterns."""
@@ -27,5 +39,66 @@ class PlainTextReader(BaseReader):
     def parse(self, fstring):
         if isinstance(fstring, six.binary_type):
             fstring = fstring.decode(get_encoding(fstring))
-        para_strings = [p.strip() for p in re.split(r'\r\n[ \t]*\r\n|\r[ \t]*\r|\n[ \t]*\n', fstring)]
+        para_strings = [p.strip() for p in PARAGRAPH_SPLIT_RE.split(fstring)]
         return Document(*para_strings)
+
+    def iterparse(self, f, encoding=None, chunk_size=CHUNK_SIZE):
+        """Read a plain text file in chunks, yielding a Paragraph as soon as it has been read completely.
+        The paragraphs are the same as those of :meth:`parse` on the whole file.
+        :param f: A file-like object opened in text or binary mode, or path to a file.
+        :param string encoding: (Optional) Encoding of a binary file. By default it is detected from the first chunk,
+            taking ASCII to be UTF-8.
+        :param int chunk_size: (Optional) Number of bytes or characters to read at a time.
+        """
+        if isinstance(f, six.string_types):
+            with io.open(f, 'rb') as fh:
+                for element in self.iterparse(fh, encoding=encoding, chunk_size=chunk_size):
+                    yield element
+            return
+        decoder = None
+        buffer = ''
+        # Separators are only searched for before the end of the last text read, where they are known to be complete,
+        # and after the end of the text that has been searched already
+        pos = end = 0
+        while True:
+            chunk = f.read(chunk_size)
+            if isinstance(chunk, six.binary_type):
+                if decoder is None:
+                    if encoding is None:
+                        # Cut at a line end, so the last character of the chunk is not split
+                        cut = chunk.rfind(b'\n') + 1
+                        encoding = get_encoding(chunk[:cut] if cut else chunk) or 'utf-8'
+                        if encoding == 'ascii':
+                            encoding = 'utf-8'
+                    decoder = codecs.getincrementaldecoder(encoding)()
+                text = decoder.decode(chunk, final=not chunk)
+            else:
+                text = chunk
+            buffer += text
+            if not chunk:
+                break
+            stripped = len(text.rstrip(SEPARATOR_CHARS))
+            if stripped:
+                end = len(buffer) - len(text) + stripped
+            start = 0
+            for match in PARAGRAPH_SPLIT_RE.finditer(buffer, pos, end):
+                yield Paragraph(buffer[start:match.start()].strip())
+                start = match.end()
+            buffer = buffer[start:]
+            pos = end = end - start
+        start = 0
+        for match in PARAGRAPH_SPLIT_RE.finditer(buffer, pos):
+            yield Paragraph(buffer[start:match.start()].strip())
+            start = match.end()
+        yield Paragraph(buffer[start:].strip())
+
+    def readstream(self, f, **kwargs):
+        """Read a large plain text file incrementally, see :meth:`iterparse`.
+        Usage::
+            with open('corpus.txt', 'rb') as f:
+                for record in PlainTextReader().readstream(f).iter_records():
+                    print(record.serialize())
+        :param f: A file-like object opened in text or binary mode, or path to a file.
+        :rtype: batterydataextractor.doc.document.StreamDocument
+        """
+        return StreamDocument(self.iterparse(f, **kwargs))
@@ -20,6 +20,8 @@ class SpringerXmlReader(XmlReader):
 
     cleaners = [clean, spr_clean_abstract, spr_clean_ref, strip_spr_xml]
 
+    stream_tags = ('front', 'sec', 'ack', 'app-group', 'ref-list', 'fn-group', 'notes')
+
     root_css = 'article'
     title_css = 'article-title'
     heading1_css = 'title'
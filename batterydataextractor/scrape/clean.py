@@ -6,12 +6,16 @@ batterydataextractor.reader.clean
 Tools for cleaning up XML/HTML by removing tags entirely or replacing with their contents.
 """
 import copy
+import functools
 import logging
 import re
+from lxml import etree
 from lxml.etree import fromstring, tostring
 from lxml.html import fromstring as html_fromstring
 import six
 
+from ..utils import thread_cache
+
 log = logging.getLogger(__name__)
 
 BLOCK_ELEMENTS = {
@@ -21,6 +25,92 @@ BLOCK_ELEMENTS = {
     'tbody',
 }
 
+#: Whitespace around a newline, which is collapsed to a single newline
+NEWLINE_WHITESPACE_RE = re.compile(r'\s*\n\s*')
+
+#: Runs of spaces and tabs, which are collapsed to a single space
+SPACE_RE = re.compile(r'[ \t]+')
+
+
+def _collapse(text):
+    if '\n' in text:
+        text = NEWLINE_WHITESPACE_RE.sub('\n', text)
+    if '\t' in text or '  ' in text:
+        text = SPACE_RE.sub(' ', text)
+    return text
+
+
+def _tree_root(el):
+    """Return the outermost ancestor of an element. This is the root of its tree, or the element itself if it has
+    been removed from its tree."""
+    parent = el.getparent()
+    while parent is not None:
+        el, parent = parent, parent.getparent()
+    return el
+
+
+def collapse_whitespace(el):
+    """Collapse whitespace in the text and tail of an element down to a single space or a single newline."""
+    text = el.text
+    if text is not None and ('\n' in text or '\t' in text or '  ' in text):
+        el.text = _collapse(text)
+    tail = el.tail
+    if tail is not None and ('\n' in tail or '\t' in tail or '  ' in tail):
+        el.tail = _collapse(tail)
+
+
+class ElementPass(object):
+    """A cleaning step that only changes the text and tail of each node it visits.
+    Adjacent element passes are fused into a single traversal of the document by :func:`compile_cleaners`.
+    """
+
+    def __init__(self, func, elements_only=False, whole_tree=False):
+        """
+        :param func: Function that cleans a single node.
+        :param bool elements_only: Skip comments and processing instructions.
+        :param bool whole_tree: Visit every element in the tree, not just the given element and its descendants.
+        """
+        self.func = func
+        self.elements_only = elements_only
+        self.whole_tree = whole_tree
+
+    def __call__(self, doc):
+        root = _tree_root(doc) if self.whole_tree else doc
+        for el in (root.iter(etree.Element) if self.elements_only else root.iter()):
+            self.func(el)
+        return doc
+
+
+class _FusedElementPass(object):
+    """Several element passes applied to each node in a single traversal."""
+
+    def __init__(self, passes):
+        self.passes = passes
+
+    def __call__(self, doc):
+        if any(p.whole_tree for p in self.passes) and doc.getparent() is not None:
+            # The passes visit different parts of the tree, so they can't share a traversal
+            for p in self.passes:
+                p(doc)
+            return doc
+        steps = [(p.func, p.elements_only) for p in self.passes]
+        for el in doc.iter():
+            is_element = isinstance(el.tag, six.string_types)
+            for func, elements_only in steps:
+                if is_element or not elements_only:
+                    func(el)
+        return doc
+
+
+def element_cleaner(func):
+    """Decorator for a function that cleans the text and tail of a single element.
+    The decorated function cleans every element in a document tree, and can be fused with adjacent element passes
+    by :func:`compile_cleaners`.
+    """
+    element_pass = ElementPass(func, elements_only=True, whole_tree=True)
+    functools.update_wrapper(element_pass, func)
+    return element_pass
+
 
 class Cleaner(object):
     """Clean HTML or XML by removing tags completely or replacing with their contents.
@@ -72,78 +162,89 @@ class Cleaner(object):
         """Clean the document."""
         if hasattr(doc, 'getroot'):
             doc = doc.getroot()
+        for clean_pass in self.passes():
+            clean_pass(doc)
 
+    def passes(self):
+        """Return the steps of this Cleaner in the order they are applied. Each step is a callable that takes the
+        document. Steps that only change the text and tail of each element are :class:`ElementPass` instances."""
+        passes = []
         if self.fix_whitespace:
-            # Ensure newlines around block elements
-            for el in doc.iterdescendants():
-                if el.tag in BLOCK_ELEMENTS:
-                    el.tail = (el.tail or '') + '\n'
-                    previous = el.getprevious()
-                    parent = el.getparent()
-                    if previous is None:
-                        parent.text = (parent.text or '') + '\n'
-                    else:
-                        previous.tail = (previous.tail or '') + '\n'
-
-        # Remove elements that match kill_xpath
+            passes.append(self._newlines_around_blocks)
         if self.kill_xpath:
-            for el in doc.xpath(self.kill_xpath, namespaces=self.namespaces):
-                #log.debug('Killing: %s' % tostring(el))
-                parent = el.getparent()
-                # We can't kill the root element!
-                if parent is None:
-                    continue
-                if el.tail:
-                    previous = el.getprevious()
-                    if previous is None:
-                        parent.text = (parent.text or '') + el.tail
-                    else:
-                        previous.tail = (previous.tail or '') + el.tail
-                parent.remove(el)
+            passes.append(self._kill)
+        if self.strip_xpath:
+            passes.append(self._strip)
+        if self.fix_whitespace:
+            passes.append(ElementPass(collapse_whitespace))
+        return passes
 
-        # Collect all the allowed elements
-        to_keep = [el for el in doc.xpath(self.allow_xpath, namespaces=self.namespaces)] if self.allow_xpath else []
+    def _xpath(self, query):
+        """Return the XPath for a query, compiled once for each set of namespaces in each thread."""
+        key = (query, tuple(sorted(self.namespaces.items())))
+        compiled = thread_cache(self, '_compiled')
+        if key not in compiled:
+            compiled[key] = etree.XPath(query, namespaces=self.namespaces)
+        return compiled[key]
 
-        # Replace elements that match strip_xpath with their contents
-        if self.strip_xpath:
-            for el in doc.xpath(self.strip_xpath, namespaces=self.namespaces):
-                # Skip if allowed by allow_xpath
-                if el in to_keep:
-                    continue
-                parent = el.getparent()
+    @staticmethod
+    def _newlines_around_blocks(doc):
+        """Ensure newlines around block elements."""
+        for el in doc.iterdescendants(*BLOCK_ELEMENTS):
+            el.tail = (el.tail or '') + '\n'
+            previous = el.getprevious()
+            parent = el.getparent()
+            if previous is None:
+                parent.text = (parent.text or '') + '\n'
+            else:
+                previous.tail = (previous.tail or '') + '\n'
+
+    def _kill(self, doc):
+        """Remove elements that match kill_xpath."""
+        for el in self._xpath(self.kill_xpath)(doc):
+            #log.debug('Killing: %s' % tostring(el))
+            parent = el.getparent()
+            # We can't kill the root element!
+            if parent is None:
+                continue
+            if el.tail:
                 previous = el.getprevious()
-                # We can't strip the root element!
-                if parent is None:
-                    continue
-                # Append the text to previous tail (or parent text if no previous), ensuring newline if block level
-                if el.text and isinstance(el.tag, six.string_types):
-                    if previous is None:
-                        parent.text = (parent.text or '') + el.text
-                    else:
-                        previous.tail = (previous.tail or '') + el.text
-                # Append the tail to last child tail, or previous tail, or parent text, ensuring newline if block level
-                if el.tail:
-                    if len(el):
-                        last = el[-1]
-                        last.tail = (last.tail or '') + el.tail
-                    elif previous is None:
-                        parent.text = (parent.text or '') + el.tail
-                    else:
-                        previous.tail = (previous.tail or '') + el.tail
-                index = parent.index(el)
-                parent[index:index+1] = el[:]
-
-        # Collapse whitespace down to a single space or a single newline
-        if self.fix_whitespace:
-            for el in doc.iter():
-                if el.text is not None:
-                    el.text = re.sub(r'\s*\n\s*', '\n', el.text)
-                    el.text = re.sub(r'[ \t]+', ' ', el.text)
-                    # el.text = re.sub(r'\s+', ' ', el.text)
-                if el.tail is not None:
-                    el.tail = re.sub(r'\s*\n\s*', '\n', el.tail)
-                    el.tail = re.sub(r'[ \t]+', ' ', el.tail)
-                    # el.tail = re.sub(r'\s+', ' ', el.tail)
+                if previous is None:
+                    parent.text = (parent.text or '') + el.tail
+                else:
+                    previous.tail = (previous.tail or '') + el.tail
+            parent.remove(el)
+
+    def _strip(self, doc):
+        """Replace elements that match strip_xpath with their contents."""
+        # Collect all the allowed elements
+        to_keep = set(self._xpath(self.allow_xpath)(doc)) if self.allow_xpath else set()
+        for el in self._xpath(self.strip_xpath)(doc):
+            # Skip if allowed by allow_xpath
+            if el in to_keep:
+                continue
+            parent = el.getparent()
+            previous = el.getprevious()
+            # We can't strip the root element!
+            if parent is None:
+                continue
+            # Append the text to previous tail (or parent text if no previous), ensuring newline if block level
+            if el.text and isinstance(el.tag, six.string_types):
+                if previous is None:
+                    parent.text = (parent.text or '') + el.text
+                else:
+                    previous.tail = (previous.tail or '') + el.text
+            # Append the tail to last child tail, or previous tail, or parent text, ensuring newline if block level
+            if el.tail:
+                if len(el):
+                    last = el[-1]
+                    last.tail = (last.tail or '') + el.tail
+                elif previous is None:
+                    parent.text = (parent.text or '') + el.tail
+                else:
+                    previous.tail = (previous.tail or '') + el.tail
+            index = parent.index(el)
+            parent[index:index+1] = el[:]
 
     def clean_html(self, html):
         """Apply ``Cleaner`` to HTML string or document and return a cleaned string or document."""
@@ -176,6 +277,41 @@ class Cleaner(object):
             return doc
 
 
+class CompiledCleaner(object):
+    """Several cleaners applied one after another, with adjacent element passes fused into a single traversal."""
+
+    def __init__(self, passes):
+        self.passes = passes
+
+    def __call__(self, doc):
+        if hasattr(doc, 'getroot'):
+            doc = doc.getroot()
+        for clean_pass in self.passes:
+            clean_pass(doc)
+        return doc
+
+
+def compile_cleaners(cleaners):
+    """Compile a list of cleaners into a single cleaner that traverses the document as few times as possible.
+    :class:`Cleaner` instances are split into their steps, and adjacent steps that only change the text and tail of
+    each element (the whitespace collapse of a Cleaner, and functions decorated with :func:`element_cleaner`) are
+    fused into one traversal. The result is identical to applying the cleaners one after another.
+    .. note::
+        The steps of a Cleaner are fixed when it is compiled. Compile again after changing its attributes.
+    :param list cleaners: Cleaner instances and functions that take a document.
+    :rtype: CompiledCleaner
+    """
+    passes = []
+    for cleaner in cleaners:
+        steps = cleaner.passes() if isinstance(cleaner, Cleaner) else [cleaner]
+        for step in steps:
+            if isinstance(step, ElementPass) and passes and isinstance(passes[-1], (ElementPass, _FusedElementPass)):
+                previous = passes.pop()
+                step = _FusedElementPass((previous.passes if isinstance(previous, _FusedElementPass) else [previous]) + [step])
+            passes.append(step)
+    return CompiledCleaner(passes)
+
+
 #: A default Cleaner instance, which kills comments, processing instructions, script tags, style tags.
 clean = Cleaner()
 
@@ -11,6 +11,7 @@ import requests
 import numpy as np
 from bs4 import BeautifulSoup
 from .base import BaseWebScraper
+from .clean import element_cleaner
 
 
 class ElsevierWebScraper(BaseWebScraper):
@@ -151,17 +152,16 @@ def fix_elsevier_xml_whitespace(document):
     return document
 
 
-def els_xml_whitespace(document):
+@element_cleaner
+def els_xml_whitespace(el):
     """ Remove whitespace in xml.text or xml.tails for all elements, if it is only whitespace """
-    # selects all tags and checks if the text or tail are spaces
-    for el in document.xpath('//*'):
-        if str(el.text).isspace():
-            el.text = ''
-        if str(el.tail).isspace():
-            el.tail = ''
-        if el.text:
-            el.text = el.text.replace('\n', ' ')
-    return document
+    # checks if the text or tail are spaces
+    if str(el.text).isspace():
+        el.text = ''
+    if str(el.tail).isspace():
+        el.tail = ''
+    if el.text:
+        el.text = el.text.replace('\n', ' ')
 
 
 def els_clean_abstract(document):
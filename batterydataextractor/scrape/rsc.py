@@ -14,6 +14,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from bs4 import BeautifulSoup
 from .base import BaseWebScraper
+from .clean import element_cleaner
 
 
 class RSCWebScraper(BaseWebScraper):
@@ -216,19 +217,18 @@ RSC_IMG_CHARS = {
 }
 
 
-def rsc_html_whitespace(document):
+@element_cleaner
+def rsc_html_whitespace(el):
     """ Remove whitespace in xml.text or xml.tails for all elements, if it is only whitespace """
-    # selects all tags and checks if the text or tail are spaces
-    for el in document.xpath('//*'):
-        if el.tag == 'b':
-            continue
-        if str(el.text).isspace():
-            el.text = ''
-        if str(el.tail).isspace():
-            el.tail = ''
-        if el.text:
-            el.text = el.text.replace('\n', ' ')
-    return document
+    # checks if the text or tail are spaces
+    if el.tag == 'b':
+        return
+    if str(el.text).isspace():
+        el.text = ''
+    if str(el.tail).isspace():
+        el.tail = ''
+    if el.text:
+        el.text = el.text.replace('\n', ' ')
 
 
 def join_rsc_table_captions(document):
@@ -5,6 +5,7 @@ batterydataextractor.text.__init__
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 Tools for processing text.
 """
+import codecs
 import re
 import unicodedata
 
@@ -211,14 +212,73 @@ ISSN_RE = re.compile(r'^\d{4}-\d{3}[\dX]$', re.U)
 CONTROL_RE = re.compile('[^\u0020-\uD7FF\u0009\u000A\u000D\uE000-\uFFFD\u10000-\u10FFFF]+')
 
 
+#: Byte order marks, and the encodings they identify. UTF-32 is checked before UTF-16, as its marks start the same.
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32le'),
+    (codecs.BOM_UTF32_BE, 'utf-32be'),
+    (codecs.BOM_UTF16_LE, 'utf-16le'),
+    (codecs.BOM_UTF16_BE, 'utf-16be'),
+]
+#: Encoding declared in an XML declaration, searched for in the first 1024 bytes.
+XML_ENCODING_RE = re.compile(br'^\s*<\?.*encoding=[\'"](.*?)[\'"].*\?>', re.I)
+#: Encoding declared in an HTML meta tag, searched for in the first 2048 bytes or 5% of the string.
+HTML_META_RE = re.compile(br'<\s*meta[^>]+charset\s*=\s*["\']?([^>]*?)[ /;\'">]', re.I)
+#: Number of bytes at the start of a string that UnicodeDammit guesses the encoding from.
+DAMMIT_SIZE = 65536
+
+
+def _declared_encoding(input_string, is_html=False):
+    """Return the encoding declared in an XML declaration or, for HTML, a meta tag."""
+    match = XML_ENCODING_RE.search(input_string, 0, 1024)
+    if match is None and is_html:
+        match = HTML_META_RE.search(input_string, 0, max(2048, int(len(input_string) * 0.05)))
+    if match is None:
+        return None
+    encoding = match.group(1).decode('ascii', 'replace').lower()
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return None
+    return encoding
+
+
+def _decodes(input_string, encoding):
+    """Return True if a byte string can be decoded with an encoding without errors."""
+    try:
+        input_string.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+
 def get_encoding(input_string, guesses=None, is_html=False):
-    """Return the encoding of a byte string. Uses bs4 UnicodeDammit.
+    """Return the encoding of a byte string.
+    Cheap checks come first: a byte order mark, an encoding declared in an XML declaration (or an HTML meta tag if
+    ``is_html``), and whether the string is ASCII or UTF-8. Otherwise bs4 UnicodeDammit guesses the encoding from
+    the first :data:`DAMMIT_SIZE` bytes, and from the whole string only if that guess does not decode it.
     :param string input_string: Encoded byte string.
     :param list[string] guesses: (Optional) List of encoding guesses to prioritize.
     :param bool is_html: Whether the input is HTML.
     """
-    converted = UnicodeDammit(input_string, override_encodings=[guesses] if guesses else [], is_html=is_html)
-    return converted.original_encoding
+    if not isinstance(input_string, bytes) or guesses:
+        return UnicodeDammit(input_string, override_encodings=[guesses] if guesses else [],
+                             is_html=is_html).original_encoding
+    for bom, encoding in BOMS:
+        if input_string.startswith(bom):
+            return encoding
+    declared = _declared_encoding(input_string, is_html=is_html)
+    if declared is not None and _decodes(input_string, declared):
+        return declared
+    if input_string.isascii():
+        return 'ascii'
+    if _decodes(input_string, 'utf-8'):
+        return 'utf-8'
+    if len(input_string) > DAMMIT_SIZE:
+        encoding = UnicodeDammit(input_string[:DAMMIT_SIZE], is_html=is_html).original_encoding
+        if encoding and _decodes(input_string, encoding):
+            return encoding
+    return UnicodeDammit(input_string, is_html=is_html).original_encoding
 
 
 def levenshtein(s1, s2, allow_substring=False):
@@ -13,6 +13,79 @@ import six
 
 from . import CONTROLS, HYPHENS, DOUBLE_QUOTES, ACCENTS, SINGLE_QUOTES, APOSTROPHES, SLASHES, TILDES, MINUSES
 from .processors import BaseProcessor
+from ..utils import memoize
+
+
+def _replacement_steps(hyphens, quotes, ellipsis, slashes, tildes):
+    """Return the (old, new) string replacements made by a :class:`Normalizer`, in the order they are made."""
+    # Strip out any control characters (they occasionally creep in somehow)
+    steps = [(control, '') for control in sorted(CONTROLS)]
+    # Normalize unusual whitespace not caught by unicodedata
+    steps += [('\u000b', ' '), ('\u000c', ' '), ('\u0085', ' '), ('\u2028', '\n'), ('\u2029', '\n'), ('\r\n', '\n'),
+              ('\r', '\n')]
+    # Normalize all hyphens, minuses and dashes to ascii hyphen-minus and remove soft hyphen entirely
+    if hyphens:
+        steps += [(hyphen, '-') for hyphen in sorted(HYPHENS | MINUSES)]
+        steps.append(('\u00ad', ''))
+    # Normalize all quotes and primes to ascii apostrophe and quotation mark
+    if quotes:
+        steps += [(double_quote, '"') for double_quote in sorted(DOUBLE_QUOTES)]
+        steps += [(single_quote, "'") for single_quote in sorted(SINGLE_QUOTES | APOSTROPHES | ACCENTS)]
+        steps += [
+            ('′', "'"),     # \u2032 prime
+            ('‵', "'"),     # \u2035 reversed prime
+            ('″', "''"),    # \u2033 double prime
+            ('‶', "''"),    # \u2036 reversed double prime
+            ('‴', "'''"),   # \u2034 triple prime
+            ('‷', "'''"),   # \u2037 reversed triple prime
+            ('⁗', "''''"),  # \u2057 quadruple prime
+        ]
+    if ellipsis:
+        steps += [('…', '...'), (' . . . ', ' ... ')]  # \u2026
+    if slashes:
+        steps += [(slash, '/') for slash in sorted(SLASHES)]
+    if tildes:
+        steps += [(tilde, '~') for tilde in sorted(TILDES)]
+    return steps
+
+
+@memoize
+def compile_replacements(hyphens, quotes, ellipsis, slashes, tildes):
+    """Compile the replacements made by a :class:`Normalizer` into as few passes over the text as possible.
+    Consecutive single character replacements are combined into one ``str.translate`` table, by applying each
+    replacement to the output of the ones before it. Replacements of longer strings are separate passes between the
+    tables, so the result is the same as making every replacement in turn. Most text contains nothing to replace, so
+    the passes are only needed if a single regular expression that matches anything replaced is found in the text.
+    :returns: The regular expression and a list of passes, each either a translate table or an (old, new) tuple for
+        ``str.replace``.
+    :rtype: tuple(re.Pattern, list)
+    """
+    steps = _replacement_steps(hyphens, quotes, ellipsis, slashes, tildes)
+    passes = []
+    table = None
+    for old, new in steps:
+        if len(old) > 1:
+            passes.append((old, new))
+            table = None
+            continue
+        if table is None:
+            table = {}
+            passes.append(table)
+        for char, replacement in table.items():
+            if replacement and old in replacement:
+                table[char] = replacement.replace(old, new)
+        table.setdefault(ord(old), new)
+    for table in passes:
+        if isinstance(table, dict):
+            for char, replacement in list(table.items()):
+                if replacement == chr(char):
+                    del table[char]
+                elif replacement == '':
+                    # Deleting with None rather than an empty string keeps translate on its fast path
+                    table[char] = None
+    chars = ''.join(sorted(re.escape(old) for old, new in steps if len(old) == 1 and old != new))
+    strings = [re.escape(old) for old, new in steps if len(old) > 1]
+    return re.compile('|'.join(['[%s]' % chars] + strings)), passes
 
 
 class BaseNormalizer(six.with_metaclass(ABCMeta, BaseProcessor)):
@@ -71,44 +144,14 @@ class Normalizer(BaseNormalizer):
         if self.form is not None:
             text = unicodedata.normalize(self.form, text)
 
-        # Strip out any control characters (they occasionally creep in somehow)
-        for control in CONTROLS:
-            text = text.replace(control, '')
-
-        # Normalize unusual whitespace not caught by unicodedata
-        text = text.replace('\u000b', ' ').replace('\u000c', ' ').replace(u'\u0085', ' ')
-        text = text.replace('\u2028', '\n').replace('\u2029', '\n').replace('\r\n', '\n').replace('\r', '\n')
-
-        # Normalize all hyphens, minuses and dashes to ascii hyphen-minus and remove soft hyphen entirely
-        if self.hyphens:
-            for hyphen in HYPHENS | MINUSES:
-                text = text.replace(hyphen, '-')
-            text = text.replace('\u00ad', '')
-
-        # Normalize all quotes and primes to ascii apostrophe and quotation mark
-        if self.quotes:
-            for double_quote in DOUBLE_QUOTES:
-                text = text.replace(double_quote, '"')  # \u0022
-            for single_quote in (SINGLE_QUOTES | APOSTROPHES | ACCENTS):
-                text = text.replace(single_quote, "'")  # \u0027
-            text = text.replace('′', "'")     # \u2032 prime
-            text = text.replace('‵', "'")     # \u2035 reversed prime
-            text = text.replace('″', "''")    # \u2033 double prime
-            text = text.replace('‶', "''")    # \u2036 reversed double prime
-            text = text.replace('‴', "'''")   # \u2034 triple prime
-            text = text.replace('‷', "'''")   # \u2037 reversed triple prime
-            text = text.replace('⁗', "''''")  # \u2057 quadruple prime
-
-        if self.ellipsis:
-            text = text.replace('…', '...').replace(' . . . ', ' ... ')  # \u2026
-
-        if self.slashes:
-            for slash in SLASHES:
-                text = text.replace(slash, '/')
-
-        if self.tildes:
-            for tilde in TILDES:
-                text = text.replace(tilde, '~')
+        # Remove control characters and replace unusual whitespace, hyphens, quotes, ellipses, slashes and tildes
+        replace_re, passes = compile_replacements(self.hyphens, self.quotes, self.ellipsis, self.slashes, self.tildes)
+        if replace_re.search(text):
+            for replacements in passes:
+                if isinstance(replacements, dict):
+                    text = text.translate(replacements)
+                else:
+                    text = text.replace(*replacements)
 
         if self.strip:
             text = text.strip()
@@ -154,6 +197,11 @@ strict_normalize = Normalizer(strip=True, collapse=True, hyphens=True, quotes=Tr
 # excess_normalize = ExcessNormalizer(strip=True, collapse=True, hyphens=True, quotes=True, ellipsis=True, tildes=True)
 
 
+#: Chemical spellings unified by :class:`ChemNormalizer`, whatever their case.
+CHEM_SPELLING = {'sulph': 'sulf', 'aluminum': 'aluminium', 'cesium': 'caesium'}
+CHEM_SPELLING_RE = re.compile('|'.join(CHEM_SPELLING), re.I)
+
+
 class ChemNormalizer(Normalizer):
     """Normalizer that also unifies chemical spelling."""
 
@@ -169,9 +217,7 @@ class ChemNormalizer(Normalizer):
         text = super(ChemNormalizer, self).normalize(text)
         # Normalize element spelling
         if self.chem_spell:
-            text = re.sub(r'sulph', r'sulf', text, flags=re.I)
-            text = re.sub(r'aluminum', r'aluminium', text, flags=re.I)
-            text = re.sub(r'cesium', r'caesium', text, flags=re.I)
+            text = CHEM_SPELLING_RE.sub(lambda m: CHEM_SPELLING[m.group().lower()], text)
         return text
 
 #
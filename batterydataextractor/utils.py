@@ -9,6 +9,7 @@ import errno
 import functools
 import logging
 import os
+import threading
 
 import six
 
@@ -40,6 +41,40 @@ def memoize(obj):
     return memoizer
 
 
+def locked_memoize(obj):
+    """Decorator to create memoized functions that are safe to call from several threads, e.g. to load models.
+    Threads that call the function with the same arguments at the same time wait for the first call to finish, so each
+    result is only created once. Calls with other arguments are not held up."""
+    cache = obj.cache = {}
+    locks = {}
+    locks_lock = threading.Lock()
+
+    @functools.wraps(obj)
+    def memoizer(*args, **kwargs):
+        if args in cache:
+            return cache[args]
+        with locks_lock:
+            lock = locks.setdefault(args, threading.Lock())
+        with lock:
+            if args not in cache:
+                cache[args] = obj(*args, **kwargs)
+        return cache[args]
+    return memoizer
+
+
+def thread_cache(obj, name):
+    """Return a cache dict kept on an object or class in the attribute ``name``, with a separate dict for each thread.
+    Used for lxml parsers and compiled XPaths, which can't be used by several threads at once."""
+    local = vars(obj).get(name)
+    if local is None:
+        local = threading.local()
+        setattr(obj, name, local)
+    cache = getattr(local, 'cache', None)
+    if cache is None:
+        cache = local.cache = {}
+    return cache
+
+
 def python_2_unicode_compatible(klass):
     """Fix __str__, __unicode__ and __repr__ methods under Python 2."""
     if six.PY2:
@@ -57,10 +92,17 @@ def python_2_unicode_compatible(klass):
 class Singleton(type):
     """Singleton metaclass."""
     _instances = {}
+    _lock = threading.Lock()
 
     def __call__(cls, *args, **kwargs):
         if cls not in cls._instances:
-            cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
+            with Singleton._lock:
+                if cls not in cls._instances:
+                    cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
+                    return cls._instances[cls]
+        if args or kwargs:
+            # The arguments would be silently ignored, as the existing instance is not initialized again
+            raise TypeError('%s has already been created, so it takes no arguments' % cls.__name__)
         return cls._instances[cls]
 
 
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Time detecting the encoding of multi-megabyte documents with UnicodeDammit over the whole file and with get_encoding.
+"""
+import argparse
+import io
+import os
+import timeit
+
+from bs4 import UnicodeDammit
+
+from batterydataextractor.text import get_encoding
+
+TESTPAPER = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'testpapers', 'els_test1.xml')
+
+
+def make_documents(size, testpaper=TESTPAPER):
+    """
+    Build documents of about the given size by repeating a test paper
+    :param size: approximate size of each document in bytes
+    :param testpaper: the XML test paper to enlarge
+    :return: dict of documents by name
+    """
+    with io.open(testpaper, 'rb') as f:
+        content = f.read()
+    body = content * (size // len(content) + 1)
+    text = body.decode('utf-8')
+    latin = text.encode('latin-1', 'replace')
+    return {
+        'declared utf-8': b'<?xml version="1.0" encoding="UTF-8"?>' + body,
+        'utf-8': body,
+        'ascii': text.encode('ascii', 'replace'),
+        'declared latin-1': b'<?xml version="1.0" encoding="ISO-8859-1"?>' + latin,
+        'latin-1': latin,
+    }
+
+
+def main(size, number):
+    print('%-18s %10s %14s %14s %10s' % ('document', 'size (MB)', 'dammit (ms)', 'fast (ms)', 'encoding'))
+    for name, data in make_documents(size).items():
+        dammit = min(timeit.repeat(lambda: UnicodeDammit(data).original_encoding, number=1, repeat=number))
+        fast = min(timeit.repeat(lambda: get_encoding(data), number=1, repeat=number))
+        print('%-18s %10.1f %14.1f %14.1f %10s' % (name, len(data) / 1e6, dammit * 1e3, fast * 1e3, get_encoding(data)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-s', '--size', type=int, default=5000000, help='approximate document size in bytes')
+    parser.add_argument('-n', '--number', type=int, default=3, help='number of repeats for each timing')
+    args = parser.parse_args()
+    main(args.size, args.number)
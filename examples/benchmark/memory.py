@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Memory used by a Document read from a test paper, once its text has been split into sentences and tokens.
+"""
+import argparse
+import gc
+import io
+import os
+import tracemalloc
+
+from batterydataextractor.doc import Document
+from batterydataextractor.doc.text import Text
+from batterydataextractor.reader import ElsevierXmlReader
+
+TESTPAPER = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'testpapers', 'els_test1.xml')
+
+
+def measure(path):
+    """
+    Read a paper and tokenize all of its text
+    :param path: location of the Elsevier XML paper
+    :return: tuple of (document, memory in bytes allocated while reading and tokenizing it)
+    """
+    with io.open(path, 'rb') as f:
+        content = f.read()
+    reader = ElsevierXmlReader()
+    # Load the sentence and word tokenizers before measuring
+    Text('A warm up. Sentence.').sentences[0].tokens
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    d = Document(*reader.readstring(reader.prepare(content)).elements)
+    counts = [0, 0, 0]
+    for el in d.elements:
+        if isinstance(el, Text):
+            counts[0] += 1
+            for sentence in el.sentences:
+                counts[1] += 1
+                counts[2] += len(sentence.tokens)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return d, counts, used
+
+
+def main(path):
+    d, (elements, sentences, tokens), used = measure(path)
+    print('text elements: %d  sentences: %d  tokens: %d' % (elements, sentences, tokens))
+    print('document memory: %.2f MB' % (used / 1e6))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path', nargs='?', default=TESTPAPER, help='Elsevier XML paper to read')
+    args = parser.parse_args()
+    main(args.path)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Time normalizing words and paragraphs by making each replacement in turn and with the compiled translate tables.
+"""
+import argparse
+import io
+import os
+import re
+import timeit
+import unicodedata
+
+from batterydataextractor.text.normalize import ChemNormalizer, CHEM_SPELLING, _replacement_steps
+
+TESTPAPER = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'testpapers', 'els_test1.xml')
+
+
+def sequential_normalize(text, steps):
+    """Normalize text like ChemNormalizer did before its replacements were compiled, one pass per replacement."""
+    text = unicodedata.normalize('NFKC', text)
+    for old, new in steps:
+        text = text.replace(old, new)
+    text = ' '.join(text.strip().split())
+    for old, new in CHEM_SPELLING.items():
+        text = re.sub(old, new, text, flags=re.I)
+    return text
+
+
+def load_texts(testpaper=TESTPAPER):
+    """
+    Return the paragraphs and words of a test paper
+    :param testpaper: the XML test paper to read
+    :return: tuple of (paragraphs, words)
+    """
+    with io.open(testpaper, 'r', encoding='utf-8') as f:
+        content = re.sub(r'<[^>]+>', '\n', f.read())
+    paragraphs = [p for p in (line.strip() for line in content.split('\n')) if p]
+    words = [w for p in paragraphs for w in p.split()]
+    return paragraphs, words
+
+
+def main(number):
+    paragraphs, words = load_texts()
+    normalizer = ChemNormalizer()
+    steps = _replacement_steps(hyphens=True, quotes=True, ellipsis=True, slashes=False, tildes=True)
+    assert all(normalizer(text) == sequential_normalize(text, steps) for text in paragraphs + words)
+    print('%-12s %8s %16s %16s %8s' % ('input', 'count', 'sequential (ms)', 'compiled (ms)', 'speedup'))
+    for name, texts in (('paragraphs', paragraphs), ('words', words)):
+        sequential = min(timeit.repeat(lambda: [sequential_normalize(t, steps) for t in texts], number=1,
+                                       repeat=number))
+        compiled = min(timeit.repeat(lambda: [normalizer(t) for t in texts], number=1, repeat=number))
+        print('%-12s %8d %16.1f %16.1f %8.1f' % (name, len(texts), sequential * 1e3, compiled * 1e3,
+                                                 sequential / compiled))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--number', type=int, default=5, help='number of repeats for each timing')
+    args = parser.parse_args()
+    main(args.number)
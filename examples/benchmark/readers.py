@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of the document readers on the test papers.
+"""
+import argparse
+import io
+import os
+import timeit
+
+from batterydataextractor.reader import ElsevierXmlReader, RscHtmlReader, SpringerXmlReader
+from batterydataextractor.reader.markup import LxmlReader, _css_translator
+
+TESTPAPERS = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'testpapers')
+
+READERS = {
+    'els': ElsevierXmlReader,
+    'rsc': RscHtmlReader,
+    'spr': SpringerXmlReader,
+}
+
+
+def css_selectors(reader_cls):
+    """Return all the CSS selectors defined on a reader class."""
+    return [getattr(reader_cls, name) for name in dir(reader_cls)
+            if name.endswith('_css') and isinstance(getattr(reader_cls, name), str)]
+
+
+def main(number, directory=TESTPAPERS):
+    """
+    Time parsing each test paper, and running all CSS selectors of its reader on the parsed tree
+    :param number: number of repeats for each timing
+    :param directory: location of the test papers
+    :return:
+    """
+    print('%-16s %12s %14s %14s' % ('paper', 'parse (ms)', 'css cold (ms)', 'css warm (ms)'))
+    for fname in sorted(os.listdir(directory)):
+        reader_cls = READERS.get(fname.split('_')[0])
+        if reader_cls is None:
+            continue
+        with io.open(os.path.join(directory, fname), 'rb') as f:
+            content = f.read()
+        reader = reader_cls()
+        parse = timeit.timeit(lambda: reader.readstring(reader.prepare(content)), number=number) / number
+        root = reader._make_tree(reader.prepare(content))
+        selectors = css_selectors(reader_cls)
+
+        def cold():
+            # Translate every selector again, as readers did before they compiled them
+            for query in selectors:
+                LxmlReader._xpath(_css_translator.css_to_xpath(query), root)
+
+        def warm():
+            for query in selectors:
+                reader._css(query, root)
+
+        cold_time = timeit.timeit(cold, number=number) / number
+        warm_time = timeit.timeit(warm, number=number) / number
+        print('%-16s %12.2f %14.2f %14.2f' % (fname, parse * 1000, cold_time * 1000, warm_time * 1000))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--number', type=int, default=10, help='number of repeats for each timing')
+    args = parser.parse_args()
+    main(args.number)
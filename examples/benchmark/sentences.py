@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Agreement of the rule-based sentence tokenizer with the spaCy one on the test papers, and the throughput of both.
+"""
+import argparse
+import os
+import time
+
+from batterydataextractor.doc import Document, Text
+from batterydataextractor.doc.element import CaptionedElement
+from batterydataextractor.nlp.tokenize import ChemRegexSentenceTokenizer, ChemSentenceTokenizer
+
+TESTPAPERS = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'testpapers')
+
+
+def load_texts(directory=TESTPAPERS):
+    """Return the texts of all text elements and captions in the test papers."""
+    texts = []
+    for fname in sorted(os.listdir(directory)):
+        d = Document.from_file(os.path.join(directory, fname))
+        for el in d.elements:
+            if isinstance(el, CaptionedElement):
+                el = el.caption
+            if isinstance(el, Text) and el.text.strip():
+                texts.append(el.text)
+    return texts
+
+
+def throughput(tokenizer, texts, number):
+    """Return the spans of each text, and the best time taken to split all texts."""
+    best = None
+    for _ in range(number):
+        start = time.time()
+        spans = [tokenizer.span_tokenize(text) for text in texts]
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return spans, best
+
+
+def main(number):
+    texts = load_texts()
+    spacy_spans, spacy_time = throughput(ChemSentenceTokenizer(), texts, number)
+    regex_spans, regex_time = throughput(ChemRegexSentenceTokenizer(), texts, number)
+    # Sentence ends found by each tokenizer, ignoring the end of each text which both always find
+    spacy_ends = set((i, end) for i, spans in enumerate(spacy_spans) for _, end in spans[:-1])
+    regex_ends = set((i, end) for i, spans in enumerate(regex_spans) for _, end in spans[:-1])
+    same = sum(1 for a, b in zip(spacy_spans, regex_spans) if a == b)
+    n_spacy = sum(len(spans) for spans in spacy_spans)
+    n_regex = sum(len(spans) for spans in regex_spans)
+    print('texts: %d, identically split: %d (%.1f%%)' % (len(texts), same, 100.0 * same / len(texts)))
+    print('sentence ends inside texts: spacy %d, regex %d, both %d' % (
+        len(spacy_ends), len(regex_ends), len(spacy_ends & regex_ends)))
+    if spacy_ends and regex_ends:
+        print('precision %.3f, recall %.3f against spacy' % (
+            len(spacy_ends & regex_ends) / float(len(regex_ends)), len(spacy_ends & regex_ends) / float(len(spacy_ends))))
+    print('%-8s %12s %10s %16s' % ('splitter', 'sentences', 'time (s)', 'sentences/s'))
+    print('%-8s %12d %10.3f %16.0f' % ('spacy', n_spacy, spacy_time, n_spacy / spacy_time))
+    print('%-8s %12d %10.3f %16.0f' % ('regex', n_regex, regex_time, n_regex / regex_time))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--number', type=int, default=3, help='number of repeats for each timing')
+    args = parser.parse_args()
+    main(args.number)
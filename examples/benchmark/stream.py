@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Peak memory of reading a large Elsevier XML file all at once and incrementally.
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from batterydataextractor.reader import ElsevierXmlReader
+
+TESTPAPER = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'testpapers', 'els_test1.xml')
+
+
+def make_large_file(path, copies, testpaper=TESTPAPER):
+    """
+    Write a copy of a test paper with its body sections repeated
+    :param path: location of the file to write
+    :param copies: number of times the sections are repeated
+    :param testpaper: the Elsevier test paper to enlarge
+    :return:
+    """
+    with io.open(testpaper, 'rb') as f:
+        content = f.read()
+    start = content.index(b'<ce:sections>') + len(b'<ce:sections>')
+    end = content.index(b'</ce:sections>')
+    with io.open(path, 'wb') as f:
+        f.write(content[:start])
+        for _ in range(copies):
+            f.write(content[start:end])
+        f.write(content[end:])
+
+
+def _run(path, mode, queue):
+    reader = ElsevierXmlReader()
+    start = time.time()
+    if mode == 'readstring':
+        with io.open(path, 'rb') as f:
+            count = len(reader.readstring(reader.prepare(f.read())).elements)
+    else:
+        count = sum(1 for _ in reader.iterparse(path))
+    queue.put((count, time.time() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def measure(path, mode):
+    """Read the file in a new process, and return the number of elements, the time taken and the peak memory."""
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run, args=(path, mode, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(copies):
+    fd, path = tempfile.mkstemp(suffix='.xml')
+    os.close(fd)
+    try:
+        make_large_file(path, copies)
+        print('file size: %.1f MB' % (os.path.getsize(path) / 1e6))
+        print('%-12s %10s %10s %16s' % ('mode', 'elements', 'time (s)', 'peak RSS (MB)'))
+        for mode in ('readstring', 'iterparse'):
+            count, seconds, rss = measure(path, mode)
+            print('%-12s %10d %10.2f %16.1f' % (mode, count, seconds, rss / 1024.0))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-c', '--copies', type=int, default=200, help='number of copies of the body sections')
+    args = parser.parse_args()
+    main(args.copies)
@@ -1,7 +1,21 @@
+import io
 import logging
+import os
+import shutil
+import tempfile
 import unittest
 
-from batterydataextractor.doc.document import Document
+from lxml import etree
+
+from batterydataextractor.config import Config
+from batterydataextractor.doc import document
+from batterydataextractor.doc.document import Document, StreamDocument, RETAIN_ALL, RETAIN_RECORDS, RETAIN_TOKENS
+from batterydataextractor.doc.element import CaptionedElement
+from batterydataextractor.doc.meta import MetaData
+from batterydataextractor.doc.text import Caption, Heading1, Paragraph, Text, Title
+from batterydataextractor.reader import ElsevierXmlReader, HtmlReader, RscHtmlReader, XmlReader
+from batterydataextractor.nlp.tag import NoneTagger
+from batterydataextractor.reader.base import SNIFF_SIZE, sniff
 
 logging.basicConfig(level=logging.DEBUG)
 log = logging.getLogger(__name__)
@@ -46,6 +60,310 @@ class TestDocument(unittest.TestCase):
         self.assertEqual(d[2].text, 'A third paragraph.')
         self.assertEqual([e.text for e in d], els)
 
+    def test_segment_sentences(self):
+        """Test splitting all elements into sentences at once gives the same sentences as splitting each element."""
+        els = [
+            'A first paragraph. With two sentences.',
+            Title('A title'),
+            'A third paragraph. It has two sentences, too.'
+        ]
+        d = Document(*els)
+        d.elements[2].sentences
+        d.segment_sentences(batch_size=2)
+        expected = [[(s.text, s.start, s.end) for s in el.sentences] for el in Document(*els).elements]
+        self.assertEqual([[(s.text, s.start, s.end) for s in el.sentences] for el in d.elements], expected)
+        self.assertEqual(d.elements[0].sentences[1].document, d)
+
+    def test_segment_sentences_config(self):
+        """Test elements that each get their own sentence tokenizer from a config file are still split in one batch."""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'config.yml')
+        with io.open(path, 'w', encoding='utf8') as f:
+            f.write(u'SENTENCE_TOKENIZER: ChemSentenceTokenizer\n')
+        els = [Paragraph('Paragraph %s. It has two sentences.' % i) for i in range(5)]
+        d = Document(*els, config=Config(path))
+        tokenizers = [el.sentence_tokenizer for el in d.elements]
+        self.assertEqual(len(set(map(id, tokenizers))), 5)
+        sizes = []
+
+        def record_batch(span_tokenize_batch):
+            def wrapper(strings, **kwargs):
+                sizes.append(len(strings))
+                return span_tokenize_batch(strings, **kwargs)
+            return wrapper
+
+        for tokenizer in tokenizers:
+            tokenizer.span_tokenize_batch = record_batch(tokenizer.span_tokenize_batch)
+        d.segment_sentences()
+        self.assertEqual(sizes, [5])
+        self.assertEqual([el.raw_sentences for el in d.elements],
+                         [['Paragraph %s.' % i, 'It has two sentences.'] for i in range(5)])
+
+    def test_shared_text_buffer(self):
+        """Test the text of elements, sentences and tokens are views of buffers shared by the whole document."""
+        first = Paragraph('A first paragraph. With two sentences.')
+        first.sentences
+        els = [first, Title('A title'), 'Wide text \u2014 a dash. Done.', 'A last paragraph.']
+        d = Document(*els)
+        self.assertIs(d.elements[0]._buffer, d.elements[1]._buffer)
+        self.assertIs(d.elements[0]._buffer, d.elements[3]._buffer)
+        self.assertIsNot(d.elements[0]._buffer, d.elements[2]._buffer)
+        self.assertEqual([e.text for e in d], [first.text, 'A title', 'Wide text \u2014 a dash. Done.',
+                                               'A last paragraph.'])
+        self.assertEqual([s.text for s in d.elements[0].sentences], ['A first paragraph.', 'With two sentences.'])
+        self.assertIs(d.elements[0].sentences[1]._buffer, d.elements[0]._buffer)
+        self.assertEqual([s.text for s in d.elements[2].sentences], ['Wide text \u2014 a dash.', 'Done.'])
+        self.assertEqual(d.elements[3].sentences[0].raw_tokens, ['A', 'last', 'paragraph', '.'])
+        self.assertEqual(d.elements[3].sentences[0].tokens[1].text, 'last')
+        self.assertEqual(d.elements[3].sentences[0].tokens[1].start, 2)
+
+
+class TestElementIndex(unittest.TestCase):
+    """Test looking up Document elements by id and type."""
+
+    def setUp(self):
+        self.figure = CaptionedElement(Caption('Figure 1. A graph.', id='fig1-caption'), id='fig1')
+        self.d = Document(
+            Title('A title', id='title'),
+            Paragraph('A first paragraph.', id='p1'),
+            Heading1('A heading', id='h1'),
+            self.figure,
+            Paragraph('A second paragraph.', id='p2'),
+            Caption('A caption.', id='cap'),
+        )
+
+    def test_get_element_with_id(self):
+        self.assertEqual(self.d.get_element_with_id('p2').text, 'A second paragraph.')
+        self.assertIs(self.d.get_element_with_id('fig1'), self.figure)
+        self.assertIs(self.d.get_element_with_id('fig1-caption'), self.figure.caption)
+        self.assertIsNone(self.d.get_element_with_id('missing'))
+
+    def test_types(self):
+        self.assertEqual([el.id for el in self.d.paragraphs], ['p1', 'p2'])
+        self.assertEqual([el.id for el in self.d.titles], ['title'])
+        self.assertEqual([el.id for el in self.d.captions], ['cap'])
+        self.assertEqual([el.id for el in self.d.captioned_elements], ['fig1'])
+        self.assertEqual([el.id for el in self.d.elements_of_type(Caption, nested=True)], ['fig1-caption', 'cap'])
+        self.assertEqual([el.id for el in self.d.elements_of_type(Text)], ['title', 'p1', 'h1', 'p2', 'cap'])
+
+    def test_add_element(self):
+        self.assertEqual(len(self.d.paragraphs), 2)
+        p3 = self.d.add_element('A third paragraph.')
+        self.assertIs(p3.document, self.d)
+        self.assertEqual(self.d.paragraphs[-1], p3)
+        self.d.add_element(CaptionedElement(Caption('Table 1.', id='tab1-caption'), id='tab1'))
+        self.assertEqual(self.d.get_element_with_id('tab1-caption').text, 'Table 1.')
+        self.assertEqual(len(self.d), 8)
+
+    def test_elements_changed(self):
+        """Test the index is rebuilt when the element list is changed directly."""
+        self.assertEqual(len(self.d.paragraphs), 2)
+        self.d.elements.append(Paragraph('Appended.', id='p3'))
+        self.assertEqual(self.d.get_element_with_id('p3').text, 'Appended.')
+        self.d.elements[0].id = 'renamed'
+        self.d.reset_element_index()
+        self.assertEqual(self.d.get_element_with_id('renamed').text, 'A title')
+
+    def test_unhashable_id(self):
+        d = Document(Paragraph('First.', id=['a']), Paragraph('Second.', id='b'))
+        self.assertEqual(d.get_element_with_id(['a']).text, 'First.')
+        self.assertEqual(d.get_element_with_id('b').text, 'Second.')
+
+
+class TestFromFile(unittest.TestCase):
+    """Test reading Documents from files with the default readers."""
+
+    def _path(self, fname):
+        return os.path.join(os.path.dirname(__file__), 'testpapers', fname)
+
+    def test_sniff(self):
+        """Test the sniffed prefix extends to the end of the HTML head, which contains the RSC DOI."""
+        with open(self._path('rsc_test1.html'), 'rb') as f:
+            content = f.read()
+        prefix = sniff(content)
+        self.assertGreater(len(prefix), SNIFF_SIZE)
+        self.assertTrue(prefix.endswith(b'<!--6_2_1-->'))
+        self.assertTrue(RscHtmlReader().detect(prefix))
+        self.assertFalse(XmlReader().detect(prefix))
+        self.assertTrue(HtmlReader().detect(prefix))
+        with open(self._path('els_test1.xml'), 'rb') as f:
+            content = f.read()
+        self.assertEqual(len(sniff(content)), SNIFF_SIZE)
+        self.assertTrue(ElsevierXmlReader().detect(sniff(content)))
+
+    def test_head_rewrite(self):
+        """Test only the Elsevier reader renames the article head."""
+        self.assertEqual(ElsevierXmlReader().prepare(b'<a><head>x</head></a>'), b'<a><ce:head>x</ce:head></a>')
+        self.assertEqual(RscHtmlReader().prepare(b'<html><head></head></html>'), b'<html><head></head></html>')
+
+    def test_default_readers(self):
+        els = Document.from_file(self._path('els_test2.xml'))
+        self.assertEqual(len(els.elements), 50)
+        self.assertEqual(len(els.headdata), 1)
+        rsc = Document.from_file(self._path('rsc_test2.html'))
+        self.assertEqual(len(rsc.elements), 60)
+        self.assertEqual(rsc.headdata, [])
+        self.assertEqual(len(rsc.metadata), 1)
+
+    def test_mmap(self):
+        """Test large files are read through a memory map."""
+        mmap_size = document.MMAP_SIZE
+        document.MMAP_SIZE = 0
+        try:
+            d = Document.from_file(self._path('els_test2.xml'))
+        finally:
+            document.MMAP_SIZE = mmap_size
+        self.assertEqual(len(d.elements), 50)
+        self.assertEqual(d.headdata[0].title,
+                         'The effect of temperature on the electrode properties of the directly prepared Ti3Ni2 alloy')
+
+    def test_from_files(self):
+        """Test documents read in parallel are the same, and in the same order, as documents read one by one."""
+        paths = [self._path(fname) for fname in sorted(os.listdir(self._path(''))) for _ in range(2)]
+        docs = Document.from_files(paths, workers=4)
+        self.assertEqual(len(docs), len(paths))
+        for path, d in zip(paths, docs):
+            self.assertEqual(d.serialize(), Document.from_file(path).serialize())
+
+
+class TestStreamDocument(unittest.TestCase):
+    """Test documents that are read one element at a time."""
+
+    def test_elements(self):
+        config = Config()
+        d = StreamDocument(iter([Title('A title'), 'Some text.']), config=config)
+        elements = list(d)
+        self.assertEqual([el.text for el in elements], ['A title', 'Some text.'])
+        self.assertIsInstance(elements[1], Paragraph)
+        self.assertIs(elements[1].document, d)
+        self.assertIs(elements[1].document.config, config)
+        # The elements are only read once
+        self.assertEqual(list(d), [])
+
+    def test_records(self):
+        texts = ['A title', 'First paragraph.', 'Second paragraph.']
+        records = Document(*texts).records
+        self.assertEqual(list(StreamDocument(texts).iter_records()), list(records))
+        self.assertEqual(list(Document(*texts).iter_records()), list(records))
+
+    def test_detach(self):
+        """Test sections removed from the tree while it is read leave the surrounding text in place."""
+        root = etree.fromstring('<a>x<sec>1</sec>y<b/>z<sec>2</sec>w</a>')
+        for sec in root.findall('sec'):
+            XmlReader._detach(sec)
+        self.assertEqual(etree.tostring(root), b'<a>xy<b/>zw</a>')
+
+
+class TagAll(NoneTagger):
+    """Tag every token with its position, so saved tags can be told apart."""
+
+    def tag(self, tokens):
+        return [(token, 'T%s' % i) for i, token in enumerate(tokens)]
+
+
+class TestAnnotations(unittest.TestCase):
+    """Test saving and loading the annotations of a Document."""
+
+    def setUp(self):
+        self.d = Document(
+            Title('Ti3Ni2 alloy electrodes', id='t1', pos_tagger=TagAll(), ner_tagger=NoneTagger()),
+            MetaData({'_title': 'A title', '_authors': ['A', 'B']}),
+            Paragraph('The capacity is 372 mAh/g. It fades after 50 cycles.', id='p1', references=['r1'],
+                      pos_tagger=TagAll(), ner_tagger=TagAll()),
+        )
+
+    def test_round_trip(self):
+        f = io.BytesIO()
+        self.d.save_annotations(f)
+        f.seek(0)
+        d = Document.load_annotations(f)
+        self.assertEqual([type(el) for el in d.elements], [Title, MetaData, Paragraph])
+        self.assertEqual([el.serialize() for el in d.elements], [el.serialize() for el in self.d.elements])
+        self.assertEqual([el.id for el in d.elements], ['t1', None, 'p1'])
+        self.assertEqual(d.elements[2].references, ['r1'])
+        self.assertEqual(d.elements[1].authors, ['A', 'B'])
+        for el, saved in [(d.elements[0], self.d.elements[0]), (d.elements[2], self.d.elements[2])]:
+            self.assertEqual(el.raw_sentences, saved.raw_sentences)
+            self.assertEqual([[(t.text, t.start, t.end) for t in s.tokens] for s in el.sentences],
+                             [[(t.text, t.start, t.end) for t in s.tokens] for s in saved.sentences])
+            self.assertEqual(el.pos_tags, saved.pos_tags)
+            self.assertEqual(el.ner_tags, saved.ner_tags)
+            self.assertEqual([s.parser_tokens for s in el.sentences], [s.parser_tokens for s in saved.sentences])
+        self.assertIs(d.elements[2].sentences[-1].document, d)
+        # Tags are restored, not tagged again by the default taggers
+        self.assertEqual(d.elements[0].sentences[0].token_table.ner_tags, [None, None, None])
+
+    def test_unsupported_element(self):
+        d = Document(CaptionedElement(Caption('A caption')))
+        with self.assertRaises(TypeError):
+            d.save_annotations(io.BytesIO())
+
+
+class TestRetention(unittest.TestCase):
+    """Test what a Document keeps once its records are found."""
+
+    def make_document(self, retention=RETAIN_ALL):
+        return Document(
+            Paragraph('The capacity fades quickly. It is 372 mAh/g after 50 cycles.', pos_tagger=TagAll(), ner_tagger=TagAll()),
+            CaptionedElement(Caption('A caption.', pos_tagger=TagAll(), ner_tagger=TagAll())),
+            retention=retention,
+        )
+
+    def annotate(self, d):
+        for el in (d.elements[0], d.elements[1].caption):
+            el.ner_tags
+            el.cems
+            el.abbreviation_definitions
+        return d.records
+
+    def test_retain_all(self):
+        d = self.make_document()
+        self.annotate(d)
+        sentence = d.elements[0].sentences[0]
+        self.assertEqual(sentence.token_table.ner_tags, ['T0', 'T1', 'T2', 'T3', 'T4'])
+        self.assertTrue(hasattr(sentence, '_cems'))
+        self.assertTrue(hasattr(d.elements[1].caption, '_sentences'))
+
+    def test_retain_tokens(self):
+        d = self.make_document(RETAIN_TOKENS)
+        records = self.annotate(d)
+        sentence = d.elements[0].sentences[0]
+        self.assertIs(d.elements[0].sentences[0], sentence)
+        self.assertEqual(sentence.token_table.texts(),
+                         ['The', 'capacity', 'fades', 'quickly', '.'])
+        self.assertIsNone(sentence.token_table.ner_tags)
+        self.assertFalse(hasattr(sentence, '_cems'))
+        self.assertFalse(hasattr(sentence, '_abbreviation_spans'))
+        self.assertTrue(hasattr(d.elements[1].caption, '_sentences'))
+        # Annotations are computed again when they are used
+        self.assertEqual(sentence.ner_tags, ['T0', 'T1', 'T2', 'T3', 'T4'])
+        self.assertEqual(list(d.records), list(records))
+
+    def test_retain_records(self):
+        d = self.make_document(RETAIN_RECORDS)
+        records = self.annotate(d)
+        self.assertFalse(hasattr(d.elements[0], '_sentences'))
+        self.assertFalse(hasattr(d.elements[1].caption, '_sentences'))
+        self.assertIs(d.records, records)
+        self.assertFalse(hasattr(d.elements[0], '_sentences'))
+        self.assertEqual(d.elements[0].raw_sentences, ['The capacity fades quickly.', 'It is 372 mAh/g after 50 cycles.'])
+
+    def test_release(self):
+        d = self.make_document()
+        with d:
+            self.annotate(d)
+            self.assertTrue(hasattr(d.elements[0], '_sentences'))
+        self.assertFalse(hasattr(d.elements[0], '_sentences'))
+        self.annotate(d)
+        d.release(keep_tokens=True)
+        self.assertTrue(hasattr(d.elements[0], '_sentences'))
+        self.assertIsNone(d.elements[0].sentences[1].token_table.pos_tags)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            Document('Some text.', retention='sentences')
+
 
 if __name__ == '__main__':
     unittest.main()
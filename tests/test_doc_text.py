@@ -3,7 +3,8 @@ import unittest
 import os
 
 from batterydataextractor.doc.document import Document
-from batterydataextractor.doc.text import Paragraph, Title, Heading1, Caption, Footnote
+from batterydataextractor.doc.text import Paragraph, Title, Heading1, Caption, Footnote, Token, TokenTable
+from batterydataextractor.nlp.tag import BaseTagger, NoneTagger
 # from batterydataextractor.config import Config
 # from batterydataextractor.model import Compound, NmrSpectrum, IrSpectrum, UvvisSpectrum, MeltingPoint, GlassTransition
 from batterydataextractor.nlp import *
@@ -66,3 +67,69 @@ class TestText(unittest.TestCase):
         self.assertEqual(type(title.lexicon), ChemLexicon)
         self.assertEqual(type(title.sentence_tokenizer), ChemSentenceTokenizer)
         self.assertEqual(type(title.word_tokenizer), ChemWordTokenizer)
+
+
+class UpperTagger(BaseTagger):
+    """Tag each token with its text in upper case."""
+
+    def tag(self, tokens):
+        return [(token, (token[0] if isinstance(token, tuple) else token).upper()) for token in tokens]
+
+
+class TestTokenTable(unittest.TestCase):
+    """Test the compact token storage of sentences."""
+
+    def setUp(self):
+        self.p = Paragraph('First sentence. The anode is graphite.', word_tokenizer=WordTokenizer(),
+                           pos_tagger=UpperTagger(), ner_tagger=NoneTagger())
+        self.sentence = self.p.sentences[1]
+
+    def test_tokens(self):
+        lexicon = self.sentence.lexicon
+        expected = [Token('The', 16, 19, lexicon), Token('anode', 20, 25, lexicon), Token('is', 26, 28, lexicon),
+                    Token('graphite', 29, 37, lexicon), Token('.', 37, 38, lexicon)]
+        tokens = self.sentence.tokens
+        self.assertIsInstance(tokens, TokenTable)
+        self.assertEqual(tokens, expected)
+        self.assertEqual(list(tokens), expected)
+        self.assertEqual(len(tokens), 5)
+        self.assertEqual(tokens[-1], expected[-1])
+        self.assertEqual(tokens[1:3], expected[1:3])
+        self.assertEqual(self.sentence.raw_tokens, ['The', 'anode', 'is', 'graphite', '.'])
+        self.assertEqual(tokens.starts.tolist(), [0, 4, 10, 13, 21])
+
+    def test_tags(self):
+        self.assertIsNone(self.sentence.token_table.pos_tags)
+        self.assertEqual(self.sentence.pos_tags, ['THE', 'ANODE', 'IS', 'GRAPHITE', '.'])
+        self.assertEqual(self.sentence.pos_tagged_tokens[1], ('anode', 'ANODE'))
+        self.assertEqual(self.sentence.ner_tags, [None] * 5)
+        self.assertEqual(self.sentence.tagged_tokens[3], ('graphite', 'GRAPHITE'))
+        self.assertEqual(self.sentence.token_table._pos.typecode, 'H')
+
+    def test_shared_tag_ids(self):
+        """Test the same tag has the same id in every sentence."""
+        first, second = self.p.sentences
+        first.token_table.pos_tags = ['NN', 'VB', 'NN']
+        second.token_table.pos_tags = ['VB', 'NN']
+        self.assertEqual(first.token_table._pos[0], second.token_table._pos[1])
+        self.assertEqual(first.pos_tags, ['NN', 'VB', 'NN'])
+
+    def test_full_tag_vocabulary(self):
+        """Test tags are stored as a list once no more tags can be given ids."""
+        first, second = self.p.sentences
+        first.token_table.pos_tags = ['NN', 'VB', 'NN']
+        max_tags, TokenTable.max_tags = TokenTable.max_tags, len(TokenTable._tags)
+        try:
+            second.token_table.pos_tags = ['NN', 'UNSEEN-TAG-1']
+            self.assertEqual(second.token_table._pos, ['NN', 'UNSEEN-TAG-1'])
+            self.assertEqual(second.pos_tags, ['NN', 'UNSEEN-TAG-1'])
+            # The stored list is not changed through the returned tags
+            second.pos_tags[0] = 'VB'
+            self.assertEqual(second.pos_tags, ['NN', 'UNSEEN-TAG-1'])
+            self.assertNotIn('UNSEEN-TAG-1', TokenTable._tag_ids)
+            # Tags that have ids are still stored as ids
+            first.token_table.pos_tags = ['VB', 'NN', 'VB']
+            self.assertEqual(first.token_table._pos.typecode, 'H')
+        finally:
+            TokenTable.max_tags = max_tags
+        self.assertEqual(first.pos_tags, ['VB', 'NN', 'VB'])
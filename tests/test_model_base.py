@@ -0,0 +1,234 @@
+"""
+test_model_base
+~~~~~~~~~~~~~~~
+Test the data model base classes.
+"""
+import itertools
+import json
+import logging
+import unittest
+
+from batterydataextractor.doc import Document
+from batterydataextractor.model.base import BaseModel, ColumnarModelList, FloatType, ListType, ModelList, \
+    ModelType, StringType
+from batterydataextractor.model.model import Compound, PropertyData, GeneralInfo
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+class TestConfigure(unittest.TestCase):
+    """Test per-document model configuration."""
+
+    def test_configure_leaves_model_untouched(self):
+        """Test configuring a model does not change the options of the model itself."""
+        capacity = PropertyData.configure(defined_names=['capacity'], confidence_threshold=0.5)
+        self.assertEqual(capacity.options['defined_names'], ['capacity'])
+        self.assertEqual(capacity.options['confidence_threshold'], 0.5)
+        self.assertEqual(capacity.options['original_text'], False)
+        self.assertEqual(PropertyData.options['defined_names'], [''])
+        self.assertEqual(PropertyData.options['confidence_threshold'], 0)
+        self.assertTrue(issubclass(capacity, PropertyData))
+        self.assertEqual(capacity.__name__, 'PropertyData')
+
+    def test_configure_parsers(self):
+        """Test a configured model gets its own parsers bound to it."""
+        capacity = PropertyData.configure(defined_names=['capacity'])
+        self.assertEqual(capacity.parsers[0].model, capacity)
+        self.assertEqual(PropertyData.parsers[0].model, PropertyData)
+        self.assertIsNot(capacity.parsers[0], PropertyData.parsers[0])
+
+    def test_configure_serialize(self):
+        """Test records of a configured model serialize under the original model name."""
+        capacity = PropertyData.configure(defined_names=['capacity'], original_text=True)
+        record = capacity(value=[372], specifier='capacity', material='graphite', original_text='text')
+        self.assertEqual(record.serialize(), {'PropertyData': {'value': [372.0], 'specifier': 'capacity',
+                                                               'material': 'graphite', 'original_text': 'text'}})
+
+    def test_documents_independent(self):
+        """Test two documents can be configured with different names at the same time."""
+        d1 = Document('The capacity of graphite is 372 mAh/g.')
+        d2 = Document('The voltage of LiFePO4 is 3.4 V.')
+        d1.add_models_by_names(['capacity'], confidence_threshold=0.1)
+        d2.add_models_by_names(['voltage'], original_text=True)
+        d2.add_general_models(['anode'], self_defined=False)
+        m1 = d1.models[0]
+        m2 = d2.models[0]
+        self.assertEqual(m1.options['defined_names'], ['capacity'])
+        self.assertEqual(m1.options['confidence_threshold'], 0.1)
+        self.assertEqual(m2.options['defined_names'], ['voltage'])
+        self.assertEqual(m2.options['original_text'], True)
+        self.assertEqual(d2.models[1].options['defined_names'], ['anode'])
+        self.assertIn(m1, d1.elements[0].models)
+        self.assertNotIn(m2, d1.elements[0].models)
+        self.assertEqual(GeneralInfo.options['defined_names'], [''])
+
+
+class CountingType(StringType):
+    """String field that counts how often values are processed."""
+
+    calls = 0
+
+    def process(self, value):
+        CountingType.calls += 1
+        return super(CountingType, self).process(value)
+
+
+class TestCompactModel(unittest.TestCase):
+    """Test the compact storage of model instances."""
+
+    def test_no_instance_dict(self):
+        """Test model instances only store their values."""
+        record = PropertyData(value=[1], material='LiFePO4')
+        self.assertFalse(hasattr(record, '__dict__'))
+        with self.assertRaises(AttributeError):
+            record.unknown = 1
+
+    def test_field_order(self):
+        """Test values are stored in the precomputed field order."""
+        record = PropertyData(material='LiFePO4', specifier='capacity')
+        self.assertEqual(PropertyData._field_names[:5], ('value', 'units', 'raw_value', 'specifier', 'material'))
+        self.assertEqual(record._values[PropertyData._field_names.index('material')], 'LiFePO4')
+        self.assertEqual(record.value, [])
+        self.assertEqual(record.units, None)
+
+    def test_mutable_defaults_not_shared(self):
+        """Test list defaults are copied for every instance."""
+        c1 = Compound()
+        c2 = Compound()
+        c1.names.append('LiCoO2')
+        self.assertEqual(c1.names, ['LiCoO2'])
+        self.assertEqual(c2.names, [])
+
+    def test_list_processed_once(self):
+        """Test each value assigned to a list field is processed once."""
+
+        class Counted(BaseModel):
+            names = ListType(CountingType())
+
+        CountingType.calls = 0
+        Counted(names=['a', 'b', 'c'])
+        self.assertEqual(CountingType.calls, 3)
+
+    def test_added_field(self):
+        """Test fields can be added to a model after instances exist."""
+
+        class Extendable(BaseModel):
+            name = StringType()
+
+        record = Extendable(name='a')
+        Extendable.label = StringType()
+        self.assertEqual(record.label, None)
+        record.label = 'b'
+        self.assertEqual(record.label, 'b')
+        self.assertEqual(Extendable(label='c').serialize(), {'Extendable': {'label': 'c'}})
+
+
+class TestColumnarModelList(unittest.TestCase):
+    """Test the columnar ModelList."""
+
+    def setUp(self):
+        self.records = [PropertyData(value=[372], specifier='capacity', material='graphite'),
+                        PropertyData(value=[4.2], units='V', specifier='voltage', material='LiFePO4')]
+
+    def test_columns(self):
+        columnar = ColumnarModelList(PropertyData, *self.records)
+        self.assertEqual(len(columnar), 2)
+        self.assertEqual(columnar.column('specifier'), ['capacity', 'voltage'])
+        self.assertEqual(columnar.column('value'), [[372.0], [4.2]])
+
+    def test_rows(self):
+        columnar = ColumnarModelList(PropertyData, *self.records)
+        row = columnar[-1]
+        self.assertEqual(row.material, 'LiFePO4')
+        self.assertEqual(row['units'], 'V')
+        self.assertEqual(row.get('units'), 'V')
+        self.assertEqual(row, self.records[1])
+        self.assertEqual(row.serialize(), self.records[1].serialize())
+        self.assertEqual([r.specifier for r in columnar], ['capacity', 'voltage'])
+        with self.assertRaises(IndexError):
+            columnar[2]
+
+    def test_round_trip(self):
+        columnar = ColumnarModelList(PropertyData, *self.records)
+        self.assertEqual(columnar.serialize(), ModelList(*self.records).serialize())
+        self.assertEqual(list(columnar.to_models()), self.records)
+        self.assertEqual(columnar[1:].serialize(), [self.records[1].serialize()])
+
+    def test_to_columnar(self):
+        models = ModelList(self.records[0], Compound(names=['graphite']), self.records[1])
+        columnar = models.to_columnar()
+        self.assertEqual(list(columnar.keys()), [PropertyData, Compound])
+        self.assertEqual(len(columnar[PropertyData]), 2)
+        self.assertEqual(columnar[Compound][0].names, ['graphite'])
+
+    def test_wrong_model(self):
+        columnar = ColumnarModelList(PropertyData)
+        with self.assertRaises(TypeError):
+            columnar.append(Compound())
+
+
+class Nested(BaseModel):
+    label = StringType()
+    names = ListType(StringType())
+    compound = ModelType(Compound)
+    numbers = ListType(ModelType(Compound))
+    note = StringType(null=True)
+    score = FloatType()
+
+
+def generic_serialize(model, primitive=False):
+    """Field-by-field serialization, as done before serializers were generated."""
+    data = {}
+    for field_name in model:
+        value = getattr(model, field_name)
+        field = model.fields.get(field_name)
+        if value is not None:
+            value = field.serialize(value, primitive=primitive)
+        if not field.null and value in [None, '', []]:
+            continue
+        data[field.name] = value
+    return {model.__class__.__name__: data}
+
+
+class TestSerialize(unittest.TestCase):
+    """Test the generated serializers."""
+
+    def test_matches_generic(self):
+        """Test generated serialize gives the same output as the generic field-by-field version."""
+        options = {
+            'label': [None, '', 'a'],
+            'names': [None, [], ['x', 'y']],
+            'compound': [None, Compound(), Compound(names=['LiCoO2'])],
+            'numbers': [None, [], [Compound(names=['Li'])]],
+            'note': [None, '', 'n'],
+            'score': [None, 0.0, 1.5],
+        }
+        keys = list(options)
+        for values in itertools.product(*[options[k] for k in keys]):
+            record = Nested(**dict(zip(keys, values)))
+            self.assertEqual(record.serialize(), generic_serialize(record))
+            self.assertEqual(record.serialize(primitive=True), generic_serialize(record, primitive=True))
+
+    def test_property_data(self):
+        record = PropertyData(value=[3.4], units='V', specifier='voltage', material='LiFePO4', confidence_score='0.5')
+        self.assertEqual(record.serialize(), generic_serialize(record))
+        self.assertEqual(record.serialize(), {'PropertyData': {'value': [3.4], 'units': 'V', 'specifier': 'voltage',
+                                                               'material': 'LiFePO4', 'confidence_score': 0.5}})
+
+    def test_is_empty(self):
+        self.assertTrue(Compound().is_empty)
+        self.assertFalse(Compound(names=['LiCoO2']).is_empty)
+        self.assertTrue(PropertyData(value=[], units='').is_empty)
+        self.assertFalse(PropertyData(confidence_score=0).is_empty)
+        # Null fields are always serialized, so the record is never empty
+        self.assertFalse(Nested().is_empty)
+
+    def test_json_bytes(self):
+        records = ModelList(Compound(names=['LiCoO2']), PropertyData(value=[4.2], material='Ni\u2013Co'))
+        self.assertEqual(json.loads(records.to_json_bytes().decode('utf-8')), records.serialize())
+        self.assertEqual(json.loads(records[0].to_json_bytes().decode('utf-8')), records[0].serialize())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 import logging
+import re
 import unittest
 from batterydataextractor.nlp import AbbreviationDetector
 from batterydataextractor.doc import Paragraph, Document
+from batterydataextractor.doc.text import TokenTable
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -81,5 +83,94 @@ class TestAbbreviationDetection(unittest.TestCase):
         self.assertEqual([[('Abbr: ', 'TCS')], [('LF: ', 'triclosan')], [('Abbr: ', 'TCS')]], d.abbreviation_definitions)
 
 
+class PatternDetector(AbbreviationDetector):
+    """Abbreviation detector that finds long forms followed by bracketed abbreviations with a regular expression,
+    recording the texts passed to the model in each call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def model(self, texts, batch_size=None):
+        self.calls.append(texts)
+        if isinstance(texts, list):
+            return [self._entities(text) for text in texts]
+        return self._entities(texts)
+
+    @staticmethod
+    def _entities(text):
+        entities = []
+        for m in re.finditer(r'(\w+) \( ([A-Z]{2,}) \)', text):
+            entities.append({'entity_group': 'long', 'start': m.start(1), 'end': m.end(1)})
+            entities.append({'entity_group': 'short', 'start': m.start(2), 'end': m.end(2)})
+        return entities
+
+
+class TestBatchedAbbreviationDetection(unittest.TestCase):
+    """Test abbreviations detected in batches give the same definitions as sentence by sentence."""
+
+    text = 'We used valproic acid ( VPA ) here. No abbreviations. Then lithium cobalt oxide ( LCO ) and tetrahydrofuran ' \
+           '( THF ) were mixed. VPA was diluted.'
+
+    def test_detect_spans_many(self):
+        ad = PatternDetector()
+        token_lists = [['a', 'b', 'c', 'd'], [], ['valproic', 'acid', '(', 'VPA', ')'], ['x']]
+        spans = ad.detect_spans_many(token_lists, batch_size=2)
+        self.assertEqual(spans, [ad.detect_spans(tokens) for tokens in token_lists])
+        # Empty sentences are skipped and the others are sorted by length
+        self.assertEqual(ad.calls[:2], [['x', 'a b c d'], ['valproic acid ( VPA )']])
+
+    def test_document(self):
+        batched, single = PatternDetector(), PatternDetector()
+        d = Document(Paragraph(self.text, abbreviation_detector=batched))
+        p = Paragraph(self.text, abbreviation_detector=single)
+        self.assertEqual(d.abbreviation_definitions, p.abbreviation_definitions)
+        self.assertEqual(len(batched.calls), 1)
+        self.assertEqual(len(single.calls), len(p.sentences))
+        self.assertEqual(d.abbreviation_map, {'VPA': 'acid', 'LCO': 'oxide', 'THF': 'tetrahydrofuran'})
+        self.assertEqual(len(batched.calls), 1)
+
+    def test_document_map_built_once(self):
+        """Test the document abbreviation map is looked up without detecting abbreviations or joining tokens again."""
+        detector = PatternDetector()
+        d = Document(Paragraph(self.text, abbreviation_detector=detector))
+        expected = {'VPA': 'acid', 'LCO': 'oxide', 'THF': 'tetrahydrofuran'}
+        self.assertEqual(d.abbreviation_map, expected)
+        self.assertEqual(len(detector.calls), 1)
+        texts = TokenTable.texts
+        joined = []
+
+        def counting_texts(table):
+            joined.append(table)
+            return texts(table)
+
+        TokenTable.texts = counting_texts
+        try:
+            self.assertEqual(d.abbreviation_map['LCO'], 'oxide')
+            d.release()
+            self.assertIs(d.abbreviation_map, d.abbreviation_map)
+            self.assertEqual(d.abbreviation_map, expected)
+        finally:
+            TokenTable.texts = texts
+        self.assertEqual(len(detector.calls), 1)
+        self.assertEqual(joined, [])
+        # Adding an element builds the map again, detecting abbreviations in the released and new sentences in a batch
+        d.add_element(Paragraph('We used ethylene carbonate ( EC ).', abbreviation_detector=detector))
+        self.assertEqual(d.abbreviation_map['EC'], 'carbonate')
+        self.assertEqual(d.abbreviation_map['VPA'], 'acid')
+        self.assertEqual(len(detector.calls), 2)
+
+    def test_nearest_long_form(self):
+        """Test each abbreviation is mapped to the closest long form in its sentence."""
+        p = Paragraph('The solid electrolyte interphase ( SEI ) and cathode electrolyte interphase ( CEI ).')
+        sent = p.sentences[0]
+        joined = ' '.join(sent.raw_tokens)
+        spans = [(joined.index(text), joined.index(text) + len(text)) for text in
+                 ('SEI', 'CEI', 'solid electrolyte interphase', 'cathode electrolyte interphase')]
+        sent._abbreviation_spans = spans[:2], spans[2:]
+        self.assertEqual(sent.abbreviation_map, {'SEI': 'solid electrolyte interphase',
+                                                 'CEI': 'cathode electrolyte interphase'})
+        self.assertEqual(Document(p).abbreviation_map, sent.abbreviation_map)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from batterydataextractor.nlp import BertCemTagger, CemTagger
-from batterydataextractor.doc import Document, Span
+from batterydataextractor.nlp.tag import BaseTagger, NoneTagger
+from batterydataextractor.doc import Document, Paragraph, Span
 
 
 class TestBertCemTagger(unittest.TestCase):
@@ -42,5 +43,44 @@ class TestCemTagger(unittest.TestCase):
         self.assertEqual([], Document('non-aromatic').cems)
 
 
+class WordListTagger(BaseTagger):
+    """Tag the tokens in a list of words as materials."""
+
+    def __init__(self, words):
+        self.words = words
+
+    def tag(self, tokens):
+        return [(token, 'MAT' if token[0] in self.words else 'O') for token in tokens]
+
+
+class TestCems(unittest.TestCase):
+    """Test chemical entity mention spans are built from the token offsets."""
+
+    def cems(self, text, words):
+        p = Paragraph(text, pos_tagger=NoneTagger(), ner_tagger=WordListTagger(words))
+        return p.cems
+
+    def test_tagged_occurrence(self):
+        """Test the span is at the tagged token, not the first occurrence of its text."""
+        self.assertEqual([Span('Li', 15, 17)], self.cems('Lithium metal (Li) anodes.', ['Li']))
+        p = Paragraph('The anode. The Li anode.', pos_tagger=NoneTagger(), ner_tagger=WordListTagger(['anode']))
+        self.assertEqual([Span('anode', 4, 9), Span('anode', 18, 23)], p.cems)
+
+    def test_special_characters(self):
+        """Test materials containing regular expression special characters."""
+        self.assertEqual([Span('Li+', 4, 7)], self.cems('The Li+ ion.', ['Li+']))
+        self.assertEqual([Span('[Fe(CN)6]', 4, 13)], self.cems('The [Fe(CN)6] ion.', ['[Fe(CN)6]']))
+
+    def test_merge_consecutive(self):
+        """Test consecutive material tokens are merged into one span."""
+        self.assertEqual([Span('lithium  iron phosphate', 4, 27), Span('graphite', 32, 40)],
+                         self.cems('The lithium  iron phosphate and graphite.', ['lithium', 'iron', 'phosphate',
+                                                                                  'graphite']))
+
+    def test_later_sentence(self):
+        """Test offsets are relative to the text passage, not the sentence."""
+        self.assertEqual([Span('LiCoO2', 24, 30)], self.cems('It is a cathode. We use LiCoO2.', ['LiCoO2']))
+
+
 if __name__ == '__main__':
     unittest.main()
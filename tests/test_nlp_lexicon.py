@@ -0,0 +1,102 @@
+"""
+test_nlp_lexicon
+~~~~~~~~~~~~~~~~
+Test the Lexicon.
+"""
+import logging
+import threading
+import unittest
+
+from batterydataextractor.doc import Paragraph
+from batterydataextractor.doc.text import Sentence, Text
+from batterydataextractor.nlp.lexicon import Lexicon, ChemLexicon
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+class BoundedLexicon(Lexicon):
+    """A Lexicon that stores at most three lexemes."""
+
+    max_size = 3
+
+
+class TestLexicon(unittest.TestCase):
+
+    def setUp(self):
+        self.lexicon = BoundedLexicon()
+        self.lexicon.clear()
+
+    def test_singleton(self):
+        self.assertIs(BoundedLexicon(), self.lexicon)
+        self.assertIsNot(ChemLexicon(), self.lexicon)
+
+    def test_chem_lexicon_max_size(self):
+        """Test the size of the lexicon used by text elements is set on its existing instance, not by arguments."""
+        lexicon = ChemLexicon()
+        self.assertIs(lexicon, Text.lexicon)
+        self.assertIs(lexicon, Sentence.lexicon)
+        with self.assertRaises(TypeError):
+            ChemLexicon(max_size=10)
+        lexicon.max_size = 2
+        try:
+            for text in ('x1', 'x2', 'x3'):
+                lexicon.add(text)
+            self.assertEqual(len(lexicon), 2)
+            self.assertEqual(list(lexicon.lexemes), ['x2', 'x3'])
+        finally:
+            del lexicon.max_size
+        self.assertIsNone(ChemLexicon().max_size)
+
+    def test_features(self):
+        lexeme = self.lexicon['Li-ion']
+        self.assertEqual(lexeme.normalized, 'Li-ion')
+        self.assertEqual(lexeme.lower, 'li-ion')
+        self.assertEqual(lexeme.shape, 'Xx-xxx')
+        self.assertEqual(lexeme.upper_count, 1)
+        self.assertTrue(lexeme.is_hyphenated)
+        self.assertFalse(lexeme.like_number)
+        self.assertIs(self.lexicon['Li-ion'], lexeme)
+
+    def test_lazy_tokens(self):
+        """Test tokens only add their words to the lexicon when their features are used."""
+        p = Paragraph('The anode and cathode.', lexicon=self.lexicon)
+        tokens = p.sentences[0].tokens
+        self.assertEqual(len(self.lexicon), 0)
+        self.assertEqual(tokens[1].lex.text, 'anode')
+        self.assertEqual(len(self.lexicon), 1)
+        self.assertIn('anode', self.lexicon)
+
+    def test_lru_eviction(self):
+        for text in ('a', 'b', 'c'):
+            self.lexicon.add(text)
+        self.lexicon['a']
+        self.lexicon.add('d')
+        self.assertEqual(list(self.lexicon.lexemes), ['c', 'a', 'd'])
+
+    def test_threads(self):
+        """Test lexemes added from several threads at once are consistent and within the size limit."""
+        lexicon = BoundedLexicon()
+        lexicon.max_size = 50
+        seen = []
+
+        def work(offset):
+            for i in range(500):
+                text = str((i + offset) % 100)
+                seen.append(lexicon[text].text == text)
+
+        try:
+            threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            del lexicon.max_size
+        self.assertTrue(all(seen))
+        self.assertEqual(len(seen), 4000)
+        self.assertLessEqual(len(lexicon), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
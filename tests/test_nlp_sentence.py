@@ -1,7 +1,14 @@
+import io
 import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
-from batterydataextractor.nlp import ChemSentenceTokenizer
-from batterydataextractor.doc import Text
+from batterydataextractor.config import Config
+from batterydataextractor.nlp import ChemSentenceTokenizer, ChemRegexSentenceTokenizer, tokenize
+from batterydataextractor.doc import Document, Paragraph, Text
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -20,6 +27,16 @@ class TestChemSentenceTokenizer(unittest.TestCase):
         sents = ['This is the first sentence.', 'This is another.', 'This is a third.']
         self.assertEqual(sents, self.ps.tokenize(text))
 
+    def test_shared_pipeline(self):
+        """Test all tokenizers for a model share one spaCy pipeline."""
+        self.assertIs(self.ps.nlp, ChemSentenceTokenizer().nlp)
+
+    def test_batch(self):
+        """Test tokenizing texts in batches gives the same spans as tokenizing them one at a time."""
+        texts = ['This is the first sentence. This is another.', '', 'A single sentence.', 'One. Two. Three.']
+        spans = list(self.ps.span_tokenize_batch(texts, batch_size=2))
+        self.assertEqual(spans, [self.ps.span_tokenize(text) for text in texts])
+
     def test_et_al(self):
         """Test the tokenizer handles et al. within a sentence correctly."""
         text = 'Costa et al. reported the growth of HA nanowires due to the chemical potential of an amorphous calcium phosphate solution. This structural feature would make the {001} very sensitive to surrounding growth conditions.'
@@ -74,5 +91,102 @@ class TestChemSentenceTokenizer(unittest.TestCase):
         )
 
 
+class TestLoadSpacy(unittest.TestCase):
+
+    def test_concurrent_load(self):
+        """Test threads that first use a spaCy pipeline at the same time share one loaded copy."""
+        loaded = []
+
+        def load(model, exclude):
+            loaded.append(model)
+            time.sleep(0.05)
+            return object()
+
+        saved = tokenize.spacy.load
+        tokenize.spacy.load = load
+        tokenizers = [ChemSentenceTokenizer(model='test_concurrent_sm') for _ in range(6)]
+        results = []
+        barrier = threading.Barrier(6)
+
+        def work(tokenizer):
+            barrier.wait()
+            results.append(tokenizer.nlp)
+
+        try:
+            threads = [threading.Thread(target=work, args=(tokenizer,)) for tokenizer in tokenizers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            tokenize.spacy.load = saved
+            tokenize.load_spacy.cache.pop(('test_concurrent_sm', tuple(ChemSentenceTokenizer.exclude)), None)
+        self.assertEqual(loaded, ['test_concurrent_sm'])
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(result is results[0] for result in results))
+
+
+class TestChemRegexSentenceTokenizer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ps = ChemRegexSentenceTokenizer()
+
+    def test_sentence_tokenizer(self):
+        text = '  This is the first sentence. This is another!  Is this a third? '
+        self.assertEqual(['This is the first sentence.', 'This is another!', 'Is this a third?'], self.ps.tokenize(text))
+        self.assertEqual([(2, 29), (30, 46), (48, 64)], self.ps.span_tokenize(text))
+        self.assertEqual([], self.ps.span_tokenize(''))
+        self.assertEqual([], self.ps.span_tokenize(' \n '))
+
+    def test_abbreviations(self):
+        """Test the tokenizer does not split after common abbreviations."""
+        text = ('Costa et al. reported a capacity of ca. 160 mAh g-1 (Fig. 2a), i.e. close to the theoretical value, '
+                'and 3.4 V vs. Li/Li+ in Eq. 3. Chen et al. studied LiFePO4, e.g. with J. Smith. van Westen et al. built '
+                'on this.')
+        sents = [
+            'Costa et al. reported a capacity of ca. 160 mAh g-1 (Fig. 2a), i.e. close to the theoretical value, and '
+            '3.4 V vs. Li/Li+ in Eq. 3.',
+            'Chen et al. studied LiFePO4, e.g. with J. Smith.',
+            'van Westen et al. built on this.',
+        ]
+        self.assertEqual(sents, self.ps.tokenize(text))
+
+    def test_numbers_formulas(self):
+        """Test the tokenizer does not split decimal numbers and formulas."""
+        text = 'The Li0.5CoO2 cathode delivered 137.5 mAh g-1 at 0.1 C. It retained 95.2 % after 100 cycles.'
+        sents = ['The Li0.5CoO2 cathode delivered 137.5 mAh g-1 at 0.1 C.', 'It retained 95.2 % after 100 cycles.']
+        self.assertEqual(sents, self.ps.tokenize(text))
+
+    def test_brackets_quotes(self):
+        """Test the tokenizer keeps brackets together and closing quotes and brackets in the sentence."""
+        text = 'The cell (which was cycled. Twice.) failed. "It worked." (See above.) Next.'
+        sents = ['The cell (which was cycled. Twice.) failed.', '"It worked."', '(See above.)', 'Next.']
+        self.assertEqual(sents, self.ps.tokenize(text))
+
+    def test_stray_bracket(self):
+        """Test a bracket that is never closed does not stop the rest of the text being split."""
+        text = 'The capacity (in mAh g-1 was high. Then it dropped. It recovered.'
+        sents = ['The capacity (in mAh g-1 was high.', 'Then it dropped.', 'It recovered.']
+        self.assertEqual(sents, self.ps.tokenize(text))
+        text = 'Figure 2 (a) Cycling at 1 C. (b Rate capability of LiFePO4. It fades. (See Fig. 3. Twice.) Done.'
+        sents = ['Figure 2 (a) Cycling at 1 C.', '(b Rate capability of LiFePO4.', 'It fades.', '(See Fig. 3. Twice.)',
+                 'Done.']
+        self.assertEqual(sents, self.ps.tokenize(text))
+
+    def test_config(self):
+        """Test the tokenizer can be selected in the config file."""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'config.yml')
+            with io.open(path, 'w', encoding='utf8') as f:
+                f.write('SENTENCE_TOKENIZER: ChemRegexSentenceTokenizer\n')
+            d = Document(Paragraph('A first sentence. A second sentence.'), config=Config(path))
+            self.assertIsInstance(d.elements[0].sentence_tokenizer, ChemRegexSentenceTokenizer)
+            self.assertEqual([s.text for s in d.elements[0].sentences], ['A first sentence.', 'A second sentence.'])
+        finally:
+            shutil.rmtree(directory)
+
+
 if __name__ == '__main__':
     unittest.main()
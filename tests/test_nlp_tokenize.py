@@ -1,5 +1,12 @@
+import os
+import random
+import re
 import unittest
-from batterydataextractor.nlp.tokenize import WordTokenizer, FineWordTokenizer, ChemWordTokenizer
+
+from lxml import etree
+
+from batterydataextractor.nlp.tokenize import WordTokenizer, FineWordTokenizer, ChemWordTokenizer, GREEK, \
+    bracket_level, regex_span_tokenize, TokenizationCache, SentenceTokenizer
 from batterydataextractor.doc import Text
 
 
@@ -930,5 +937,456 @@ class TestFineWordTokenizer(unittest.TestCase):
                          self.t.tokenize('1-methyl-2-methylidene-cyclohexane'))
 
 
+class ReferenceWordTokenizer(WordTokenizer):
+    """The word tokenizer before its rules were compiled, to check the compiled rules give identical tokens."""
+
+    def _subspan(self, s, span, nextspan):
+        """Recursively subdivide spans based on a series of rules."""
+        text = s[span[0]:span[1]]
+        lowertext = text.lower()
+
+        # Skip if only a single character or a split sequence
+        if span[1] - span[0] < 2 or text in self.SPLIT or text in self.SPLIT_END_WORD or text in self.SPLIT_START_WORD or lowertext in self.NO_SPLIT:
+            return [span]
+
+        # Skip if it looks like URL
+        if text.startswith('http://') or text.startswith('ftp://') or text.startswith('www.'):
+            return [span]
+
+        # Split full stop at end of final token (allow certain characters to follow) unless ellipsis
+        if self.split_last_stop and nextspan is None and text not in self.NO_SPLIT_STOP and not text[-3:] == '...':
+            if text[-1] == '.':
+                return self._split_span(span, -1)
+            ind = text.rfind('.')
+            if ind > -1 and all(t in '\'‘’"“”)]}' for t in text[ind + 1:]):
+                return self._split_span(span, ind, 1)
+
+        # Split off certain sequences at the end of a word
+        for spl in self.SPLIT_END_WORD:
+            if text.endswith(spl) and len(text) > len(spl) and text[-len(spl) - 1].isalpha():
+                return self._split_span(span, -len(spl), 0)
+
+        # Split off certain sequences at the start of a word
+        for spl in self.SPLIT_START_WORD:
+            if text.startswith(spl) and len(text) > len(spl) and text[-len(spl) - 1].isalpha():
+                return self._split_span(span, len(spl), 0)
+
+        # Split around certain sequences
+        for spl in self.SPLIT:
+            ind = text.find(spl)
+            if ind > -1:
+                return self._split_span(span, ind, len(spl))
+
+        # Split around certain sequences unless followed by a digit
+        for spl in self.SPLIT_NO_DIGIT:
+            ind = text.rfind(spl)
+            if ind > -1 and (len(text) <= ind + len(spl) or not text[ind + len(spl)].isdigit()):
+                return self._split_span(span, ind, len(spl))
+
+        # Characters to split around, but with exceptions
+        for i, char in enumerate(text):
+            if char == '-':
+                before = lowertext[:i]
+                after = lowertext[i+1:]
+                # By default we split on hyphens
+                split = True
+                if before in self.NO_SPLIT_PREFIX or after in self.NO_SPLIT_SUFFIX:
+                    split = False  # Don't split if prefix or suffix in list
+                elif not before.strip(self.NO_SPLIT_CHARS) or not after.strip(self.NO_SPLIT_CHARS):
+                    split = False  # Don't split if prefix or suffix entirely consist of certain characters
+                if split:
+                    return self._split_span(span, i, 1)
+
+        # Split contraction words
+        for contraction in self.CONTRACTIONS:
+            if lowertext == contraction[0]:
+                return self._split_span(span, contraction[1])
+        return [span]
+
+    def span_tokenize(self, s):
+        """"""
+        # First get spans by splitting on all whitespace
+        # Includes: \u0020 \u00A0 \u1680 \u180E \u2000 \u2001 \u2002 \u2003 \u2004 \u2005 \u2006 \u2007 \u2008 \u2009 \u200A \u202F \u205F \u3000
+        spans = [(left, right) for left, right in regex_span_tokenize(s, r'\s+') if not left == right]
+        i = 0
+        # Recursively split spans according to rules
+        while i < len(spans):
+            subspans = self._subspan(s, spans[i], spans[i + 1] if i + 1 < len(spans) else None)
+            spans[i:i+1] = [subspan for subspan in subspans if subspan[1] - subspan[0] > 0]
+            if len(subspans) == 1:
+                i += 1
+        return spans
+
+
+class ReferenceChemWordTokenizer(ChemWordTokenizer):
+    """The chemistry word tokenizer before its rules were compiled."""
+
+    def _subspan(self, s, span, nextspan):
+        """Recursively subdivide spans based on a series of rules."""
+        text = s[span[0]:span[1]]
+        lowertext = text.lower()
+
+        # Skip if only a single character or a split sequence
+        if span[1] - span[0] < 2 or text in self.SPLIT or text in self.SPLIT_END_WORD or text in self.SPLIT_START_WORD or lowertext in self.NO_SPLIT:
+            return [span]
+
+        # Skip if it looks like URL
+        if text.startswith('http://') or text.startswith('ftp://') or text.startswith('www.'):
+            return [span]
+
+        # Split full stop at end of final token (allow certain characters to follow) unless ellipsis
+        if self.split_last_stop and nextspan is None and text not in self.NO_SPLIT_STOP and not text[-3:] == '...':
+            if text[-1] == '.':
+                return self._split_span(span, -1)
+            ind = text.rfind('.')
+            if ind > -1 and all(t in '\'‘’"“”)]}' for t in text[ind + 1:]):
+                return self._split_span(span, ind, 1)
+
+        # Split off certain sequences at the end of a token
+        for spl in self.SPLIT_END:
+            if text.endswith(spl) and len(text) > len(spl):
+                return self._split_span(span, -len(spl), 0)
+
+        # Split off certain sequences at the end of a word
+        for spl in self.SPLIT_END_WORD:
+            if text.endswith(spl) and len(text) > len(spl) and text[-len(spl) - 1].isalpha():
+                return self._split_span(span, -len(spl), 0)
+
+        # Split off certain sequences at the end of a word
+        for spl in self.SPLIT_START_WORD:
+            if text.startswith(spl) and len(text) > len(spl) and text[-len(spl) - 1].isalpha():
+                return self._split_span(span, len(spl), 0)
+
+        # Split around certain sequences
+        for spl in self.SPLIT:
+            ind = text.find(spl)
+            if ind > -1:
+                return self._split_span(span, ind, len(spl))
+
+        # Split around certain sequences unless followed by a digit
+        # - We skip this because of difficulty with chemical names.
+        # for spl in self.SPLIT_NO_DIGIT:
+        #     ind = text.rfind(spl)
+        #     if ind > -1 and (len(text) <= ind + len(spl) or not text[ind + len(spl)].isdigit()):
+        #         return self._split_span(span, ind, len(spl))
+
+        # Split off certain sequences at the end of a token unless preceded by a digit
+        for spl in self.SPLIT_END_NO_DIGIT:
+            if text.endswith(spl) and len(text) > len(spl) and not text[-len(spl) - 1].isdigit():
+                return self._split_span(span, -len(spl), 0)
+
+        # Regular Bracket at both start and end, break off both provided they correspond
+        if text.startswith('(') and text.endswith(')') and self._closing_bracket_index(text) == len(text) - 1:
+            return self._split_span(span, 1, len(text)-2)
+
+        # Split things like IR(KBr)
+        if text.startswith('IR(') and text.endswith(')'):
+            return self._split_span(span, 2, 1)
+
+        # Split things like \d+\.\d+([a-z]+) e.g. UV-vis/IR peaks with bracketed strength/shape
+        m = re.match(r'^(\d+\.\d+|\d{1,})(\([a-z]+\)|c)$', text, re.I)
+        if m:
+            return self._split_span(span, m.start(2), 1)
+
+        # Split brackets off start and end if the corresponding bracket isn't within token
+        for bpair in [('(', ')'), ('{', '}'), ('[', ']')]:
+            #level = bracket_level(text, open=[bpair[0]], close=[bpair[1]])
+            # Bracket at start, bracketlevel > 0, break it off
+            if text.startswith(bpair[0]) and self._closing_bracket_index(text, bpair=bpair) is None:
+                return self._split_span(span, 1, 0)
+            # Bracket at end, bracketlevel < 0, break it off
+            if text.endswith(bpair[1]) and self._opening_bracket_index(text, bpair=bpair) is None:
+                return self._split_span(span, -1, 0)
+
+        # Characters to split around, but with exceptions
+        for i, char in enumerate(text):
+            before = text[:i]
+            after = text[i+1:]
+            if char in {':', ';'}:
+                # Split around colon unless it looks like we're in a chemical name
+                if not (before and after and after[0].isdigit() and before.rstrip('′\'')[-1:].isdigit() and '-' in after) and not (self.NO_SPLIT_CHEM.search(before) and self.NO_SPLIT_CHEM.search(after)):
+                    return self._split_span(span, i, 1)
+            elif char in {'x', '+', '−'}:
+                # Split around x, +, − (\u2212 minus) between two numbers or at start followed by numbers
+                if (i == 0 or self._is_number(before)) and self._is_number(after):
+                    return self._split_span(span, i, 1)
+                # Also plit around − (\u2212 minus) between two letters
+                if char == '−' and before and before[-1].isalpha() and after and after[0].isalpha():
+                    return self._split_span(span, i, 1)
+            elif char == '±':
+                # Split around ± unless surrounded by brackets
+                if not (before and after and before[-1] == '(' and after[0] == ')'):
+                    return self._split_span(span, i, 1)
+            elif char == '/':
+                # Split around / unless '+/-' or '-/-' etc.
+                if not (before and after and before[-1] in self.NO_SPLIT_SLASH and after[0] in self.NO_SPLIT_SLASH):
+                    return self._split_span(span, i, 1)
+            elif char == '>':
+                if not (before and before[-1] == '-'):
+                    # Split if preceding is not -
+                    return self._split_span(span, i, 1)
+                if before and before[-1] == '-':
+                    # If preceding is -, split around -> unless in chemical name
+                    if not text == '->' and not self._is_saccharide_arrow(before[:-1], after):
+                        return self._split_span(span, i-1, 2)
+            elif char == '→' and not self._is_saccharide_arrow(before, after):
+                # Split around → unless in chemical name
+                return self._split_span(span, i, 1)
+            elif char == '(' and self._is_number(before) and not '(' in after and not ')' in after:
+                # Split around open bracket after a number
+                return self._split_span(span, i, 1)
+            elif char == '-':
+                lowerbefore = lowertext[:i]
+                lowerafter = lowertext[i+1:]
+                # Always split on -of-the- -to- -in- -by- -of- -or- -and- -per- -the-
+                if lowerafter[:7] == 'of-the-':
+                    return [(span[0], span[0] + i), (span[0] + i, span[0] + i + 1), (span[0] + i + 1, span[0] + i + 3), (span[0] + i + 3, span[0] + i + 4), (span[0] + i + 4, span[0] + i + 7), (span[0] + i + 7, span[0] + i + 8), (span[0] + i + 8, span[1])]
+                if lowerafter[:5] in {'on-a-', 'of-a-'}:
+                    return [(span[0], span[0] + i), (span[0] + i, span[0] + i + 1), (span[0] + i + 1, span[0] + i + 3), (span[0] + i + 3, span[0] + i + 4), (span[0] + i + 4, span[0] + i + 5), (span[0] + i + 5, span[0] + i + 6), (span[0] + i + 6, span[1])]
+                if lowerafter[:3] in {'to-', 'in-', 'by-', 'of-', 'or-', 'on-'}:
+                    return [(span[0], span[0] + i), (span[0] + i, span[0] + i + 1), (span[0] + i + 1, span[0] + i + 3), (span[0] + i + 3, span[0] + i + 4), (span[0] + i + 4, span[1])]
+                if lowerafter[:4] in {'and-', 'per-', 'the-'}:
+                    return [(span[0], span[0] + i), (span[0] + i, span[0] + i + 1), (span[0] + i + 1, span[0] + i + 4), (span[0] + i + 4, span[0] + i + 5), (span[0] + i + 5, span[1])]
+
+                # By default we split on hyphens
+                split = True
+                if lowerafter == 'nmr':
+                    split = True  # Always split NMR off end
+                elif bracket_level(text) == 0 and (not bracket_level(after) == 0 or not bracket_level(before) == 0):
+                    split = False  # Don't split if within brackets
+                elif after and after[0] == '>':
+                    split = False  # Don't split if followed by >
+                elif lowerbefore in self.NO_SPLIT_PREFIX or lowerafter in self.NO_SPLIT_SUFFIX:
+                    split = False  # Don't split if prefix or suffix in list
+                elif self.NO_SPLIT_PREFIX_ENDING.search(lowerbefore):
+                    split = False  # Don't split if prefix ends with pattern
+                elif lowerafter in self.SPLIT_SUFFIX:
+                    split = True  # Do split if suffix in list
+                elif len(before) <= 1 or len(after) <= 2:
+                    split = False  # Don't split if not at least 2 char before and 3 after
+                elif self.NO_SPLIT_CHEM.search(lowerbefore) or self.NO_SPLIT_CHEM.search(lowerafter):
+                    split = False  # Don't split if prefix or suffix match chem regex
+                if split:
+                    return self._split_span(span, i, 1)
+
+        # Split units off the end of a numeric value
+        quantity = self.QUANTITY_RE.search(text)
+        if quantity:
+            return self._split_span(span, len(quantity.group(6) or quantity.group(3) or quantity.group(2)), 0)
+
+        # Split pH off the start of a numeric value
+        if text.startswith('pH') and self._is_number(text[2:]):
+            return self._split_span(span, 2, 0)
+
+        # Split contraction words
+        for contraction in self.CONTRACTIONS:
+            if lowertext == contraction[0]:
+                return self._split_span(span, contraction[1])
+
+        if nextspan:
+            nexttext = s[nextspan[0]:nextspan[1]]
+            # Split NMR isotope whitespace errors (joined with previous sentence full stop)
+            if nexttext == 'NMR':
+                ind = text.rfind('.')
+                if ind > -1 and text[ind + 1:] in {'1H', '13C', '15N', '31P', '19F', '11B', '29Si', '170', '73Ge', '195Pt', '33S', '13C{1H}'}:
+                    return self._split_span(span, ind, 1)
+
+
+        return [span]
+
+    def span_tokenize(self, s):
+        """"""
+        # First get spans by splitting on all whitespace
+        # Includes: \u0020 \u00A0 \u1680 \u180E \u2000 \u2001 \u2002 \u2003 \u2004 \u2005 \u2006 \u2007 \u2008 \u2009 \u200A \u202F \u205F \u3000
+        spans = [(left, right) for left, right in regex_span_tokenize(s, r'\s+') if not left == right]
+        i = 0
+        # Recursively split spans according to rules
+        while i < len(spans):
+            subspans = self._subspan(s, spans[i], spans[i + 1] if i + 1 < len(spans) else None)
+            spans[i:i+1] = [subspan for subspan in subspans if subspan[1] - subspan[0] > 0]
+            if len(subspans) == 1:
+                i += 1
+        return spans
+
+
+class ReferenceFineWordTokenizer(FineWordTokenizer):
+    """The fine word tokenizer before its rules were compiled."""
+
+    def _subspan(self, s, span, nextspan):
+        """Recursively subdivide spans based on a series of rules."""
+
+        # Split on boundaries between greek and non-greek
+        text = s[span[0]:span[1]]
+        for i, char in enumerate(text):
+            if i < len(text) - 1:
+                nextchar = text[i + 1]
+                if (char in GREEK and nextchar not in GREEK) or (char not in GREEK and nextchar in GREEK):
+                    return [(span[0], span[0] + i + 1), (span[0] + i + 1, span[1])]
+
+        # Perform all normal WordTokenizer splits
+        return ReferenceWordTokenizer._subspan(self, s, span, nextspan)
+
+    def span_tokenize(self, s):
+        """"""
+        # First get spans by splitting on all whitespace
+        # Includes: \u0020 \u00A0 \u1680 \u180E \u2000 \u2001 \u2002 \u2003 \u2004 \u2005 \u2006 \u2007 \u2008 \u2009 \u200A \u202F \u205F \u3000
+        spans = [(left, right) for left, right in regex_span_tokenize(s, r'\s+') if not left == right]
+        i = 0
+        # Recursively split spans according to rules
+        while i < len(spans):
+            subspans = self._subspan(s, spans[i], spans[i + 1] if i + 1 < len(spans) else None)
+            spans[i:i+1] = [subspan for subspan in subspans if subspan[1] - subspan[0] > 0]
+            if len(subspans) == 1:
+                i += 1
+        return spans
+
+
+class TestCompiledRules(unittest.TestCase):
+    """Test the compiled tokenizers give the same tokens as the reference implementations."""
+
+    #: Characters that trigger the tokenizer rules
+    SPECIAL = list('.,:;-+−±/>→()[]{}\'"’“”x%°=αβγ–—~…') + ['->', '...', "'s", "n't", '(aq)', '(s)', 'NMR', '1H',
+                                                          'cannot', 'pH', 'http://', '---', '(TM)', 'mAh', 'IR(']
+
+    @classmethod
+    def setUpClass(cls):
+        directory = os.path.join(os.path.dirname(__file__), 'testpapers')
+        cls.words = []
+        for fname in sorted(os.listdir(directory)):
+            tree = etree.parse(os.path.join(directory, fname), etree.HTMLParser() if fname.endswith('.html') else None)
+            cls.words.extend(' '.join(tree.getroot().itertext()).split())
+
+    def assert_same(self, tokenizer, reference, texts):
+        for text in texts:
+            self.assertEqual(tokenizer.span_tokenize(text), reference.span_tokenize(text), text)
+
+    def random_texts(self, number, seed):
+        rng = random.Random(seed)
+        for _ in range(number):
+            parts = []
+            for _ in range(rng.randint(1, 12)):
+                if rng.random() < 0.6:
+                    parts.append(rng.choice(self.words))
+                else:
+                    parts.append(''.join(rng.choice(self.SPECIAL + ['a', 'B', '1', '2']) for _ in range(rng.randint(1, 6))))
+                parts.append(rng.choice([' ', '', '', ' \n']))
+            yield ''.join(parts)
+
+    def test_corpus(self):
+        """Test the tokenizers on the text of the test papers."""
+        texts = [' '.join(self.words[i:i + 40]) for i in range(0, len(self.words), 40)][::4]
+        for split_last_stop in (True, False):
+            self.assert_same(ChemWordTokenizer(split_last_stop), ReferenceChemWordTokenizer(split_last_stop), texts)
+        self.assert_same(WordTokenizer(), ReferenceWordTokenizer(), texts)
+        self.assert_same(FineWordTokenizer(), ReferenceFineWordTokenizer(), texts)
+
+    def test_random(self):
+        """Test the tokenizers on random text made of corpus words and characters that trigger the rules."""
+        texts = list(self.random_texts(1000, 0))
+        self.assert_same(ChemWordTokenizer(), ReferenceChemWordTokenizer(), texts)
+        self.assert_same(WordTokenizer(), ReferenceWordTokenizer(), texts)
+        self.assert_same(FineWordTokenizer(), ReferenceFineWordTokenizer(), texts)
+
+    def test_changed_lists(self):
+        """Test the rules follow sequence lists that are replaced or extended after they are first used."""
+        tokenizer = WordTokenizer()
+        self.assertEqual(tokenizer.tokenize('a^b cannot'), ['a^b', 'can', 'not'])
+        tokenizer.SPLIT = WordTokenizer.SPLIT + ['^']
+        self.assertEqual(tokenizer.tokenize('a^b cannot'), ['a', '^', 'b', 'can', 'not'])
+        # Other instances still use the lists of the class
+        self.assertEqual(WordTokenizer().tokenize('a^b cannot'), ['a^b', 'can', 'not'])
+        tokenizer.CONTRACTIONS.append(('gotcha', 3))
+        try:
+            self.assertEqual(WordTokenizer().tokenize('gotcha'), ['got', 'cha'])
+            self.assertEqual(tokenizer.tokenize('gotcha'), ['got', 'cha'])
+        finally:
+            tokenizer.CONTRACTIONS.pop()
+        self.assertEqual(WordTokenizer().tokenize('gotcha'), ['gotcha'])
+
+
+class TestTokenizationCache(unittest.TestCase):
+    """Test the LRU tokenization cache."""
+
+    def test_same_spans(self):
+        """Test cached tokenizers return the same spans as uncached ones."""
+        cache = TokenizationCache()
+        cached = ChemWordTokenizer(cache=cache)
+        uncached = ChemWordTokenizer()
+        sentences = ['The capacity of LiFePO4 is 170 mAh g−1.', 'Copyright © 2020 Elsevier B.V.'] * 3
+        for sentence in sentences:
+            self.assertEqual(uncached.span_tokenize(sentence), cached.span_tokenize(sentence))
+        self.assertEqual(cache.hits, 4)
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(len(cache), 2)
+        self.assertAlmostEqual(cache.stats['hit_rate'], 4 / 6.0)
+
+    def test_copies_returned(self):
+        """Test changing returned spans does not change the cache."""
+        t = WordTokenizer(cache=TokenizationCache())
+        spans = t.span_tokenize('This is a test.')
+        spans.append((0, 0))
+        self.assertEqual(t.span_tokenize('This is a test.'), [(0, 4), (5, 7), (8, 9), (10, 14), (14, 15)])
+
+    def test_namespaces(self):
+        """Test tokenizers with different rules sharing a cache do not return each other's spans."""
+        cache = TokenizationCache()
+        text = 'The 5-nm LiCoO2/C cell.'
+        tokenizers = [WordTokenizer(), WordTokenizer(split_last_stop=False), ChemWordTokenizer(), FineWordTokenizer()]
+        for tokenizer in tokenizers:
+            tokenizer.cache = cache
+            self.assertEqual(tokenizer.tokenize(text), type(tokenizer)(tokenizer.split_last_stop).tokenize(text))
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(len(cache), 4)
+
+    def test_namespaces_same_name(self):
+        """Test tokenizer classes with the same name in different modules do not share cache entries."""
+
+        project_tokenizer = type('ChemWordTokenizer', (ChemWordTokenizer,), {'SPLIT': ChemWordTokenizer.SPLIT + ['^']})
+        cache = TokenizationCache()
+        self.assertEqual(ChemWordTokenizer(cache=cache).tokenize('a^b'), ['a^b'])
+        self.assertEqual(project_tokenizer(cache=cache).tokenize('a^b'), ['a', '^', 'b'])
+        self.assertEqual(cache.hits, 0)
+
+    def test_max_size(self):
+        """Test the least recently used entries are evicted when the cache is full."""
+        cache = TokenizationCache(max_size=2)
+        t = WordTokenizer(cache=cache)
+        t.span_tokenize('a b')
+        t.span_tokenize('c d')
+        t.span_tokenize('a b')
+        t.span_tokenize('e f')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        t.span_tokenize('a b')
+        self.assertEqual(cache.hits, 2)
+        t.span_tokenize('c d')
+        self.assertEqual(cache.misses, 4)
+
+    def test_max_bytes(self):
+        """Test the estimated memory of the cache stays below its cap."""
+        cache = TokenizationCache(max_bytes=2000)
+        t = WordTokenizer(cache=cache)
+        for i in range(100):
+            t.span_tokenize('Sentence number %s is here.' % i)
+        self.assertLessEqual(cache.size_bytes, 2000)
+        self.assertGreater(cache.evictions, 0)
+        t.span_tokenize(' '.join(['word'] * 1000))
+        self.assertLessEqual(cache.size_bytes, 2000)
+        cache.clear()
+        self.assertEqual((len(cache), cache.size_bytes, cache.hits), (0, 0, 0))
+
+    def test_sentence_batch(self):
+        """Test batched sentence tokenization only passes texts that are not cached through the pipeline."""
+        cache = TokenizationCache()
+        t = SentenceTokenizer(cache=cache)
+        texts = ['First sentence. Second sentence.', 'Another text.']
+        expected = [t.span_tokenize(text) for text in texts]
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(t.span_tokenize_batch(texts + ['New text.']), expected + [[(0, 9)]])
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(t.span_tokenize('New text.'), [(0, 9)])
+        self.assertEqual(cache.hits, 3)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,10 @@
 import logging
+import threading
+import time
 import unittest
 from batterydataextractor.doc import Document
+from batterydataextractor.parse import bert
+from batterydataextractor.model.model import PropertyData, GeneralInfo
 
 logging.basicConfig(level=logging.DEBUG)
 log = logging.getLogger(__name__)
@@ -124,5 +128,65 @@ class TestGeneralInfoDeviceComponent(unittest.TestCase):
         self.do_parse(s, expected)
 
 
+class TestExtract(unittest.TestCase):
+    """Test running several model configurations over one document."""
+
+    text = 'The lithium iron phosphate battery (LiFePO4 battery) is a type of lithium-ion battery using lithium ' \
+           'iron phosphate as the cathode material. The theoretical capacity of graphite is 372 mAh/g.'
+
+    def test_extract_matches_separate_runs(self):
+        d1 = Document(self.text)
+        d1.add_models_by_names(["capacity"])
+        d2 = Document(self.text)
+        d2.add_general_models(["cathode"])
+        d = Document(self.text)
+        results = d.extract({
+            'properties': [PropertyData.configure(defined_names=["capacity"])],
+            'devices': [GeneralInfo.configure(defined_names=["cathode"])],
+        })
+        self.assertEqual(list(results.keys()), ['properties', 'devices'])
+        self.assertEqual(d1.records.serialize(), results['properties'].serialize())
+        self.assertEqual(d2.records.serialize(), results['devices'].serialize())
+        self.assertEqual(d.models, [])
+
+
+
+class TestLoadQaModel(unittest.TestCase):
+
+    def test_concurrent_load(self):
+        """Test threads that first ask for a question-answering model at the same time share one loaded copy."""
+        loaded = []
+
+        def pipeline(task, model, device, tokenizer):
+            loaded.append(model)
+            time.sleep(0.05)
+            return object()
+
+        class AutoTokenizer(object):
+            from_pretrained = staticmethod(lambda *args, **kwargs: None)
+
+        saved = bert.pipeline, bert.AutoTokenizer
+        bert.pipeline, bert.AutoTokenizer = pipeline, AutoTokenizer
+        results = []
+        barrier = threading.Barrier(6)
+
+        def work():
+            barrier.wait()
+            results.append(bert.load_qa_model('test-concurrent-qa-model', -1))
+
+        try:
+            threads = [threading.Thread(target=work) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            bert.pipeline, bert.AutoTokenizer = saved
+            bert.load_qa_model.cache.pop(('test-concurrent-qa-model', -1), None)
+        self.assertEqual(loaded, ['test-concurrent-qa-model'])
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(result is results[0] for result in results))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -4,13 +4,18 @@ test_reader_clean
 ~~~~~~~~~~~~~~~~~
 Test the HTML/XML Cleaner.
 """
+import io
 import logging
+import os
 import unittest
 
 from lxml.etree import tostring
 from lxml import html
 
-from batterydataextractor.scrape.clean import Cleaner, clean, strip, strip_markup, strip_html
+from batterydataextractor.reader import ElsevierXmlReader, RscHtmlReader, SpringerXmlReader
+from batterydataextractor.scrape.clean import Cleaner, clean, strip, strip_markup, strip_html, compile_cleaners, \
+    element_cleaner
+from batterydataextractor.scrape.rsc import rsc_html_whitespace
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -185,5 +190,60 @@ class TestCleaner(unittest.TestCase):
         self.assertEqual(STRIPKS4, tostring(tree).decode())
 
 
+@element_cleaner
+def upper_text(el):
+    if el.text:
+        el.text = el.text.upper()
+
+
+class TestCompileCleaners(unittest.TestCase):
+
+    def _sequential(self, cleaners, tree):
+        for cleaner in cleaners:
+            cleaner(tree)
+        return tostring(tree)
+
+    def test_fuse(self):
+        """Test adjacent element passes are fused into a single traversal."""
+        compiled = compile_cleaners([clean, rsc_html_whitespace, upper_text, strip])
+        # clean: blocks, kill, (whitespace + rsc_html_whitespace + upper_text); strip: blocks, kill, strip, whitespace
+        self.assertEqual(len(compiled.passes), 7)
+        for source in [HTML1, HTML2, HTML3, HTML4]:
+            tree = html.fromstring(source)
+            compiled(tree)
+            self.assertEqual(tostring(tree), self._sequential([clean, rsc_html_whitespace, upper_text, strip],
+                                                              html.fromstring(source)))
+
+    def test_subtree(self):
+        """Test passes over the whole tree are not fused when cleaning part of a document."""
+        compiled = compile_cleaners([clean, upper_text])
+        tree = html.fromstring(HTML2)
+        compiled(tree.find('body'))
+        expected = html.fromstring(HTML2)
+        self._sequential([clean, upper_text], expected.find('body'))
+        self.assertEqual(tostring(tree), tostring(expected))
+        self.assertIn(b'<title>TITLE</title>', tostring(tree))
+
+    def test_element_cleaner_callable(self):
+        """Test an element cleaner can still be applied to a document directly."""
+        tree = html.fromstring(HTML4)
+        upper_text(tree)
+        self.assertEqual(tree.text_content()[:4], 'HERE')
+
+    def test_readers(self):
+        """Test the compiled reader cleaners give the same tree as applying them one after another."""
+        for reader, fname in [(RscHtmlReader(), 'rsc_test1.html'), (ElsevierXmlReader(), 'els_test2.xml'),
+                              (SpringerXmlReader(), 'spr_test2.xml')]:
+            with io.open(os.path.join(os.path.dirname(__file__), 'testpapers', fname), 'rb') as f:
+                content = reader.prepare(f.read())
+            trees = []
+            for i in range(2):
+                tree = reader._make_tree(content)
+                trees.append((tree, reader._css(reader.root_css, tree)[0]))
+            compile_cleaners(reader.cleaners)(trees[0][1])
+            self._sequential(reader.cleaners, trees[1][1])
+            self.assertEqual(tostring(trees[0][0]), tostring(trees[1][0]))
+
+
 if __name__ == '__main__':
     unittest.main()
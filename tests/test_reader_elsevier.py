@@ -47,6 +47,16 @@ class TestElsXMLReader(unittest.TestCase):
         self.assertEqual(d.headdata[0].title, 'The effect of temperature on the electrode properties of the directly prepared Ti3Ni2 alloy')
         self.assertEqual(len(d.elements), 50)
 
+    def test_stream_usage(self):
+        """Test ElsevierXmlReader reading a document incrementally gives the same elements."""
+        path = os.path.join(os.path.dirname(__file__), 'testpapers', 'els_test2.xml')
+        d = Document.from_file(path, readers=[ElsevierXmlReader()])
+        with io.open(path, 'rb') as f:
+            elements = list(ElsevierXmlReader().readstream(f))
+        self.assertEqual([el.serialize() for el in elements], d.serialize()['elements'])
+        self.assertEqual([el.id for el in elements], [el.id for el in d.elements])
+        self.assertEqual(elements[0].document.__class__.__name__, 'StreamDocument')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -6,9 +6,12 @@ Test XML/HTML reader.
 """
 import logging
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from lxml.html import HTMLParser
 
 from batterydataextractor.doc import Paragraph
-from batterydataextractor.reader import HtmlReader
+from batterydataextractor.reader import ElsevierXmlReader, HtmlReader, RscHtmlReader
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -60,5 +63,80 @@ class TestReaderHtml(unittest.TestCase):
             self.assertIsInstance(el, Paragraph)
 
 
+class CountedParagraph(Paragraph):
+    """Paragraph that counts how many times it is constructed."""
+
+    created = 0
+
+    def __init__(self, text, **kwargs):
+        CountedParagraph.created += 1
+        super(CountedParagraph, self).__init__(text, **kwargs)
+
+
+class TestTextBuilder(unittest.TestCase):
+
+    def test_inline_built_once(self):
+        """Test a paragraph with many inline elements is built once."""
+        r = HtmlReader()
+        root = r._make_tree(('<p id="p1">Li' + '<sub>2</sub>O and ' * 100 + 'end</p>').encode('utf-8'))
+        CountedParagraph.created = 0
+        elements = r._parse_element(root, element_cls=CountedParagraph)
+        self.assertEqual(CountedParagraph.created, 1)
+        self.assertEqual(len(elements), 1)
+        self.assertEqual(elements[0].text, 'Li' + '2O and ' * 100 + 'end')
+        self.assertEqual(elements[0].id, 'p1')
+
+    def test_parse_text(self):
+        """Test block children are joined with a space into a single element."""
+        r = HtmlReader()
+        root = r._make_tree(b'<div><p>First <i>para</i></p><p>Second para</p></div>')
+        CountedParagraph.created = 0
+        elements = r._parse_text(root, element_cls=CountedParagraph)
+        self.assertEqual(CountedParagraph.created, 1)
+        self.assertEqual(elements[0].text, 'First para Second para')
+
+    def test_references(self):
+        """Test references of merged fragments are kept in order."""
+        r = HtmlReader()
+        root = r._make_tree(b'<p>Text<a href="#c1">1</a>, <a href="#c2">2</a>.</p>')
+        refs = {a: r._parse_reference(a) for a in root.iter('a')}
+        elements = r._parse_element(root, refs=refs)
+        self.assertEqual(elements[0].text, 'Text1, 2.')
+        self.assertEqual(elements[0].references, ['c1', 'c2'])
+
+
+class TestCompiledCss(unittest.TestCase):
+
+    def test_cached_per_class(self):
+        """Test CSS selectors are compiled once for each reader class."""
+        xpath = RscHtmlReader._compile_css('h1, .title_heading')
+        self.assertIs(RscHtmlReader()._compile_css('h1, .title_heading'), xpath)
+        self.assertIsNot(HtmlReader._compile_css('h1, .title_heading'), xpath)
+
+    def test_cached_per_thread(self):
+        """Test each thread compiles its own selectors and parsers, as they can't be used by two threads at once."""
+        r = RscHtmlReader()
+        xpath = r._compile_css('h1, .title_heading')
+        parser = r._parser(HTMLParser, encoding='utf-8')
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            other_xpath, other_parser = executor.submit(
+                lambda: (r._compile_css('h1, .title_heading'), r._parser(HTMLParser, encoding='utf-8'))).result()
+        self.assertIsNot(other_xpath, xpath)
+        self.assertIsNot(other_parser, parser)
+        self.assertIs(r._parser(HTMLParser, encoding='utf-8'), parser)
+
+    def test_namespaces(self):
+        """Test compiled selectors use the namespaces of the reader."""
+        r = ElsevierXmlReader()
+        root = r._make_tree(b'<doc xmlns:ce="http://www.elsevier.com/xml/common/dtd"><ce:title>A title</ce:title></doc>')
+        self.assertEqual([el.text for el in r._css('ce|title', root)], ['A title'])
+
+    def test_attr(self):
+        """Test selectors for attribute values return strings."""
+        r = HtmlReader()
+        root = r._make_tree(b'<html><head><meta name="citation_doi" content="10.1039/x"></head></html>')
+        self.assertEqual(r._css(r.metadata_doi_css, root), ['10.1039/x'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+test_reader_plaintext
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Test reader for plain text.
+"""
+import unittest
+import logging
+import io
+
+from batterydataextractor.reader.plaintext import PlainTextReader
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+TEXT = ('LiFePO4 cathodes\r\n\r\nThe capacity of LiFePO4 was 160 mAh g-1.\nIt was stable.\n \t\n'
+        'The voltage was 3.4 V.\r \rThe\ttemperature was 25 °C.\n\n\n')
+
+
+class TestPlainTextReader(unittest.TestCase):
+
+    maxDiff = None
+
+    def test_parse(self):
+        d = PlainTextReader().parse(TEXT)
+        self.assertEqual([el.text for el in d.elements], [
+            'LiFePO4 cathodes', 'The capacity of LiFePO4 was 160 mAh g-1.\nIt was stable.',
+            'The voltage was 3.4 V.', 'The\ttemperature was 25 °C.', ''
+        ])
+
+    def test_stream_usage(self):
+        """Test PlainTextReader reading a file in chunks gives the same paragraphs, wherever the chunks end."""
+        r = PlainTextReader()
+        expected = [el.text for el in r.parse(TEXT).elements]
+        for chunk_size in (1, 2, 3, 5, 1024):
+            stream = r.readstream(io.BytesIO(TEXT.encode('utf-8')), encoding='utf-8', chunk_size=chunk_size)
+            self.assertEqual([el.text for el in stream], expected)
+            stream = r.readstream(io.StringIO(TEXT, newline=''), chunk_size=chunk_size)
+            self.assertEqual([el.text for el in stream], expected)
+
+    def test_stream_encoding(self):
+        """Test the encoding of a binary file is detected from the first chunk."""
+        r = PlainTextReader()
+        elements = list(r.iterparse(io.BytesIO(b'Graphite anode\n\n' + TEXT.encode('utf-8')), chunk_size=20))
+        self.assertEqual(elements[0].text, 'Graphite anode')
+        self.assertEqual(elements[2].text, 'The capacity of LiFePO4 was 160 mAh g-1.\nIt was stable.')
+        latin = 'Capacité du graphite.\n\nTempérature élevée.'
+        elements = list(r.iterparse(io.BytesIO(latin.encode('latin-1')), encoding='latin-1', chunk_size=4))
+        self.assertEqual([el.text for el in elements], [el.text for el in r.parse(latin).elements])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -48,6 +48,13 @@ class TestSpringerXMLReader(unittest.TestCase):
         self.assertEqual(d.metadata[0].authors, ['Hua-Chao Tao', 'Xue-Lin Yang', 'Lu-Lu Zhang', 'Shi-Bing Ni'])
         self.assertEqual(d.headdata, [])
 
+    def test_stream_usage(self):
+        """Test SpringerXmlReader reading a document incrementally gives the same elements."""
+        path = os.path.join(os.path.dirname(__file__), 'testpapers', 'spr_test2.xml')
+        d = Document.from_file(path, readers=[SpringerXmlReader()])
+        elements = list(SpringerXmlReader().iterparse(path))
+        self.assertEqual([el.serialize() for el in elements], d.serialize()['elements'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -4,10 +4,19 @@ test_text_normalize
 ~~~~~~~~~
 Test the text package.
 """
+import codecs
+import itertools
 import logging
+import random
+import re
+import unicodedata
 import unittest
 
-from batterydataextractor.text.normalize import normalize
+from bs4 import UnicodeDammit
+
+from batterydataextractor.text import DAMMIT_SIZE, get_encoding, CONTROLS, HYPHENS, MINUSES, DOUBLE_QUOTES, \
+    SINGLE_QUOTES, APOSTROPHES, ACCENTS, PRIMES, SLASHES, TILDES
+from batterydataextractor.text.normalize import normalize, Normalizer, ChemNormalizer
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -26,5 +35,123 @@ class TestNormalization(unittest.TestCase):
         self.assertEqual(u'www.bbc.co.uk', normalize(u'www\u2024bbc\u2024co\u2024uk'))
 
 
+class TestGetEncoding(unittest.TestCase):
+
+    def test_ascii(self):
+        self.assertEqual(get_encoding(b'<p>The quick brown fox</p>'), 'ascii')
+
+    def test_utf8(self):
+        self.assertEqual(get_encoding('<p>LiFePO\u2084 \u2013 372 mAh g\u207b\xb9</p>'.encode('utf-8')), 'utf-8')
+
+    def test_bom(self):
+        self.assertEqual(get_encoding(codecs.BOM_UTF8 + b'abc'), 'utf-8')
+        self.assertEqual(get_encoding(codecs.BOM_UTF16_LE + 'abc'.encode('utf-16le')), 'utf-16le')
+        self.assertEqual(get_encoding(codecs.BOM_UTF32_BE + 'abc'.encode('utf-32be')), 'utf-32be')
+
+    def test_declared(self):
+        """Test the declared encoding is used if the string can be decoded with it."""
+        self.assertEqual(get_encoding(b'<?xml version="1.0" encoding="ISO-8859-1"?><a>\xe9</a>'), 'iso-8859-1')
+        html = b'<html><head><meta charset="iso-8859-1"></head><body>\xe9</body></html>'
+        self.assertEqual(get_encoding(html, is_html=True), 'iso-8859-1')
+        # Wrong or unknown declarations are ignored
+        self.assertEqual(get_encoding(b'<?xml version="1.0" encoding="bogus"?><a/>'), 'ascii')
+        self.assertEqual(get_encoding(b'<?xml version="1.0" encoding="ascii"?><a>\xc3\xa9</a>'), 'utf-8')
+
+    def test_undeclared(self):
+        """Test strings that are neither ASCII nor UTF-8 fall back to UnicodeDammit, also beyond its sample size."""
+        latin = 'Une phrase en fran\xe7ais, tr\xe8s \xe9l\xe9gante. '.encode('latin-1')
+        for data in (latin * 10, latin * (DAMMIT_SIZE // len(latin) + 10)):
+            self.assertEqual(get_encoding(data), UnicodeDammit(data).original_encoding)
+
+    def test_str(self):
+        self.assertIsNone(get_encoding('already text'))
+
+
+class ReferenceNormalizer(Normalizer):
+    """The Normalizer as it was before its replacements were compiled, making one pass per replaced character."""
+
+    def normalize(self, text):
+        if self.form is not None:
+            text = unicodedata.normalize(self.form, text)
+        for control in CONTROLS:
+            text = text.replace(control, '')
+        text = text.replace('\u000b', ' ').replace('\u000c', ' ').replace(u'\u0085', ' ')
+        text = text.replace('\u2028', '\n').replace('\u2029', '\n').replace('\r\n', '\n').replace('\r', '\n')
+        if self.hyphens:
+            for hyphen in HYPHENS | MINUSES:
+                text = text.replace(hyphen, '-')
+            text = text.replace('\u00ad', '')
+        if self.quotes:
+            for double_quote in DOUBLE_QUOTES:
+                text = text.replace(double_quote, '"')
+            for single_quote in (SINGLE_QUOTES | APOSTROPHES | ACCENTS):
+                text = text.replace(single_quote, "'")
+            text = text.replace('′', "'")
+            text = text.replace('‵', "'")
+            text = text.replace('″', "''")
+            text = text.replace('‶', "''")
+            text = text.replace('‴', "'''")
+            text = text.replace('‷', "'''")
+            text = text.replace('⁗', "''''")
+        if self.ellipsis:
+            text = text.replace('…', '...').replace(' . . . ', ' ... ')
+        if self.slashes:
+            for slash in SLASHES:
+                text = text.replace(slash, '/')
+        if self.tildes:
+            for tilde in TILDES:
+                text = text.replace(tilde, '~')
+        if self.strip:
+            text = text.strip()
+        if self.collapse:
+            text = ' '.join(text.split())
+        return text
+
+
+class ReferenceChemNormalizer(ReferenceNormalizer):
+
+    def normalize(self, text):
+        text = super(ReferenceChemNormalizer, self).normalize(text)
+        text = re.sub(r'sulph', r'sulf', text, flags=re.I)
+        text = re.sub(r'aluminum', r'aluminium', text, flags=re.I)
+        text = re.sub(r'cesium', r'caesium', text, flags=re.I)
+        return text
+
+
+class TestCompiledNormalizer(unittest.TestCase):
+    """Test the compiled replacements give the same text as making each replacement in turn."""
+
+    alphabet = sorted(CONTROLS | HYPHENS | MINUSES | DOUBLE_QUOTES | SINGLE_QUOTES | APOSTROPHES | ACCENTS | PRIMES |
+                      SLASHES | TILDES) + list('\u000b\u000c\u0085\u2028\u2029\r\n\u00ad… .aA1\t')
+    words = ['sulph', 'SULPHATE', 'Aluminum', 'cesium', 'CeSiUm', ' . . . ']
+
+    def texts(self, count=300, seed=47):
+        rand = random.Random(seed)
+        for _ in range(count):
+            parts = [rand.choice(self.alphabet) for _ in range(rand.randint(0, 30))]
+            parts += [rand.choice(self.words) for _ in range(rand.randint(0, 3))]
+            rand.shuffle(parts)
+            yield ''.join(parts)
+
+    def test_all_options(self):
+        texts = list(self.texts())
+        for options in itertools.product([False, True], repeat=7):
+            kwargs = dict(zip(('strip', 'collapse', 'hyphens', 'quotes', 'ellipsis', 'slashes', 'tildes'), options))
+            for form in ('NFKC', None):
+                compiled, reference = Normalizer(form, **kwargs), ReferenceNormalizer(form, **kwargs)
+                for text in texts[:40]:
+                    self.assertEqual(reference(text), compiled(text), (text, form, kwargs))
+        compiled, reference = ChemNormalizer(), ReferenceChemNormalizer(hyphens=True, quotes=True, ellipsis=True,
+                                                                         tildes=True)
+        for text in texts:
+            self.assertEqual(reference(text), compiled(text), text)
+
+    def test_order(self):
+        """Test replacements that depend on earlier ones."""
+        self.assertEqual(Normalizer(collapse=False)('a\r\u2028b\r\u0001\nc\rd'), 'a\nb\nc\nd')
+        self.assertEqual(Normalizer(ellipsis=True, collapse=False, strip=False)(' … . . . x'), ' ... ... x')
+        self.assertEqual(ChemNormalizer()('SULPHIDE and Aluminum'), 'sulfIDE and aluminium')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,48 @@
+"""
+test_utils
+~~~~~~~~~~
+Test the utility functions.
+"""
+import logging
+import threading
+import time
+import unittest
+
+from batterydataextractor.utils import locked_memoize
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+class TestLockedMemoize(unittest.TestCase):
+
+    def test_concurrent_first_calls(self):
+        """Test threads that call a memoized function with the same arguments at once only create the result once."""
+        calls = []
+
+        @locked_memoize
+        def load(name):
+            calls.append(name)
+            time.sleep(0.05)
+            return object()
+
+        barrier = threading.Barrier(8)
+        results = []
+
+        def work(name):
+            barrier.wait()
+            results.append((name, load(name)))
+
+        threads = [threading.Thread(target=work, args=('model-%s' % (i % 2),)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(calls), ['model-0', 'model-1'])
+        self.assertEqual(len(results), 8)
+        for name, result in results:
+            self.assertIs(result, load(name))
+
+
+if __name__ == '__main__':
+    unittest.main()